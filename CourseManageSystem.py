@@ -1,21 +1,59 @@
 import csv
-from typing import List, Tuple, Dict
+from typing import Dict, Iterable, Iterator, List, Tuple
 from datetime import datetime
-from openpyxl import load_workbook
-from openpyxl.utils.cell import get_column_letter, column_index_from_string
+from openpyxl.utils.cell import get_column_letter
 import re
 import logging
 import os
+import time
+from utils.bulk_writer import TableLoader
+from utils.calendar_utils import build_column_calendar, carry_month_year
 from utils.db_manager import DatabaseManager
+from utils.import_profile import record_sheet, timed
+from utils.parse_cache import ParseCache
+from utils.sheet_fingerprints import group_rows_by_origin, plan_sheet_changes, replace_sheet_rows
+from utils.sheet_utils import BorderIndex, MergedCellIndex, content_extent, fill_merged_values, read_value_grid
+from utils.workbook_backends import DEFAULT_BACKEND, open_workbook
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+INSERT_COURSE_DETAILS_QUERY = 'INSERT INTO course_details (course_symbol, course_name, teacher_1, teacher_2, class, data_origin) VALUES (?, ?, ?, ?, ?, ?)'
+# The last four columns are derived from course_datetime (?2) and week (?3), see DERIVED_COLUMNS
+INSERT_COURSES_QUERY = (
+    'INSERT INTO courses (course_symbol, course_datetime, week, class, period, comment, event, data_origin, detail_origin, day_of_week, '
+    'course_date, course_day, week_number, weekday) '
+    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, '
+    "date(?2), CAST(julianday(date(?2)) - 2440587.5 AS INTEGER), CASE WHEN ?3 GLOB '[0-9]*' THEN CAST(?3 AS INTEGER) END, CAST(strftime('%w', ?2) AS INTEGER))"
+)
+
+def normalize_course_details(course_details: Iterable[List]) -> Iterator[List]:
+    """
+    Shape course details for INSERT_COURSE_DETAILS_QUERY.
+
+    The query expects 6 parameters: course_symbol, course_name, teacher_1,
+    teacher_2, class, data_origin. Longer rows are cut to 6, rows with 5
+    elements get 'unknown' as data_origin, and anything else is skipped.
+    """
+    for detail in course_details:
+        if len(detail) >= 6:
+            yield detail[:6]
+        elif len(detail) == 5:
+            yield detail + ['unknown']
+        else:
+            logger.warning(f"Skipping course detail with unexpected format: {detail}")
+
 class CourseManagementSystem:
+    # Bump when a parser change alters the rows produced from the same workbook
+    PARSER_VERSION = 1
+    CACHE_NAMESPACE = f"courses-v{PARSER_VERSION}"
+
     def __init__(self, db_name: str):
         self.db_name = db_name
         self.db_manager = DatabaseManager(db_name)
         self.db_manager.initialize()
+        # Parsed rows of previously imported workbooks, stored next to the database
+        self.parse_cache = ParseCache(os.path.join(os.path.dirname(os.path.abspath(db_name)), 'parse_cache'))
 
     def _extract_sheet_number(self, sheet_name: str) -> int:
         """Extract sheet number from sheet name (e.g., 'd26' or 'Danh mục d26' -> 26)"""
@@ -33,14 +71,20 @@ class CourseManagementSystem:
     def _parse_course_details_sheet(self, sheet, sheet_name: str) -> List[List]:
         """Parse a single Danh mục sheet for course details"""
         course_details = []
-        pages = self._detect_pages(sheet)
+        with timed('detect_pages'):
+            pages = self._detect_pages(sheet)
         logger.info(f"Found {len(pages)} pages in course details sheet: {sheet_name}")
+        with timed('merged_cells'):
+            merged_index = MergedCellIndex.from_sheet(sheet)
+        with timed('borders'):
+            border_index = BorderIndex.from_sheet(sheet, max((page[3] for page in pages), default=0))
+        merged_values = {}  # Anchor value of each merged range inside a table
 
         for page_num, (start_col_idx, end_col_idx, start_row_idx, end_row_idx) in enumerate(pages, 1):
             logger.info(f"Processing page {page_num} in {sheet_name}: columns {start_col_idx}-{end_col_idx}, rows {start_row_idx}-{end_row_idx}")
             
             table_top_row, table_bottom_row = self._detect_table_boundaries(
-                sheet, start_col_idx, end_col_idx, start_row_idx, end_row_idx
+                border_index, start_col_idx, end_col_idx, start_row_idx, end_row_idx
             )
             
             if not (table_top_row and table_bottom_row):
@@ -50,27 +94,39 @@ class CourseManagementSystem:
             logger.info(f"Found table boundaries in page {page_num}: rows {table_top_row}-{table_bottom_row}")
             entries_in_page = 0
 
-            for row in range(table_top_row + 1, table_bottom_row + 1):
-                symbol = sheet.cell(row=row, column=start_col_idx).value
-                course_name = sheet.cell(row=row, column=start_col_idx + 1).value
-                classes = sheet.cell(row=row, column=end_col_idx - 2).value
-                teacher1 = sheet.cell(row=row, column=end_col_idx - 1).value
-                teacher2 = sheet.cell(row=row, column=end_col_idx).value
-
-                if symbol and course_name:
-                    if classes:
-                        class_list = [c.strip() for c in str(classes).split(',')]
-                        for class_name in class_list:
-                            if class_name:
-                                course_details.append([
-                                    symbol,
-                                    course_name, 
-                                    teacher1, 
-                                    teacher2,
-                                    class_name,
-                                    sheet_name
-                                ])
-                                entries_in_page += 1
+            # Read the table once and resolve merged ranges to their anchor values
+            first_col = max(1, min(start_col_idx, end_col_idx - 2))
+            # The loop also reads the column after the symbol, past the end of a one-column page
+            last_col = max(end_col_idx, start_col_idx + 1)
+            with timed('read_cells'):
+                grid = read_value_grid(sheet, table_top_row, table_bottom_row, first_col, last_col)
+            with timed('merged_cells'):
+                for bounds in merged_index.ranges_within(table_top_row, table_bottom_row, start_col_idx, end_col_idx):
+                    merged_values[bounds] = grid[bounds[0] - table_top_row][bounds[1] - first_col]
+                fill_merged_values(grid, table_top_row, first_col, merged_index, merged_values)
+
+            with timed('cell_loop'):
+                for row_values in grid[1:]:
+                    symbol = row_values[start_col_idx - first_col]
+                    course_name = row_values[start_col_idx + 1 - first_col]
+                    classes = row_values[end_col_idx - 2 - first_col]
+                    teacher1 = row_values[end_col_idx - 1 - first_col]
+                    teacher2 = row_values[end_col_idx - first_col]
+
+                    if symbol and course_name:
+                        if classes:
+                            class_list = [c.strip() for c in str(classes).split(',')]
+                            for class_name in class_list:
+                                if class_name:
+                                    course_details.append([
+                                        symbol,
+                                        course_name, 
+                                        teacher1, 
+                                        teacher2,
+                                        class_name,
+                                        sheet_name
+                                    ])
+                                    entries_in_page += 1
             logger.info(f"--------------------------------------------------------------------------------")
             logger.info(f"Added {entries_in_page} course details from page {page_num} in {sheet_name}")
             logger.info(f"--------------------------------------------------------------------------------")
@@ -82,15 +138,21 @@ class CourseManagementSystem:
     def _parse_d_sheet(self, sheet, sheet_name: str, detail_origin: str) -> List[List]:
         """Parse a single d-sheet for courses"""
         courses = []
-        pages = self._detect_pages(sheet)
+        with timed('detect_pages'):
+            pages = self._detect_pages(sheet)
         logger.info(f"Found {len(pages)} pages in course sheet: {sheet_name}")
         last_valid_month_year = None  # Store the last valid month/year across pages
+        with timed('merged_cells'):
+            merged_index = MergedCellIndex.from_sheet(sheet)
+        with timed('borders'):
+            border_index = BorderIndex.from_sheet(sheet, max((page[3] for page in pages), default=0))
+        merged_values = {}  # Anchor value of each merged range inside a table, kept across pages
 
         for page_num, (start_col_idx, end_col_idx, start_row_idx, end_row_idx) in enumerate(pages, 1):
             logger.info(f"Processing page {page_num} in {sheet_name}: columns {start_col_idx}-{end_col_idx}, rows {start_row_idx}-{end_row_idx}")
             
             table_top_row, table_bottom_row = self._detect_table_boundaries(
-                sheet, start_col_idx, end_col_idx, start_row_idx, end_row_idx
+                border_index, start_col_idx, end_col_idx, start_row_idx, end_row_idx
             )
             
             if not (table_top_row and table_bottom_row):
@@ -100,90 +162,72 @@ class CourseManagementSystem:
             logger.info(f"Found table boundaries in page {page_num}: rows {table_top_row}-{table_bottom_row}")
             entries_in_page = 0
 
-            # Get month/year row before handling merged cells
-            month_year_row = table_top_row
-            week_row = table_top_row + 1
-            date_row = table_top_row + 2
-
-            # First, check and populate empty month cells at the start of the page
-            if last_valid_month_year:
-                for col in range(max(3, start_col_idx), end_col_idx + 1):
-                    month_year = sheet.cell(row=month_year_row, column=col).value
-                    if not month_year:  # Empty cell
-                        # Only populate if we have a date in this column
-                        date_str = sheet.cell(row=date_row, column=col).value
-                        if date_str:
-                            logger.info(f"Populating empty month cell in column {col} with {last_valid_month_year} on date {date_str}")
-                            sheet.cell(row=month_year_row, column=col).value = last_valid_month_year
-                            break
+            # Pull the table into value grids once instead of looking up every cell
+            first_col = max(3, start_col_idx)
+            with timed('read_cells'):
+                grid = read_value_grid(sheet, table_top_row, table_bottom_row, first_col, end_col_idx)
+                labels = read_value_grid(sheet, table_top_row, table_bottom_row, 1, 2)
+
+            # First, carry the last valid month of the previous page into the empty month cells
+            if len(grid) > 3:
+                filled_offset = carry_month_year(grid[0], grid[2], last_valid_month_year)
+                if filled_offset is not None:
+                    logger.info(f"Populating empty month cell in column {first_col + filled_offset} with {last_valid_month_year} on date {grid[2][filled_offset]}")
+
+            # Now resolve merged ranges inside the table to their anchor values
+            with timed('merged_cells'):
+                for bounds in merged_index.ranges_within(table_top_row, table_bottom_row, start_col_idx, end_col_idx):
+                    anchor_row, anchor_col = bounds[0], bounds[1]
+                    if anchor_col >= first_col:
+                        merged_values[bounds] = grid[anchor_row - table_top_row][anchor_col - first_col]
                     else:
-                        # If we find a valid month/year, stop populating
-                        year, month = self._parse_month_year(str(month_year))
-                        if year and month:
-                            break
+                        merged_values[bounds] = labels[anchor_row - table_top_row][anchor_col - 1]
+                fill_merged_values(grid, table_top_row, first_col, merged_index, merged_values)
+                fill_merged_values(labels, table_top_row, 1, merged_index, merged_values)
 
-            # Now handle merged cells
-            self._handle_merged_cells(sheet, start_col_idx, end_col_idx, table_top_row, table_bottom_row)
+            # Decode the header rows once into a per-column calendar
+            calendar = build_column_calendar(grid[0], grid[1], grid[2]) if len(grid) > 3 else []
 
             # Process the data and update last_valid_month_year
-            for data_row in range(table_top_row + 3, table_bottom_row + 1):
-                class_value = sheet.cell(row=data_row, column=1).value
-                period_value = sheet.cell(row=data_row, column=2).value
-
-                for col in range(max(3, start_col_idx), end_col_idx + 1):
-                    month_year = sheet.cell(row=month_year_row, column=col).value
-                    week = sheet.cell(row=week_row, column=col).value
-                    date_str = sheet.cell(row=date_row, column=col).value
-                    
-                    
-                    course_cell = sheet.cell(row=data_row, column=col)
-                    course_value = course_cell.value
-                    comment = course_cell.comment.text if course_cell.comment else ""
-
-                    if all([month_year, date_str, course_value]):
-                        year, month = self._parse_month_year(str(month_year))
-                        last_valid_month_year = month_year
-                        day = self._parse_date(str(date_str))
+            with timed('cell_loop'):
+                for row_offset in range(3, len(grid)):
+                    class_value, period_value = labels[row_offset]
+
+                    for col_offset, course_value in enumerate(grid[row_offset]):
+                        column = calendar[col_offset]
+                        if column is None or not course_value:
+                            continue
+
+                        last_valid_month_year = column.month_year
+                        if column.date is not None:
+                            # Comments are only needed for cells that become courses;
+                            # merged cells share the comment of their anchor
+                            row, col = table_top_row + row_offset, first_col + col_offset
+                            bounds = merged_index.find(row, col)
+                            if bounds in merged_values:
+                                row, col = bounds[0], bounds[1]
+                            course_cell = sheet.cell(row=row, column=col)
+                            comment = course_cell.comment.text if course_cell.comment else ""
                         
-                        if all([year, month, day]):
-                            dt = datetime(year, month, day)
-                            
-                            # Calculate day of the week
-                            day_name = dt.strftime('%A')  # Monday, Tuesday, etc.
-                            
-                            # Map English day names to Vietnamese abbreviations
-                            day_of_week_map = {
-                                'Monday': 'T2',
-                                'Tuesday': 'T3',
-                                'Wednesday': 'T4',
-                                'Thursday': 'T5',
-                                'Friday': 'T6',
-                                'Saturday': 'T7',
-                                'Sunday': 'CN'
-                            }
-                            
-                            day_of_week = day_of_week_map.get(day_name, day_name)
-                            
                             # Extract event letter from course_value if present
                             course_symbol = str(course_value)
                             event = None
-                            import re
                             match = re.match(r'^(\d{4})([A-Za-z]+)$', course_symbol)
                             if match:
                                 course_symbol = match.group(1)  # The 4 digits
                                 event = match.group(2).upper()       # The letters
-                            
+                        
                             courses.append([
                                 course_symbol, 
-                                dt, 
-                                week, 
+                                column.date, 
+                                column.week, 
                                 class_value,
                                 period_value, 
                                 comment.rstrip(),
                                 event,
                                 sheet_name,
                                 detail_origin,
-                                day_of_week  # Add day of week to the data
+                                column.day_of_week  # Add day of week to the data
                             ])
                             entries_in_page += 1
 
@@ -199,120 +243,90 @@ class CourseManagementSystem:
 
         logger.info(f"Found {len(vertical_breaks)-1} vertical breaks and {len(horizontal_breaks)-1} horizontal breaks")
 
-        if sheet.dimensions:
-            last_cell = sheet.dimensions.split(":")[1]
-            last_col = ''.join(re.findall(r'[A-Za-z]+', last_cell))
-            last_row = int(''.join(re.findall(r'\d+', last_cell)))
-        else:
-            last_col = get_column_letter(sheet.max_column)
-            last_row = sheet.max_row
-
-        logger.info(f"Sheet dimensions: columns A-{last_col}, rows 1-{last_row}")
+        # Bound pages by the cells that hold content, not by sheet.dimensions,
+        # which also covers cells that only carry formatting
+        last_row, last_col_idx = content_extent(sheet)
+        logger.info(f"Sheet content extent: columns A-{get_column_letter(max(last_col_idx, 1))}, rows 1-{last_row}")
         pages = []
         for v in range(len(vertical_breaks)):
-            end_col = get_column_letter(vertical_breaks[v+1] if v + 1 < len(vertical_breaks) else column_index_from_string(last_col))
-            start_col = get_column_letter(vertical_breaks[v] + 1)
-            start_col_idx = column_index_from_string(start_col)
-            end_col_idx = column_index_from_string(end_col)
+            start_col_idx = vertical_breaks[v] + 1
+            end_col_idx = min(vertical_breaks[v+1], last_col_idx) if v + 1 < len(vertical_breaks) else last_col_idx
+            if start_col_idx > end_col_idx:
+                continue  # Page lies entirely beyond the content
 
             for h in range(len(horizontal_breaks)):
-                end_row_idx = horizontal_breaks[h+1] if h + 1 < len(horizontal_breaks) else last_row
                 start_row_idx = horizontal_breaks[h] + 1
+                end_row_idx = min(horizontal_breaks[h+1], last_row) if h + 1 < len(horizontal_breaks) else last_row
+                if start_row_idx > end_row_idx:
+                    continue
                 pages.append((start_col_idx, end_col_idx, start_row_idx, end_row_idx))
         return pages
 
-    def _detect_table_boundaries(self, sheet, start_col_idx, end_col_idx, start_row_idx, end_row_idx):
+    def _detect_table_boundaries(self, border_index, start_col_idx, end_col_idx, start_row_idx, end_row_idx):
         """Detect table boundaries within a page"""
-        table_top_row = None
-        for row_idx in range(start_row_idx, end_row_idx + 1):
-            cell = sheet.cell(row=row_idx, column=start_col_idx)
-            if cell.border.top and cell.border.top.style is not None:
-                table_top_row = row_idx
-                break
-
-        table_bottom_row = None
-        for row_idx in range(end_row_idx, start_row_idx - 1, -1):
-            cell = sheet.cell(row=row_idx, column=start_col_idx)
-            if cell.border.bottom and cell.border.bottom.style is not None:
-                table_bottom_row = row_idx
-                break
-
+        # The table spans from the first top border to the last bottom border in the page's first column
+        table_top_row = border_index.first_top(start_col_idx, start_row_idx, end_row_idx)
+        table_bottom_row = border_index.last_bottom(start_col_idx, start_row_idx, end_row_idx)
         return table_top_row, table_bottom_row
 
-    def _handle_merged_cells(self, sheet, start_col_idx, end_col_idx, table_top_row, table_bottom_row):
-        """Handle merged cells in table"""
-        for m_range in list(sheet.merged_cells.ranges):
-            if (m_range.min_row >= table_top_row and m_range.max_row <= table_bottom_row and
-                m_range.min_col >= start_col_idx and m_range.max_col <= end_col_idx):
-                top_left_cell = sheet.cell(row=m_range.min_row, column=m_range.min_col)
-                value = top_left_cell.value
-                comment = top_left_cell.comment
-                sheet.unmerge_cells(str(m_range))
-                
-                for r in range(m_range.min_row, m_range.max_row + 1):
-                    for c in range(m_range.min_col, m_range.max_col + 1):
-                        cell = sheet.cell(row=r, column=c)
-                        cell.value = value
-                        if comment:
-                            cell.comment = type(comment)(text=comment.text, author=comment.author)
-
-    def _parse_month_year(self, s):
-        """Parse month and year from string"""
-        parts = s.replace("THÁNG ", "").split("-")
-        if len(parts) == 2:
-            month_str = parts[0].strip()
-            year_str = parts[1].strip()
-            return int(year_str), int(month_str)
-        return None, None
-
-    def _parse_date(self, d_str):
-        """Parse date from string"""
-        try:
-            return int(float(d_str))
-        except:
-            return None
-
-    def store_data(self, courses: List[List], course_details: List[List]):
-        """Store course and course detail data in the database"""
-        # Clear existing data
-        self.db_manager.execute_query('DELETE FROM courses')
-        self.db_manager.execute_query('DELETE FROM course_details')
-        
-        # Store course details
-        if course_details:
-            # Check if the course_details list items have the correct number of elements
-            # The SQL query expects 6 parameters: course_symbol, course_name, teacher_1, teacher_2, class, data_origin
-            # But the processed_details might only have 5 elements if data_origin was removed
-            
-            # Check the first item to determine the format
-            if course_details and len(course_details[0]) == 5:
-                logger.info("Course details have 5 elements, adding data_origin")
-                # Add data_origin as the 6th element if it's missing
-                course_details_with_origin = []
-                for detail in course_details:
-                    # Add 'unknown' as the data_origin if it's missing
-                    course_details_with_origin.append(detail + ['unknown'])
-                
-                self.db_manager.execute_many(
-                    'INSERT INTO course_details (course_symbol, course_name, teacher_1, teacher_2, class, data_origin) VALUES (?, ?, ?, ?, ?, ?)',
-                    course_details_with_origin
-                )
-            else:
-                # Use the details as is if they already have 6 elements
-                self.db_manager.execute_many(
-                    'INSERT INTO course_details (course_symbol, course_name, teacher_1, teacher_2, class, data_origin) VALUES (?, ?, ?, ?, ?, ?)',
-                    course_details
-                )
-            
-            logger.info(f"Stored {len(course_details)} course details in database")
-
-        # Store courses with event data
-        if courses:
-            self.db_manager.execute_many(
-                'INSERT INTO courses (course_symbol, course_datetime, week, class, period, comment, event, data_origin, detail_origin, day_of_week) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
-                courses
-            )
-            logger.info(f"Stored {len(courses)} courses in database")
+    def store_data(self, courses: Iterable[List], course_details: Iterable[List]):
+        """Store course and course detail data in the database, replacing what was there"""
+        with self.db_manager.bulk_load(('courses', 'course_details')) as cursor:
+            self.load_data(cursor, courses, course_details)
+
+    def table_loaders(self, cursor) -> Dict[str, TableLoader]:
+        """Clear the course tables in a bulk load and get a loader for each"""
+        return {
+            'course_details': TableLoader(cursor, 'course_details', INSERT_COURSE_DETAILS_QUERY, 5),
+            'courses': TableLoader(cursor, 'courses', INSERT_COURSES_QUERY, 7),
+        }
+
+    def load_data(self, cursor, courses: Iterable[List], course_details: Iterable[List]):
+        """
+        Replace the stored courses and course details using a bulk-load cursor.
+
+        Rows can be any iterables, e.g. generators; they are inserted and
+        fingerprinted as they stream past without being collected first.
+        """
+        loaders = self.table_loaders(cursor)
+        loaders['course_details'].insert(normalize_course_details(course_details))
+        loaders['courses'].insert(courses)
+        for loader in loaders.values():
+            loader.finish()
+
+    def store_data_incremental(self, courses: List[List], course_details: List[List]) -> Dict[str, Dict[str, Tuple[str, str]]]:
+        """
+        Store only the sheets whose parsed rows changed since the last import.
+
+        Rows are grouped by the sheet they came from (data_origin) and each
+        group is fingerprinted. Unchanged sheets are skipped, changed sheets
+        have their rows replaced and new sheets are added. Sheets that are
+        not part of this import are left untouched.
+
+        Returns:
+            dict: (status, fingerprint) per sheet, for 'course_details' and 'courses'
+        """
+        details_by_origin = group_rows_by_origin(course_details, 5)
+        courses_by_origin = group_rows_by_origin(courses, 7)
+
+        with self.db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            detail_changes = plan_sheet_changes(cursor, 'course_details', details_by_origin)
+            course_changes = plan_sheet_changes(cursor, 'courses', courses_by_origin)
+
+            for origin, (status, fingerprint) in detail_changes.items():
+                if status != 'skipped':
+                    replace_sheet_rows(cursor, 'course_details', origin, details_by_origin[origin],
+                                       INSERT_COURSE_DETAILS_QUERY, fingerprint)
+                    logger.info(f"{status.capitalize()} {len(details_by_origin[origin])} course details from {origin}")
+
+            for origin, (status, fingerprint) in course_changes.items():
+                if status != 'skipped':
+                    replace_sheet_rows(cursor, 'courses', origin, courses_by_origin[origin],
+                                       INSERT_COURSES_QUERY, fingerprint)
+                    logger.info(f"{status.capitalize()} {len(courses_by_origin[origin])} courses from {origin}")
+
+        return {'course_details': detail_changes, 'courses': course_changes}
 
     def export_to_csv(self, output_file: str = "course_schedule.csv"):
         """Export the database content to CSV"""
@@ -367,37 +381,119 @@ class CourseManagementSystem:
 
         logger.info(f"Data exported to {output_file}")
 
-    def parse_excel(self, filename: str) -> Tuple[List[List], List[List]]:
-        """Parse Excel file with new matching strategy"""
-        workbook = load_workbook(filename=filename)
-        all_courses = []
-        all_course_details = []
+    def plan_sheets(self, sheet_names: List[str]) -> Tuple[List[str], List[Tuple[str, str]]]:
+        """
+        Decide which sheets of a workbook to parse.
 
-        # First pass: collect all Danh mục sheets and their details
+        Returns the Danh mục sheet names and (d-sheet, Danh mục sheet) pairs,
+        both in workbook order. A d-sheet is only parsed if a Danh mục sheet
+        with the same number exists.
+        """
+        # First pass: collect all Danh mục sheets
+        danh_muc_names = []
         danh_muc_sheets = {}  # Map of sheet number to sheet name
-        for sheet in workbook.worksheets:
-            sheet_name = sheet.title
+        for sheet_name in sheet_names:
             if self._is_danh_muc_sheet(sheet_name):
                 sheet_number = self._extract_sheet_number(sheet_name)
                 if sheet_number != -1:
                     logger.info(f"Found Danh mục sheet: {sheet_name} (number: {sheet_number})")
                     danh_muc_sheets[sheet_number] = sheet_name
-                    details = self._parse_course_details_sheet(sheet, sheet_name)
-                    all_course_details.extend(details)
+                    danh_muc_names.append(sheet_name)
 
-        # Second pass: process d-sheets only if matching Danh mục exists
-        for sheet in workbook.worksheets:
-            sheet_name = sheet.title
+        # Second pass: pair d-sheets with their matching Danh mục
+        d_sheet_pairs = []
+        for sheet_name in sheet_names:
             if self._is_d_sheet(sheet_name):
                 sheet_number = self._extract_sheet_number(sheet_name)
                 if sheet_number != -1 and sheet_number in danh_muc_sheets:
-                    logger.info(f"Processing d-sheet: {sheet_name} with matching Danh mục: {danh_muc_sheets[sheet_number]}")
-                    courses = self._parse_d_sheet(sheet, sheet_name, danh_muc_sheets[sheet_number])
-                    all_courses.extend(courses)
+                    d_sheet_pairs.append((sheet_name, danh_muc_sheets[sheet_number]))
                 else:
                     logger.warning(f"Skipping d-sheet {sheet_name} - no matching Danh mục sheet found")
 
-        return all_courses, all_course_details
+        return danh_muc_names, d_sheet_pairs
+
+    def parse_sheet(self, workbook, sheet_name: str, detail_origin: str = None) -> List[List]:
+        """Parse a d-sheet for courses, or a Danh mục sheet for details if no detail_origin is given"""
+        if detail_origin is None:
+            return self._parse_course_details_sheet(workbook[sheet_name], sheet_name)
+        logger.info(f"Processing d-sheet: {sheet_name} with matching Danh mục: {detail_origin}")
+        return self._parse_d_sheet(workbook[sheet_name], sheet_name, detail_origin)
+
+    def iter_excel(self, source, backend: str = DEFAULT_BACKEND, progress=None) -> Iterator[Tuple[str, List[List]]]:
+        """
+        Parse Excel file with new matching strategy, yielding rows sheet by sheet.
+
+        Yields ('course_details', rows) for every Danh mục sheet, then
+        ('courses', rows) for every d-sheet, so a consumer can store each
+        sheet before the next one is parsed. source and progress are as for
+        parse_excel().
+        """
+        # Unchanged workbooks are served from the parse cache without opening them
+        with timed('parse_cache'):
+            cache_key = self.parse_cache.make_key(source, self.CACHE_NAMESPACE)
+            cached = self.parse_cache.read(cache_key)
+        if cached is not None:
+            logger.info(f"Using cached parse result {cache_key}")
+            for table_name, rows in cached:
+                if progress is not None:
+                    progress.rows_from_cache(len(rows))
+                yield table_name, rows
+            return
+
+        with timed('open_workbook'):
+            workbook = open_workbook(source, backend)
+        # Every sheet also goes to the cache entry as it is parsed
+        cache_writer = self.parse_cache.writer(cache_key)
+        try:
+            danh_muc_names, d_sheet_pairs = self.plan_sheets(workbook.sheetnames)
+            if progress is not None:
+                progress.sheets_planned(len(danh_muc_names) + len(d_sheet_pairs))
+            for sheet_name in danh_muc_names:
+                start = time.perf_counter()
+                details = self.parse_sheet(workbook, sheet_name)
+                record_sheet('course_details', sheet_name, time.perf_counter() - start, len(details))
+                if progress is not None:
+                    progress.sheet_parsed(sheet_name, len(details))
+                if cache_writer is not None:
+                    with timed('parse_cache'):
+                        cache_writer.write(('course_details', details))
+                yield 'course_details', details
+            for sheet_name, detail_origin in d_sheet_pairs:
+                start = time.perf_counter()
+                courses = self.parse_sheet(workbook, sheet_name, detail_origin)
+                record_sheet('courses', sheet_name, time.perf_counter() - start, len(courses))
+                if progress is not None:
+                    progress.sheet_parsed(sheet_name, len(courses))
+                if cache_writer is not None:
+                    with timed('parse_cache'):
+                        cache_writer.write(('courses', courses))
+                yield 'courses', courses
+        except BaseException:
+            if cache_writer is not None:
+                cache_writer.discard()
+            raise
+        finally:
+            workbook.close()
+
+        if cache_writer is not None:
+            with timed('parse_cache'):
+                cache_writer.commit()
+
+    def parse_excel(self, source, backend: str = DEFAULT_BACKEND, progress=None) -> Tuple[List[List], List[List]]:
+        """
+        Parse Excel file with new matching strategy, read with the named workbook backend.
+
+        source is a file path, a binary stream (e.g. an upload's
+        SpooledTemporaryFile or a BytesIO) or a buffer such as bytes or mmap.
+
+        If progress is given (e.g. an ImportJob), it is told how many sheets
+        will be parsed and about every parsed sheet, and may stop the parse
+        by raising from its hooks.
+        """
+        rows = {'courses': [], 'course_details': []}
+        for table_name, sheet_rows in self.iter_excel(source, backend, progress):
+            rows[table_name].extend(sheet_rows)
+        return rows['courses'], rows['course_details']
 
 # Usage example:
 if __name__ == "__main__":
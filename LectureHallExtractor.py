@@ -1,21 +1,46 @@
 import csv
-from typing import List, Tuple, Dict
+from typing import Dict, Iterable, Iterator, List, Tuple
 from datetime import datetime
-from openpyxl import load_workbook
-from openpyxl.utils.cell import get_column_letter, column_index_from_string
+from openpyxl.utils.cell import get_column_letter
 import re
 import logging
 import os
+import time
+from utils.bulk_writer import TableLoader
+from utils.calendar_utils import build_column_calendar, carry_month_year
 from utils.db_manager import DatabaseManager
+from utils.import_profile import record_sheet, timed
+from utils.parse_cache import ParseCache
+from utils.sheet_fingerprints import group_rows_by_origin, plan_sheet_changes, replace_sheet_rows
+from utils.sheet_utils import BorderIndex, MergedCellIndex, content_extent, fill_merged_values, read_value_grid
+from utils.workbook_backends import DEFAULT_BACKEND, open_workbook
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# hall_date is derived from hall_datetime (?2), see DERIVED_COLUMNS
+INSERT_LECTURE_HALLS_QUERY = 'INSERT INTO lecture_halls (hall_symbol, hall_datetime, week, class, period, data_origin, hall_date) VALUES (?, ?, ?, ?, ?, ?, date(?2))'
+
+# One hall per (date, class, period) slot: the first imported, as SQLite takes
+# the bare hall_symbol from the row that has MIN(id)
+HALL_SLOTS_QUERY = '''
+    SELECT hall_date, class, period, hall_symbol, MIN(id)
+    FROM lecture_halls
+    WHERE hall_date IS NOT NULL
+    GROUP BY hall_date, class, period
+'''
+
 class LectureHallExtractor:
+    # Bump when a parser change alters the rows produced from the same workbook
+    PARSER_VERSION = 1
+    CACHE_NAMESPACE = f"halls-v{PARSER_VERSION}"
+
     def __init__(self, db_name: str):
         self.db_name = db_name
         self.db_manager = DatabaseManager(db_name)
         self.db_manager.initialize()
+        # Parsed rows of previously imported workbooks, stored next to the database
+        self.parse_cache = ParseCache(os.path.join(os.path.dirname(os.path.abspath(db_name)), 'parse_cache'))
 
     def _is_d_sheet(self, sheet_name: str) -> bool:
         """Check if sheet is a 'd' sheet with proper format (d followed by numbers)"""
@@ -34,88 +59,50 @@ class LectureHallExtractor:
 
         logger.info(f"Found {len(vertical_breaks)-1} vertical breaks and {len(horizontal_breaks)-1} horizontal breaks")
 
-        if sheet.dimensions:
-            last_cell = sheet.dimensions.split(":")[1]
-            last_col = ''.join(re.findall(r'[A-Za-z]+', last_cell))
-            last_row = int(''.join(re.findall(r'\d+', last_cell)))
-        else:
-            last_col = get_column_letter(sheet.max_column)
-            last_row = sheet.max_row
-
-        logger.info(f"Sheet dimensions: columns A-{last_col}, rows 1-{last_row}")
+        # Bound pages by the cells that hold content, not by sheet.dimensions,
+        # which also covers cells that only carry formatting
+        last_row, last_col_idx = content_extent(sheet)
+        logger.info(f"Sheet content extent: columns A-{get_column_letter(max(last_col_idx, 1))}, rows 1-{last_row}")
         pages = []
         for v in range(len(vertical_breaks)):
-            end_col = get_column_letter(vertical_breaks[v+1] if v + 1 < len(vertical_breaks) else column_index_from_string(last_col))
-            start_col = get_column_letter(vertical_breaks[v] + 1)
-            start_col_idx = column_index_from_string(start_col)
-            end_col_idx = column_index_from_string(end_col)
+            start_col_idx = vertical_breaks[v] + 1
+            end_col_idx = min(vertical_breaks[v+1], last_col_idx) if v + 1 < len(vertical_breaks) else last_col_idx
+            if start_col_idx > end_col_idx:
+                continue  # Page lies entirely beyond the content
 
             for h in range(len(horizontal_breaks)):
-                end_row_idx = horizontal_breaks[h+1] if h + 1 < len(horizontal_breaks) else last_row
                 start_row_idx = horizontal_breaks[h] + 1
+                end_row_idx = min(horizontal_breaks[h+1], last_row) if h + 1 < len(horizontal_breaks) else last_row
+                if start_row_idx > end_row_idx:
+                    continue
                 pages.append((start_col_idx, end_col_idx, start_row_idx, end_row_idx))
         return pages
 
-    def _detect_table_boundaries(self, sheet, start_col_idx, end_col_idx, start_row_idx, end_row_idx):
+    def _detect_table_boundaries(self, border_index, start_col_idx, end_col_idx, start_row_idx, end_row_idx):
         """Detect table boundaries within a page"""
-        table_top_row = None
-        for row_idx in range(start_row_idx, end_row_idx + 1):
-            cell = sheet.cell(row=row_idx, column=start_col_idx)
-            if cell.border.top and cell.border.top.style is not None:
-                table_top_row = row_idx
-                break
-
-        table_bottom_row = None
-        for row_idx in range(end_row_idx, start_row_idx - 1, -1):
-            cell = sheet.cell(row=row_idx, column=start_col_idx)
-            if cell.border.bottom and cell.border.bottom.style is not None:
-                table_bottom_row = row_idx
-                break
-
+        # The table spans from the first top border to the last bottom border in the page's first column
+        table_top_row = border_index.first_top(start_col_idx, start_row_idx, end_row_idx)
+        table_bottom_row = border_index.last_bottom(start_col_idx, start_row_idx, end_row_idx)
         return table_top_row, table_bottom_row
 
-    def _handle_merged_cells(self, sheet, start_col_idx, end_col_idx, table_top_row, table_bottom_row):
-        """Handle merged cells in table"""
-        for m_range in list(sheet.merged_cells.ranges):
-            if (m_range.min_row >= table_top_row and m_range.max_row <= table_bottom_row and
-                m_range.min_col >= start_col_idx and m_range.max_col <= end_col_idx):
-                top_left_cell = sheet.cell(row=m_range.min_row, column=m_range.min_col)
-                value = top_left_cell.value
-                sheet.unmerge_cells(str(m_range))
-                
-                for r in range(m_range.min_row, m_range.max_row + 1):
-                    for c in range(m_range.min_col, m_range.max_col + 1):
-                        cell = sheet.cell(row=r, column=c)
-                        cell.value = value
-
-    def _parse_month_year(self, s):
-        """Parse month and year from string"""
-        parts = s.replace("THÁNG ", "").split("-")
-        if len(parts) == 2:
-            month_str = parts[0].strip()
-            year_str = parts[1].strip()
-            return int(year_str), int(month_str)
-        return None, None
-
-    def _parse_date(self, d_str):
-        """Parse date from string"""
-        try:
-            return int(float(d_str))
-        except:
-            return None
-
     def _parse_d_sheet(self, sheet, sheet_name: str) -> List[List]:
         """Parse a single d-sheet for lecture halls"""
         halls = []
-        pages = self._detect_pages(sheet)
+        with timed('detect_pages'):
+            pages = self._detect_pages(sheet)
         logger.info(f"Found {len(pages)} pages in d-sheet: {sheet_name}")
         last_valid_month_year = None  # Store the last valid month/year across pages
+        with timed('merged_cells'):
+            merged_index = MergedCellIndex.from_sheet(sheet)
+        with timed('borders'):
+            border_index = BorderIndex.from_sheet(sheet, max((page[3] for page in pages), default=0))
+        merged_values = {}  # Anchor value of each merged range inside a table, kept across pages
 
         for page_num, (start_col_idx, end_col_idx, start_row_idx, end_row_idx) in enumerate(pages, 1):
             logger.info(f"Processing page {page_num} in {sheet_name}: columns {start_col_idx}-{end_col_idx}, rows {start_row_idx}-{end_row_idx}")
             
             table_top_row, table_bottom_row = self._detect_table_boundaries(
-                sheet, start_col_idx, end_col_idx, start_row_idx, end_row_idx
+                border_index, start_col_idx, end_col_idx, start_row_idx, end_row_idx
             )
             
             if not (table_top_row and table_bottom_row):
@@ -125,59 +112,51 @@ class LectureHallExtractor:
             logger.info(f"Found table boundaries in page {page_num}: rows {table_top_row}-{table_bottom_row}")
             entries_in_page = 0
 
-            # Get month/year row before handling merged cells
-            month_year_row = table_top_row
-            week_row = table_top_row + 1
-            date_row = table_top_row + 2
-
-            # First, check and populate empty month cells at the start of the page
-            if last_valid_month_year:
-                for col in range(max(3, start_col_idx), end_col_idx + 1):
-                    month_year = sheet.cell(row=month_year_row, column=col).value
-                    if not month_year:  # Empty cell
-                        # Only populate if we have a date in this column
-                        date_str = sheet.cell(row=date_row, column=col).value
-                        if date_str:
-                            logger.info(f"Populating empty month cell in column {col} with {last_valid_month_year} on date {date_str}")
-                            sheet.cell(row=month_year_row, column=col).value = last_valid_month_year
-                            break
+            # Pull the table into value grids once instead of looking up every cell
+            first_col = max(3, start_col_idx)
+            with timed('read_cells'):
+                grid = read_value_grid(sheet, table_top_row, table_bottom_row, first_col, end_col_idx)
+                labels = read_value_grid(sheet, table_top_row, table_bottom_row, 1, 2)
+
+            # First, carry the last valid month of the previous page into the empty month cells
+            if len(grid) > 3:
+                filled_offset = carry_month_year(grid[0], grid[2], last_valid_month_year)
+                if filled_offset is not None:
+                    logger.info(f"Populating empty month cell in column {first_col + filled_offset} with {last_valid_month_year} on date {grid[2][filled_offset]}")
+
+            # Now resolve merged ranges inside the table to their anchor values
+            with timed('merged_cells'):
+                for bounds in merged_index.ranges_within(table_top_row, table_bottom_row, start_col_idx, end_col_idx):
+                    anchor_row, anchor_col = bounds[0], bounds[1]
+                    if anchor_col >= first_col:
+                        merged_values[bounds] = grid[anchor_row - table_top_row][anchor_col - first_col]
                     else:
-                        # If we find a valid month/year, stop populating
-                        year, month = self._parse_month_year(str(month_year))
-                        if year and month:
-                            break
+                        merged_values[bounds] = labels[anchor_row - table_top_row][anchor_col - 1]
+                fill_merged_values(grid, table_top_row, first_col, merged_index, merged_values)
+                fill_merged_values(labels, table_top_row, 1, merged_index, merged_values)
 
-            # Now handle merged cells
-            self._handle_merged_cells(sheet, start_col_idx, end_col_idx, table_top_row, table_bottom_row)
+            # Decode the header rows once into a per-column calendar
+            calendar = build_column_calendar(grid[0], grid[1], grid[2]) if len(grid) > 3 else []
 
             # Process the data and update last_valid_month_year
-            for data_row in range(table_top_row + 3, table_bottom_row + 1):
-                class_value = sheet.cell(row=data_row, column=1).value
-                period_value = sheet.cell(row=data_row, column=2).value
-
-                for col in range(max(3, start_col_idx), end_col_idx + 1):
-                    month_year = sheet.cell(row=month_year_row, column=col).value
-                    week = sheet.cell(row=week_row, column=col).value
-                    date_str = sheet.cell(row=date_row, column=col).value
-                    
-                    hall_cell = sheet.cell(row=data_row, column=col)
-                    hall_value = hall_cell.value
-
-                    if all([month_year, date_str, hall_value]):
-                        year, month = self._parse_month_year(str(month_year))
-                        last_valid_month_year = month_year
-                        day = self._parse_date(str(date_str))
-                        
-                        if all([year, month, day]):
-                            dt = datetime(year, month, day)
-                            
+            with timed('cell_loop'):
+                for row_offset in range(3, len(grid)):
+                    class_value, period_value = labels[row_offset]
+
+                    for col_offset, hall_value in enumerate(grid[row_offset]):
+                        column = calendar[col_offset]
+                        if column is None or not hall_value:
+                            continue
+
+                        last_valid_month_year = column.month_year
+                        if column.date is not None:
                             # Just use the hall value directly without extracting event
                             hall_symbol = str(hall_value)
-                            
+                        
                             halls.append([
                                 hall_symbol, 
-                                dt, 
-                                week, 
+                                column.date, 
+                                column.week, 
                                 class_value,
                                 period_value, 
                                 sheet_name
@@ -189,49 +168,166 @@ class LectureHallExtractor:
         logger.info(f"Total lecture halls found in {sheet_name}: {len(halls)}")
         return halls
 
-    def store_data(self, halls: List[List]):
-        """Store lecture hall data in the database"""
-        # Clear existing lecture hall data
-        self.db_manager.execute_query('DELETE FROM lecture_halls')
-        
-        # Store lecture halls
-        if halls:
-            self.db_manager.execute_many(
-                'INSERT INTO lecture_halls (hall_symbol, hall_datetime, week, class, period, data_origin) VALUES (?, ?, ?, ?, ?, ?)',
-                halls
+    def store_data(self, halls: Iterable[List]):
+        """Store lecture hall data in the database and match it with the courses"""
+        with self.db_manager.bulk_load(('lecture_halls',)) as cursor:
+            if self.load_data(cursor, halls):
+                self.match_halls(cursor)
+
+    def table_loaders(self, cursor) -> Dict[str, TableLoader]:
+        """Clear the lecture hall table in a bulk load and get a loader for it"""
+        return {'lecture_halls': TableLoader(cursor, 'lecture_halls', INSERT_LECTURE_HALLS_QUERY, 5)}
+
+    def load_data(self, cursor, halls: Iterable[List]) -> int:
+        """
+        Replace the stored lecture halls using a bulk-load cursor.
+
+        Rows can be any iterable, e.g. a generator; they are inserted and
+        fingerprinted as they stream past without being collected first.
+        Courses are not matched, see match_halls().
+
+        Returns:
+            int: Number of lecture halls stored
+        """
+        loader = self.table_loaders(cursor)['lecture_halls']
+        loader.insert(halls)
+        loader.finish()
+        return loader.row_count
+
+    def match_halls(self, cursor) -> Dict[str, int]:
+        """
+        Set the hall of every course from the lecture hall with the same date, class and period.
+
+        Courses and halls are joined once on their stored date keys through
+        the slot indexes. When a slot has several halls, the first one
+        imported is used, as before. Courses without a hall in their slot
+        are left with none.
+
+        Returns:
+            dict: Match statistics, see match_stats()
+        """
+        # Update courses with hall information
+        cursor.execute('PRAGMA table_info(courses)')
+        if not any(column[1] == 'hall' for column in cursor.fetchall()):
+            cursor.execute('ALTER TABLE courses ADD COLUMN hall TEXT')
+            logger.info("Added column hall to table courses")
+
+        cursor.execute('UPDATE courses SET hall = NULL WHERE hall IS NOT NULL')
+        cursor.execute(f'''
+            UPDATE courses
+            SET hall = slots.hall_symbol
+            FROM ({HALL_SLOTS_QUERY}) AS slots
+            WHERE courses.course_date = slots.hall_date
+            AND courses.class = slots.class
+            AND courses.period = slots.period
+        ''')
+
+        stats = self.match_stats(cursor)
+        logger.info(f"Updated {stats['matched']} courses with hall information "
+                    f"({stats['unmatched']} without a hall, {stats['ambiguous_slots']} slots with several halls)")
+        return stats
+
+    def match_stats(self, cursor) -> Dict[str, int]:
+        """
+        Count how the stored courses are matched to lecture halls.
+
+        Returns:
+            dict: matched and unmatched course counts, and ambiguous_slots,
+            the number of (date, class, period) slots that have more than one hall
+        """
+        cursor.execute('SELECT COUNT(hall), COUNT(*) FROM courses')
+        matched, total = cursor.fetchone()
+        cursor.execute('''
+            SELECT COUNT(*) FROM (
+                SELECT 1
+                FROM lecture_halls
+                WHERE hall_date IS NOT NULL
+                GROUP BY hall_date, class, period
+                HAVING COUNT(DISTINCT hall_symbol) > 1
             )
-            logger.info(f"Stored {len(halls)} lecture halls in database")
-            
-            # Update courses with hall information
-            self.db_manager.add_column_if_not_exists('courses', 'hall', 'TEXT')
-            
-            # Match courses with lecture halls
-            self.db_manager.execute_query('''
-                UPDATE courses
-                SET 
-                    hall = (
-                        SELECT lh.hall_symbol
-                        FROM lecture_halls lh
-                        WHERE date(courses.course_datetime) = date(lh.hall_datetime)
-                        AND courses.class = lh.class
-                        AND courses.period = lh.period
-                    )
-                WHERE EXISTS (
-                    SELECT 1
-                    FROM lecture_halls lh
-                    WHERE date(courses.course_datetime) = date(lh.hall_datetime)
-                    AND courses.class = lh.class
-                    AND courses.period = lh.period
+        ''')
+        ambiguous_slots = cursor.fetchone()[0]
+        return {'matched': matched, 'unmatched': total - matched, 'ambiguous_slots': ambiguous_slots}
+
+    def get_match_stats(self) -> Dict[str, int]:
+        """Count how the stored courses are matched to lecture halls, see match_stats()"""
+        with self.db_manager.get_connection() as conn:
+            return self.match_stats(conn.cursor())
+
+    def store_data_incremental(self, halls: List[List], changed_course_origins: List[str]) -> Dict[str, Tuple[str, str]]:
+        """
+        Store only the lecture hall sheets whose parsed rows changed, and
+        re-match halls only for the courses that could be affected.
+
+        Affected courses are those of the changed course sheets, plus those
+        whose (date, class, period) slot appears in the old or new rows of a
+        changed lecture hall sheet.
+
+        Args:
+            halls: Parsed lecture hall rows
+            changed_course_origins: d-sheets whose course rows were replaced or added
+
+        Returns:
+            dict: (status, fingerprint) per lecture hall sheet
+        """
+        halls_by_origin = group_rows_by_origin(halls, 5)
+
+        with self.db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            hall_changes = plan_sheet_changes(cursor, 'lecture_halls', halls_by_origin)
+
+            cursor.execute('''
+                CREATE TEMP TABLE IF NOT EXISTS affected_slots (
+                    slot_date TEXT,
+                    class TEXT,
+                    period TEXT
                 )
             ''')
-            
-            # Check how many courses were updated
-            updated_count = self.db_manager.execute_query(
-                'SELECT COUNT(*) FROM courses WHERE hall IS NOT NULL',
-                fetch_one=True
-            )[0]
-            
-            logger.info(f"Updated {updated_count} courses with hall information")
+            cursor.execute('DELETE FROM temp.affected_slots')
+            collect_slots_query = '''
+                INSERT INTO temp.affected_slots (slot_date, class, period)
+                SELECT DISTINCT hall_date, class, period
+                FROM lecture_halls
+                WHERE data_origin = ?
+            '''
+
+            for origin, (status, fingerprint) in hall_changes.items():
+                if status == 'skipped':
+                    continue
+                # Courses matched to the old rows of this sheet have to be matched again
+                cursor.execute(collect_slots_query, (origin,))
+                replace_sheet_rows(cursor, 'lecture_halls', origin, halls_by_origin[origin],
+                                   INSERT_LECTURE_HALLS_QUERY, fingerprint)
+                cursor.execute(collect_slots_query, (origin,))
+                logger.info(f"{status.capitalize()} {len(halls_by_origin[origin])} lecture halls from {origin}")
+
+            # Match halls only for the affected courses
+            origin_placeholders = ','.join(['?'] * len(changed_course_origins))
+            affected_courses = f'''
+                data_origin IN ({origin_placeholders})
+                OR EXISTS (
+                    SELECT 1
+                    FROM temp.affected_slots s
+                    WHERE courses.course_date = s.slot_date
+                    AND courses.class = s.class
+                    AND courses.period = s.period
+                )
+            '''
+            cursor.execute(f'UPDATE courses SET hall = NULL WHERE {affected_courses}', list(changed_course_origins))
+            logger.info(f"Re-matching halls for {cursor.rowcount} affected courses")
+            cursor.execute(f'''
+                UPDATE courses
+                SET hall = slots.hall_symbol
+                FROM ({HALL_SLOTS_QUERY}) AS slots
+                WHERE courses.course_date = slots.hall_date
+                AND courses.class = slots.class
+                AND courses.period = slots.period
+                AND ({affected_courses})
+            ''', list(changed_course_origins))
+            logger.info(f"Matched {cursor.rowcount} affected courses with a hall")
+            cursor.execute('DELETE FROM temp.affected_slots')
+
+        return hall_changes
 
     def export_to_csv(self, output_file: str = "lecture_halls.csv"):
         """Export the database content to CSV"""
@@ -268,22 +364,85 @@ class LectureHallExtractor:
 
         logger.info(f"Data exported to {output_file}")
 
-    def parse_excel(self, filename: str) -> List[List]:
-        """Parse Excel file for lecture hall information"""
-        workbook = load_workbook(filename=filename)
-        all_halls = []
-
-        # Process only d-sheets with proper format
-        for sheet in workbook.worksheets:
-            sheet_name = sheet.title
+    def plan_sheets(self, sheet_names: List[str]) -> List[str]:
+        """Get the names of the d-sheets to parse, in workbook order"""
+        d_sheet_names = []
+        for sheet_name in sheet_names:
             if self._is_d_sheet(sheet_name):
-                sheet_number = self._extract_sheet_number(sheet_name)
-                logger.info(f"Processing d-sheet: {sheet_name} (number: {sheet_number})")
-                halls = self._parse_d_sheet(sheet, sheet_name)
-                all_halls.extend(halls)
+                d_sheet_names.append(sheet_name)
             else:
                 logger.warning(f"Skipping sheet: {sheet_name} - not a valid d-sheet format")
-
+        return d_sheet_names
+
+    def parse_sheet(self, workbook, sheet_name: str) -> List[List]:
+        """Parse a single d-sheet of a workbook for lecture halls"""
+        sheet_number = self._extract_sheet_number(sheet_name)
+        logger.info(f"Processing d-sheet: {sheet_name} (number: {sheet_number})")
+        return self._parse_d_sheet(workbook[sheet_name], sheet_name)
+
+    def iter_excel(self, source, backend: str = DEFAULT_BACKEND, progress=None) -> Iterator[Tuple[str, List[List]]]:
+        """
+        Parse Excel file for lecture hall information, yielding ('lecture_halls', rows) per d-sheet.
+
+        A consumer can store each sheet before the next one is parsed.
+        source and progress are as for parse_excel().
+        """
+        # Unchanged workbooks are served from the parse cache without opening them
+        with timed('parse_cache'):
+            cache_key = self.parse_cache.make_key(source, self.CACHE_NAMESPACE)
+            cached = self.parse_cache.read(cache_key)
+        if cached is not None:
+            logger.info(f"Using cached parse result {cache_key}")
+            for table_name, rows in cached:
+                if progress is not None:
+                    progress.rows_from_cache(len(rows))
+                yield table_name, rows
+            return
+
+        with timed('open_workbook'):
+            workbook = open_workbook(source, backend)
+        # Every sheet also goes to the cache entry as it is parsed
+        cache_writer = self.parse_cache.writer(cache_key)
+        try:
+            # Process only d-sheets with proper format
+            sheet_names = self.plan_sheets(workbook.sheetnames)
+            if progress is not None:
+                progress.sheets_planned(len(sheet_names))
+            for sheet_name in sheet_names:
+                start = time.perf_counter()
+                halls = self.parse_sheet(workbook, sheet_name)
+                record_sheet('lecture_halls', sheet_name, time.perf_counter() - start, len(halls))
+                if progress is not None:
+                    progress.sheet_parsed(sheet_name, len(halls))
+                if cache_writer is not None:
+                    with timed('parse_cache'):
+                        cache_writer.write(('lecture_halls', halls))
+                yield 'lecture_halls', halls
+        except BaseException:
+            if cache_writer is not None:
+                cache_writer.discard()
+            raise
+        finally:
+            workbook.close()
+
+        if cache_writer is not None:
+            with timed('parse_cache'):
+                cache_writer.commit()
+
+    def parse_excel(self, source, backend: str = DEFAULT_BACKEND, progress=None) -> List[List]:
+        """
+        Parse Excel file for lecture hall information, read with the named workbook backend.
+
+        source is a file path, a binary stream (e.g. an upload's
+        SpooledTemporaryFile or a BytesIO) or a buffer such as bytes or mmap.
+
+        If progress is given (e.g. an ImportJob), it is told how many sheets
+        will be parsed and about every parsed sheet, and may stop the parse
+        by raising from its hooks.
+        """
+        all_halls = []
+        for _, halls in self.iter_excel(source, backend, progress):
+            all_halls.extend(halls)
         return all_halls
 
 # Usage example:
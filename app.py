@@ -5,6 +5,7 @@ from CourseManageSystem import CourseManagementSystem
 import os
 import logging
 import atexit
+import multiprocessing
 from utils.db_manager import DatabaseManager
 import sys
 from flask import Blueprint
@@ -79,15 +80,7 @@ def cleanup():
         for temp_file in ["temp_upload.xlsx", "temp_export.csv"]:
             if os.path.exists(temp_file):
                 os.remove(temp_file)
-                
-        # Remove any other temporary files that might have been created
-        for filename in os.listdir('.'):
-            if filename.startswith('temp_course_') or filename.startswith('temp_lecture_hall_'):
-                try:
-                    os.remove(filename)
-                    logger.info(f"Removed temporary file: {filename}")
-                except Exception as e:
-                    logger.error(f"Error removing temporary file {filename}: {str(e)}")
+
     except Exception as e:
         logger.error(f"Error during cleanup: {str(e)}")
 
@@ -132,6 +125,10 @@ def get_routes():
 
 # Modify the main block to work with PyInstaller
 if __name__ == "__main__":
+    # Needed for the process-pool import mode in the frozen executable
+    multiprocessing.freeze_support()
+    # Generations replaced while files were still open elsewhere
+    db_manager.remove_stale_generations()
     try:
         # Initialize FlaskUI with larger window size
         ui = FlaskUI(app=app, server="flask", width=1920, height=1080)
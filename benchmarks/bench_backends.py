@@ -0,0 +1,74 @@
+"""
+Compare parse throughput and memory of the workbook backends.
+
+Parses the same synthetic course and lecture hall workbooks with every
+backend in utils.workbook_backends, checks that all of them produce
+identical rows, and reports the best-of-repeat time and the peak traced
+memory (measured in a separate run, since tracing slows parsing down).
+
+Usage:
+    python -m benchmarks.bench_backends [--sheets 4] [--repeat 3]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from benchmarks.common import make_parsers
+from benchmarks.workbook_generator import generate_workbook
+from utils.workbook_backends import WORKBOOK_BACKENDS
+
+def _best_time(parse, path: str, backend: str, repeat: int):
+    """Return (result, best-of-repeat seconds)"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = parse(path, backend=backend)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+def _peak_memory(parse, path: str, backend: str) -> float:
+    """Peak traced memory in MB of one parse"""
+    tracemalloc.start()
+    parse(path, backend=backend)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare parse throughput and memory of the workbook backends")
+    parser.add_argument('--sheets', type=int, default=4)
+    parser.add_argument('--strips', type=int, default=4)
+    parser.add_argument('--bands', type=int, default=6)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        course_parser, hall_parser = make_parsers(temp_dir)
+
+        course_path = os.path.join(temp_dir, 'course.xlsx')
+        hall_path = os.path.join(temp_dir, 'halls.xlsx')
+        layout = dict(sheets=args.sheets, strips=args.strips, bands=args.bands,
+                      cols_per_strip=30, rows_per_band=40)
+        generate_workbook(course_path, **layout)
+        generate_workbook(hall_path, halls=True, **layout)
+        print(f"course workbook {os.path.getsize(course_path) / 1024:.0f} KB, "
+              f"lecture hall workbook {os.path.getsize(hall_path) / 1024:.0f} KB")
+
+        print(f"{'workbook':>10} {'backend':>10} {'time (s)':>9} {'rows/s':>9} {'peak (MB)':>10}")
+        for label, parse, path in (('courses', course_parser.parse_excel, course_path),
+                                   ('halls', hall_parser.parse_excel, hall_path)):
+            results = {}
+            for backend in WORKBOOK_BACKENDS:
+                results[backend], elapsed = _best_time(parse, path, backend, args.repeat)
+                peak = _peak_memory(parse, path, backend)
+                rows = sum(map(len, results[backend])) if isinstance(results[backend], tuple) else len(results[backend])
+                print(f"{label:>10} {backend:>10} {elapsed:>9.2f} {rows / elapsed:>9.0f} {peak:>10.1f}")
+
+            reference = next(iter(results.values()))
+            if any(result != reference for result in results.values()):
+                raise SystemExit(f"Backends disagree on the {label} workbook")
+
+if __name__ == '__main__':
+    main()
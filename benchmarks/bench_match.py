@@ -0,0 +1,89 @@
+"""
+Measure lecture hall matching on a large synthetic database.
+
+Courses and lecture halls are bulk loaded, then match_halls() is timed.
+The correlated date() update that matching used before is quadratic, so it
+is only run on a sample of the courses; its time is projected to all of
+them, and the halls it picks for the sample are checked against
+match_halls().
+
+Usage:
+    python -m benchmarks.bench_match [--courses 200000] [--halls 100000] [--legacy-courses 2000]
+"""
+import argparse
+import tempfile
+import time
+from benchmarks.common import course_rows, hall_rows, make_parsers
+
+# How halls were matched before the stored date keys, limited to the courses up to an id
+LEGACY_MATCH_QUERY = '''
+    UPDATE courses
+    SET 
+        hall = (
+            SELECT lh.hall_symbol
+            FROM lecture_halls lh
+            WHERE date(courses.course_datetime) = date(lh.hall_datetime)
+            AND courses.class = lh.class
+            AND courses.period = lh.period
+        )
+    WHERE id <= ? AND EXISTS (
+        SELECT 1
+        FROM lecture_halls lh
+        WHERE date(courses.course_datetime) = date(lh.hall_datetime)
+        AND courses.class = lh.class
+        AND courses.period = lh.period
+    )
+'''
+
+def _sample_halls(cursor, last_id: int):
+    cursor.execute('SELECT id, hall FROM courses WHERE id <= ? ORDER BY id', (last_id,))
+    return cursor.fetchall()
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure lecture hall matching on a large synthetic database")
+    parser.add_argument('--courses', type=int, default=200000)
+    parser.add_argument('--halls', type=int, default=100000)
+    parser.add_argument('--sheets', type=int, default=40)
+    parser.add_argument('--legacy-courses', type=int, default=2000,
+                        help="Courses to match with the old query (0 to skip it)")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        course_parser, hall_parser = make_parsers(temp_dir)
+        db_manager = course_parser.db_manager
+        with db_manager.bulk_load() as cursor:
+            course_parser.load_data(cursor, course_rows(args.courses, args.sheets, seed=1), iter([]))
+            hall_parser.load_data(cursor, hall_rows(args.halls, args.sheets, seed=3))
+
+        best = None
+        for _ in range(args.repeat):
+            with db_manager.get_connection() as conn:
+                start = time.perf_counter()
+                stats = hall_parser.match_halls(conn.cursor())
+                elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        print(f"{args.courses} courses, {args.halls} lecture halls")
+        print(f"matched {stats['matched']}, unmatched {stats['unmatched']}, "
+              f"slots with several halls {stats['ambiguous_slots']}")
+        print(f"{'path':>8} {'courses':>8} {'time (s)':>9} {'courses/s':>10}")
+        print(f"{'join':>8} {args.courses:>8} {best:>9.3f} {args.courses / best:>10.0f}")
+
+        if args.legacy_courses > 0:
+            sample = min(args.legacy_courses, args.courses)
+            with db_manager.get_connection() as conn:
+                cursor = conn.cursor()
+                expected = _sample_halls(cursor, sample)
+                cursor.execute('UPDATE courses SET hall = NULL WHERE id <= ?', (sample,))
+                start = time.perf_counter()
+                cursor.execute(LEGACY_MATCH_QUERY, (sample,))
+                elapsed = time.perf_counter() - start
+                legacy = _sample_halls(cursor, sample)
+            print(f"{'legacy':>8} {sample:>8} {elapsed:>9.3f} {sample / elapsed:>10.0f}")
+            print(f"legacy projected to {args.courses} courses: {elapsed * args.courses / sample:.0f} s")
+            if legacy != expected:
+                raise SystemExit("The legacy query matched different halls")
+
+if __name__ == '__main__':
+    main()
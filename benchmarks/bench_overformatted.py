@@ -0,0 +1,69 @@
+"""
+Benchmark parsing of workbooks with formatted-but-empty areas.
+
+Generates the same timetable several times, each copy formatted out to a
+larger empty area, and times parsing of the already loaded workbooks.
+Parse time should stay flat as the formatted area grows, since pages are
+bounded by the cells that hold content.
+
+Usage:
+    python -m benchmarks.bench_overformatted
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+from openpyxl import load_workbook
+from benchmarks.workbook_generator import generate_workbook
+
+# (rows, columns) the empty formatting reaches; (0, 0) is the plain workbook
+OVERFORMAT_SIZES = [(0, 0), (5000, 300), (50000, 1000), (200000, 16384)]
+
+def _time_parse(parser, workbook, jobs, repeat: int) -> float:
+    """Best-of-repeat time to parse the given sheets of a loaded workbook"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for job in jobs:
+            parser.parse_sheet(workbook, *job)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parsing of over-formatted workbooks")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    from CourseManageSystem import CourseManagementSystem
+    from LectureHallExtractor import LectureHallExtractor
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_name = os.path.join(temp_dir, 'benchmark.db')
+        course_parser = CourseManagementSystem(db_name)
+        hall_parser = LectureHallExtractor(db_name)
+
+        print(f"{'formatted area':>16} {'load (s)':>9} {'courses (s)':>12} {'halls (s)':>10}")
+        for rows, cols in OVERFORMAT_SIZES:
+            course_path = os.path.join(temp_dir, f'course_{rows}_{cols}.xlsx')
+            hall_path = os.path.join(temp_dir, f'halls_{rows}_{cols}.xlsx')
+            generate_workbook(course_path, overformat_rows=rows, overformat_cols=cols)
+            generate_workbook(hall_path, halls=True, overformat_rows=rows, overformat_cols=cols)
+
+            start = time.perf_counter()
+            course_workbook = load_workbook(filename=course_path)
+            hall_workbook = load_workbook(filename=hall_path)
+            load_time = time.perf_counter() - start
+
+            danh_muc_names, d_sheet_pairs = course_parser.plan_sheets(course_workbook.sheetnames)
+            course_jobs = [(name,) for name in danh_muc_names] + list(d_sheet_pairs)
+            hall_jobs = [(name,) for name in hall_parser.plan_sheets(hall_workbook.sheetnames)]
+
+            course_time = _time_parse(course_parser, course_workbook, course_jobs, args.repeat)
+            hall_time = _time_parse(hall_parser, hall_workbook, hall_jobs, args.repeat)
+            print(f"{rows:>8}x{cols:<7} {load_time:>9.2f} {course_time:>12.3f} {hall_time:>10.3f}")
+
+if __name__ == '__main__':
+    main()
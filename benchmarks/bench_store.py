@@ -0,0 +1,91 @@
+"""
+Compare insert throughput of the per-table store path and the bulk load.
+
+The per-table path is how imports stored rows before bulk loading: one
+execute_many() transaction per table with every index live, then the sheet
+fingerprints in transactions of their own. The bulk path is load_data() on
+both parsers inside a single DatabaseManager.bulk_load() transaction, fed
+by iterators. Hall matching is left out, it costs the same on both paths
+(see bench_match). Both run on a freshly reset scratch database with the
+same synthetic rows, and the resulting tables are checked to be identical.
+
+Usage:
+    python -m benchmarks.bench_store [--courses 200000] [--halls 100000] [--repeat 3]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from benchmarks.common import course_rows, detail_rows, hall_rows, make_parsers
+from utils.sheet_fingerprints import FingerprintCollector
+
+def _store_per_table(course_parser, hall_parser, courses, details, halls):
+    """The store path imports used before bulk loading"""
+    from CourseManageSystem import INSERT_COURSE_DETAILS_QUERY, INSERT_COURSES_QUERY
+    from LectureHallExtractor import INSERT_LECTURE_HALLS_QUERY
+    db_manager = course_parser.db_manager
+    db_manager.execute_many(INSERT_COURSE_DETAILS_QUERY, details)
+    db_manager.execute_many(INSERT_COURSES_QUERY, courses)
+    db_manager.execute_many(INSERT_LECTURE_HALLS_QUERY, halls)
+    with db_manager.get_connection() as conn:
+        for table_name, rows, origin_index in (('course_details', details, 5), ('courses', courses, 7)):
+            collector = FingerprintCollector(origin_index)
+            for _ in collector.track(rows):
+                pass
+            collector.record(conn.cursor(), table_name)
+    with db_manager.get_connection() as conn:
+        collector = FingerprintCollector(5)
+        for _ in collector.track(halls):
+            pass
+        collector.record(conn.cursor(), 'lecture_halls')
+
+def _store_bulk(course_parser, hall_parser, courses, details, halls):
+    with course_parser.db_manager.bulk_load() as cursor:
+        course_parser.load_data(cursor, iter(courses), iter(details))
+        hall_parser.load_data(cursor, iter(halls))
+
+def _table_contents(db_path: str):
+    connection = sqlite3.connect(db_path)
+    try:
+        return [connection.execute(f"SELECT * FROM {table} ORDER BY id").fetchall()
+                for table in ('courses', 'course_details', 'lecture_halls')]
+    finally:
+        connection.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare insert throughput of the per-table store path and the bulk load")
+    parser.add_argument('--courses', type=int, default=200000)
+    parser.add_argument('--details', type=int, default=20000)
+    parser.add_argument('--halls', type=int, default=100000)
+    parser.add_argument('--sheets', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    total_rows = args.courses + args.details + args.halls
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        course_parser, hall_parser = make_parsers(temp_dir)
+        db_manager = course_parser.db_manager
+
+        contents = {}
+        print(f"{'path':>10} {'time (s)':>9} {'rows/s':>10}")
+        for label, store in (('per-table', _store_per_table), ('bulk', _store_bulk)):
+            best = None
+            for _ in range(args.repeat):
+                db_manager.reset_database()
+                courses = list(course_rows(args.courses, args.sheets, seed=1))
+                details = list(detail_rows(args.details, args.sheets, seed=2))
+                halls = list(hall_rows(args.halls, args.sheets, seed=3))
+                start = time.perf_counter()
+                store(course_parser, hall_parser, courses, details, halls)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            contents[label] = _table_contents(db_manager.database_path)
+            print(f"{label:>10} {best:>9.2f} {total_rows / best:>10.0f}")
+
+        if contents['per-table'] != contents['bulk']:
+            raise SystemExit("The store paths produced different tables")
+        print(f"database size {os.path.getsize(db_manager.database_path) / (1024 * 1024):.1f} MB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""
+Time every import stage on synthetic workbooks at several scales.
+
+For each scale a course workbook and a lecture hall workbook with the same
+layout are generated, then these stages are timed (best of --repeat):
+
+    parse_courses   CourseManagementSystem.parse_excel
+    parse_halls     LectureHallExtractor.parse_excel
+    store_courses   CourseManagementSystem.store_data
+    store_halls     LectureHallExtractor.load_data in a bulk load
+    match_halls     LectureHallExtractor.match_halls
+    search_index    rebuild_search_index
+
+Results are printed as a table and, with --json, written as one JSON
+document so runs can be compared to track regressions.
+
+Usage:
+    python -m benchmarks.bench_suite [--scales small,medium] [--repeat 3] [--json results.json]
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from benchmarks.common import make_parsers
+from benchmarks.workbook_generator import generate_workbook
+from utils.course_search import rebuild_search_index
+from utils.workbook_backends import DEFAULT_BACKEND, WORKBOOK_BACKENDS
+
+# Workbook layouts per scale, passed to generate_workbook()
+SCALES = {
+    'small': dict(sheets=2, strips=3, bands=2, cols_per_strip=20, rows_per_band=12),
+    'medium': dict(sheets=4, strips=4, bands=6, cols_per_strip=30, rows_per_band=40),
+    'large': dict(sheets=8, strips=6, bands=10, cols_per_strip=30, rows_per_band=40, catalogue_courses=40),
+}
+
+def _best_time(stage, repeat: int):
+    """Run stage() repeat times, returning (last result, best seconds)"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = stage()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+def _peak_memory(stage) -> float:
+    """Peak traced memory in MB of one run of stage()"""
+    tracemalloc.start()
+    try:
+        stage()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+def run_scale(scale: str, temp_dir: str, backend: str, repeat: int, measure_memory: bool):
+    """Generate the workbooks of one scale and time every stage on them, returning result dicts"""
+    course_parser, hall_parser = make_parsers(temp_dir)
+    db_manager = course_parser.db_manager
+    db_manager.reset_database()
+
+    course_path = os.path.join(temp_dir, f'{scale}_course.xlsx')
+    hall_path = os.path.join(temp_dir, f'{scale}_halls.xlsx')
+    generate_workbook(course_path, **SCALES[scale])
+    generate_workbook(hall_path, halls=True, **SCALES[scale])
+
+    def parse_courses():
+        return course_parser.parse_excel(course_path, backend=backend)
+
+    def parse_halls():
+        return hall_parser.parse_excel(hall_path, backend=backend)
+
+    (courses, details), parse_courses_time = _best_time(parse_courses, repeat)
+    halls, parse_halls_time = _best_time(parse_halls, repeat)
+
+    def store_courses():
+        course_parser.store_data(courses, details)
+
+    def store_halls():
+        with db_manager.bulk_load(('lecture_halls',)) as cursor:
+            hall_parser.load_data(cursor, halls)
+
+    def match_halls():
+        with db_manager.get_connection() as conn:
+            return hall_parser.match_halls(conn.cursor())
+
+    def search_index():
+        with db_manager.get_connection() as conn:
+            return rebuild_search_index(conn.cursor())
+
+    _, store_courses_time = _best_time(store_courses, repeat)
+    _, store_halls_time = _best_time(store_halls, repeat)
+    match_stats, match_time = _best_time(match_halls, repeat)
+    _, search_index_time = _best_time(search_index, repeat)
+
+    stages = [
+        ('parse_courses', parse_courses_time, len(courses) + len(details), parse_courses, os.path.getsize(course_path)),
+        ('parse_halls', parse_halls_time, len(halls), parse_halls, os.path.getsize(hall_path)),
+        ('store_courses', store_courses_time, len(courses) + len(details), None, None),
+        ('store_halls', store_halls_time, len(halls), None, None),
+        ('match_halls', match_time, len(courses), None, None),
+        ('search_index', search_index_time, len(courses), None, None),
+    ]
+    results = []
+    for stage, seconds, rows, parse, file_size in stages:
+        result = {
+            'scale': scale,
+            'stage': stage,
+            'seconds': round(seconds, 6),
+            'rows': rows,
+            'rows_per_second': round(rows / seconds) if seconds else None,
+        }
+        if file_size is not None:
+            result['file_bytes'] = file_size
+        if measure_memory and parse is not None:
+            result['peak_mb'] = round(_peak_memory(parse), 2)
+        if stage == 'match_halls':
+            result['match_stats'] = match_stats
+        results.append(result)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Time every import stage on synthetic workbooks at several scales")
+    parser.add_argument('--scales', default='small,medium',
+                        help=f"Comma-separated scales out of {', '.join(SCALES)}")
+    parser.add_argument('--backend', default=DEFAULT_BACKEND, choices=list(WORKBOOK_BACKENDS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--memory', action='store_true', help="Also measure the peak traced memory of parsing")
+    parser.add_argument('--json', metavar='PATH', help="Write the results as JSON to PATH ('-' for stdout)")
+    args = parser.parse_args()
+
+    scales = [scale.strip() for scale in args.scales.split(',') if scale.strip()]
+    unknown = [scale for scale in scales if scale not in SCALES]
+    if unknown:
+        parser.error(f"Unknown scales: {', '.join(unknown)}")
+
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for scale in scales:
+            results.extend(run_scale(scale, temp_dir, args.backend, args.repeat, args.memory))
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'backend': args.backend,
+        'repeat': args.repeat,
+        'results': results,
+    }
+
+    # Keep stdout clean for the JSON when it goes there
+    table_out = sys.stderr if args.json == '-' else sys.stdout
+    print(f"{'scale':>8} {'stage':>14} {'time (s)':>9} {'rows':>8} {'rows/s':>9}", file=table_out)
+    for result in results:
+        print(f"{result['scale']:>8} {result['stage']:>14} {result['seconds']:>9.3f} {result['rows']:>8} "
+              f"{result['rows_per_second'] or 0:>9}", file=table_out)
+
+    if args.json == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Check that every workbook backend produces identical rows.
+
+Parses a set of synthetic workbooks, plus any course workbooks given on the
+command line, with each backend in utils.workbook_backends and compares the
+course, course detail and lecture hall rows against the full openpyxl
+backend. Exits with status 1 on the first mismatch.
+
+Usage:
+    python -m benchmarks.check_backend_parity [course.xlsx ...] [--halls halls.xlsx ...]
+"""
+import argparse
+import os
+import sys
+import tempfile
+from benchmarks.common import make_parsers
+from benchmarks.workbook_generator import generate_workbook
+from utils.workbook_backends import WORKBOOK_BACKENDS
+
+REFERENCE_BACKEND = 'openpyxl'
+
+# Synthetic layouts: the default workbook, a larger one and an over-formatted one
+SYNTHETIC_LAYOUTS = {
+    'default': {},
+    'large': dict(sheets=3, strips=4, bands=4, cols_per_strip=30, rows_per_band=30, seed=2),
+    'overformatted': dict(overformat_rows=3000, overformat_cols=200, seed=3),
+}
+
+def _first_difference(expected, actual) -> str:
+    """Describe the first row where two row lists differ"""
+    for index, (expected_row, actual_row) in enumerate(zip(expected, actual)):
+        if expected_row != actual_row:
+            return f"row {index}: expected {expected_row!r}, got {actual_row!r}"
+    return f"expected {len(expected)} rows, got {len(actual)}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that all workbook backends produce identical rows")
+    parser.add_argument('course_files', nargs='*', help="Extra course workbooks to check")
+    parser.add_argument('--halls', nargs='*', default=[], help="Extra lecture hall workbooks to check")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        course_parser, hall_parser = make_parsers(temp_dir)
+
+        course_files = list(args.course_files)
+        hall_files = list(args.halls)
+        for name, layout in SYNTHETIC_LAYOUTS.items():
+            course_path = os.path.join(temp_dir, f'course_{name}.xlsx')
+            hall_path = os.path.join(temp_dir, f'halls_{name}.xlsx')
+            generate_workbook(course_path, **layout)
+            generate_workbook(hall_path, halls=True, **layout)
+            course_files.append(course_path)
+            hall_files.append(hall_path)
+
+        failures = 0
+        checks = [(path, 'courses/details', course_parser.parse_excel) for path in course_files]
+        checks += [(path, 'halls', hall_parser.parse_excel) for path in hall_files]
+        for path, label, parse in checks:
+            expected = parse(path, backend=REFERENCE_BACKEND)
+            for backend in WORKBOOK_BACKENDS:
+                if backend == REFERENCE_BACKEND:
+                    continue
+                actual = parse(path, backend=backend)
+                if actual == expected:
+                    print(f"ok        {backend:>10} {label:<16} {os.path.basename(path)}")
+                    continue
+                failures += 1
+                # Course workbooks return (courses, details); compare the parts separately
+                pairs = zip(expected, actual) if isinstance(expected, tuple) else [(expected, actual)]
+                details = "; ".join(_first_difference(e, a) for e, a in pairs if e != a)
+                print(f"MISMATCH  {backend:>10} {label:<16} {os.path.basename(path)}: {details}")
+
+    if failures:
+        print(f"{failures} backend mismatches")
+        sys.exit(1)
+    print("All backends agree")
+
+if __name__ == '__main__':
+    main()
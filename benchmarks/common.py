@@ -0,0 +1,52 @@
+"""Helpers shared by the benchmark scripts"""
+import logging
+import os
+import random
+from datetime import datetime, timedelta
+from utils.parse_cache import ParseCache
+
+def make_parsers(temp_dir: str):
+    """
+    Create a course parser and a lecture hall parser on a scratch database.
+
+    The parse cache is disabled so every parse_excel() call measures the
+    parsers rather than a cache hit.
+    """
+    logging.disable(logging.CRITICAL)
+    from CourseManageSystem import CourseManagementSystem
+    from LectureHallExtractor import LectureHallExtractor
+
+    db_name = os.path.join(temp_dir, 'benchmark.db')
+    course_parser = CourseManagementSystem(db_name)
+    hall_parser = LectureHallExtractor(db_name)
+    for parser in (course_parser, hall_parser):
+        parser.parse_cache = ParseCache(os.path.join(temp_dir, 'parse_cache'), max_bytes=0)
+    return course_parser, hall_parser
+
+# Synthetic rows shaped like the parsers' output, spread over `sheets` d-sheets
+PERIODS = ['Sáng', 'Chiều', 'Tối']
+DAYS = ['T2', 'T3', 'T4', 'T5', 'T6', 'T7', 'CN']
+
+def course_rows(count: int, sheets: int, seed: int):
+    rng = random.Random(seed)
+    start = datetime(2024, 9, 2)
+    for index in range(count):
+        day = rng.randrange(240)
+        sheet = index * sheets // count + 1
+        yield [str(1000 + rng.randrange(500)), start + timedelta(days=day), str(day // 7 + 1),
+               f"L{rng.randrange(40)}", rng.choice(PERIODS), '', rng.choice(['K', None]),
+               f"d{sheet}", f"Danh mục d{sheet}", DAYS[day % 7]]
+
+def detail_rows(count: int, sheets: int, seed: int):
+    rng = random.Random(seed)
+    for index in range(count):
+        yield [str(1000 + index % 500), f"Course {index % 500}", f"Teacher {rng.randrange(80)}", None,
+               f"L{rng.randrange(40)}", f"Danh mục d{index * sheets // count + 1}"]
+
+def hall_rows(count: int, sheets: int, seed: int):
+    rng = random.Random(seed)
+    start = datetime(2024, 9, 2)
+    for index in range(count):
+        day = rng.randrange(240)
+        yield [f"H{rng.randrange(60)}", start + timedelta(days=day), str(day // 7 + 1),
+               f"L{rng.randrange(40)}", rng.choice(PERIODS), f"d{index * sheets // count + 1}"]
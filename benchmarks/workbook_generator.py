@@ -0,0 +1,179 @@
+"""
+Generate synthetic course and lecture hall workbooks for benchmarks.
+
+The workbooks follow the layout the parsers expect: each d-sheet is split
+into pages by row and column breaks, every page holds a bordered table with
+month/year, week and date header rows, and classes/periods in columns A-B.
+Course workbooks also get a "Danh mục" sheet per d-sheet. How full the
+tables are and how many merged ranges and comments they have is
+configurable, so the same layout can be generated at several densities.
+
+Usage:
+    python -m benchmarks.workbook_generator course.xlsx
+    python -m benchmarks.workbook_generator halls.xlsx --halls
+"""
+import argparse
+import random
+from openpyxl import Workbook
+from openpyxl.comments import Comment
+from openpyxl.styles import Border, PatternFill, Side
+from openpyxl.worksheet.pagebreak import Break
+
+THIN = Side(style='thin')
+FILL = PatternFill(fill_type='solid', start_color='FFFFFF00', end_color='FFFFFF00')
+
+def _add_danh_muc_sheet(workbook, sheet_num: int, rnd: random.Random, courses: int):
+    """Add the course catalogue sheet that belongs to d-sheet sheet_num"""
+    sheet = workbook.create_sheet(f"Danh mục d{sheet_num}")
+    sheet.cell(1, 1).value = "DANH MỤC"
+    sheet.cell(3, 1).border = Border(top=THIN)
+    for col, header in enumerate(["Mã", "Tên", "", "Lớp", "GV1", "GV2"], 1):
+        sheet.cell(3, col).value = header
+
+    row = 4
+    for k in range(courses):
+        sheet.cell(row, 1).value = str(1000 + k)
+        sheet.cell(row, 2).value = f"Course {k}"
+        sheet.cell(row, 4).value = ", ".join(f"L{j}" for j in range(rnd.randint(1, 3)))
+        sheet.cell(row, 5).value = f"T{k % 7}"
+        sheet.cell(row, 6).value = f"U{k % 5}" if k % 2 else None
+        row += 1
+    sheet.cell(row - 1, 1).border = Border(bottom=THIN)
+    sheet.merge_cells(start_row=row - 3, start_column=5, end_row=row - 2, end_column=5)
+
+def _add_d_sheet(workbook, sheet_num: int, rnd: random.Random, strips: int, bands: int,
+                 cols_per_strip: int, rows_per_band: int, halls: bool,
+                 fill_rate: float, merge_rate: float, comment_rate: float):
+    """Add a timetable d-sheet of strips x bands pages"""
+    sheet = workbook.create_sheet(f"d{sheet_num}")
+    for band in range(bands):
+        top = band * rows_per_band + 2
+        bottom = top + rows_per_band - 3
+        for strip in range(strips):
+            start_col = 1 if strip == 0 else 3 + strip * cols_per_strip
+            end_col = 2 + (strip + 1) * cols_per_strip
+            sheet.cell(top, start_col).border = Border(top=THIN)
+            sheet.cell(bottom, start_col).border = Border(bottom=THIN)
+            sheet.cell(top - 1, start_col).value = "header"
+
+            # Month/year cells are merged per week; the first week of a later
+            # strip is left empty so the month carries over from the previous page
+            col = max(3, start_col)
+            chunk = 0
+            while col <= end_col:
+                width = min(7, end_col - col + 1)
+                if not (strip > 0 and chunk == 0):
+                    sheet.cell(top, col).value = f"THÁNG {9 + chunk % 3}-2024"
+                    if width > 1:
+                        sheet.merge_cells(start_row=top, start_column=col, end_row=top, end_column=col + width - 1)
+                for k in range(width):
+                    sheet.cell(top + 1, col + k).value = f"{(col + k) // 7 + 1}"
+                    if (col + k) % 9 != 0:
+                        day = (col + k) % 28 + 1
+                        sheet.cell(top + 2, col + k).value = day if (col + k) % 5 else float(day)
+                col += width
+                chunk += 1
+
+            if strip == 0:
+                for row in range(top + 3, bottom + 1):
+                    sheet.cell(row, 2).value = "Sáng" if row % 2 else "Chiều"
+                    if (row - top - 3) % 3 == 0:
+                        sheet.cell(row, 1).value = f"L{(row // 3) % 4}"
+                        if row + 2 <= bottom and rnd.random() < 0.7:
+                            sheet.merge_cells(start_row=row, start_column=1, end_row=row + 2, end_column=1)
+
+            for row in range(top + 3, bottom + 1):
+                col = max(3, start_col)
+                while col <= end_col:
+                    if rnd.random() < fill_rate:
+                        if halls:
+                            value = f"H{rnd.randint(100, 120)}"
+                        else:
+                            value = str(1000 + rnd.randint(0, 40)) + rnd.choice(["", "", "H", "k"])
+                        sheet.cell(row, col).value = value
+                        if not halls and rnd.random() < comment_rate:
+                            sheet.cell(row, col).comment = Comment(f"note {row},{col}  ", "benchmark")
+                        if rnd.random() < merge_rate and col + 1 <= end_col:
+                            sheet.merge_cells(start_row=row, start_column=col, end_row=row, end_column=col + 1)
+                            col += 1
+                    col += 1
+
+        if band < bands - 1:
+            sheet.row_breaks.append(Break(id=(band + 1) * rows_per_band))
+    for strip in range(strips - 1):
+        sheet.col_breaks.append(Break(id=2 + (strip + 1) * cols_per_strip))
+    return sheet
+
+def _overformat(sheet, rows: int, cols: int):
+    """Give empty cells formatting out to rows x cols, as Excel does for formatted whole ranges"""
+    first_row = sheet.max_row + 1
+    first_col = sheet.max_column + 1
+    for row in range(first_row, rows + 1):
+        sheet.cell(row, 1).fill = FILL
+    for col in range(first_col, cols + 1):
+        sheet.cell(1, col).fill = FILL
+    if rows and cols:
+        sheet.cell(rows, cols).fill = FILL
+
+def generate_workbook(path: str, sheets: int = 2, strips: int = 3, bands: int = 2,
+                      cols_per_strip: int = 20, rows_per_band: int = 12, halls: bool = False,
+                      overformat_rows: int = 0, overformat_cols: int = 0, catalogue_courses: int = 30,
+                      fill_rate: float = 0.5, merge_rate: float = 0.15, comment_rate: float = 0.2, seed: int = 1):
+    """
+    Write a synthetic course (or lecture hall) workbook to path.
+
+    Args:
+        path: Output .xlsx path
+        sheets: Number of d-sheets
+        strips: Pages across each d-sheet (separated by column breaks)
+        bands: Pages down each d-sheet (separated by row breaks)
+        cols_per_strip: Date columns per page
+        rows_per_band: Rows per page, including the header rows
+        halls: Write hall symbols instead of courses and skip the Danh mục sheets
+        overformat_rows: Format empty cells down to this row of every d-sheet
+        overformat_cols: Format empty cells out to this column of every d-sheet
+        catalogue_courses: Courses listed on each Danh mục sheet
+        fill_rate: Share of timetable cells that hold a course or hall
+        merge_rate: Share of filled cells merged with the cell to their right
+        comment_rate: Share of filled course cells that carry a comment
+        seed: Random seed, so the same arguments give the same workbook
+    """
+    rnd = random.Random(seed)
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for sheet_num in range(1, sheets + 1):
+        if not halls:
+            _add_danh_muc_sheet(workbook, sheet_num, rnd, catalogue_courses)
+        sheet = _add_d_sheet(workbook, sheet_num, rnd, strips, bands, cols_per_strip, rows_per_band, halls,
+                             fill_rate, merge_rate, comment_rate)
+        if overformat_rows or overformat_cols:
+            _overformat(sheet, overformat_rows, overformat_cols)
+    workbook.save(path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic course or lecture hall workbook")
+    parser.add_argument('path')
+    parser.add_argument('--halls', action='store_true', help="Generate a lecture hall workbook")
+    parser.add_argument('--sheets', type=int, default=2)
+    parser.add_argument('--strips', type=int, default=3)
+    parser.add_argument('--bands', type=int, default=2)
+    parser.add_argument('--cols-per-strip', type=int, default=20)
+    parser.add_argument('--rows-per-band', type=int, default=12)
+    parser.add_argument('--overformat-rows', type=int, default=0)
+    parser.add_argument('--overformat-cols', type=int, default=0)
+    parser.add_argument('--catalogue-courses', type=int, default=30)
+    parser.add_argument('--fill-rate', type=float, default=0.5)
+    parser.add_argument('--merge-rate', type=float, default=0.15)
+    parser.add_argument('--comment-rate', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    generate_workbook(args.path, sheets=args.sheets, strips=args.strips, bands=args.bands,
+                      cols_per_strip=args.cols_per_strip, rows_per_band=args.rows_per_band,
+                      halls=args.halls, overformat_rows=args.overformat_rows,
+                      overformat_cols=args.overformat_cols, catalogue_courses=args.catalogue_courses,
+                      fill_rate=args.fill_rate, merge_rate=args.merge_rate, comment_rate=args.comment_rate,
+                      seed=args.seed)
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 import os
 import sys
 import subprocess
+import multiprocessing
 from splash import SplashScreen
 import time
 
@@ -47,4 +48,6 @@ def run_app():
         raise
 
 if __name__ == '__main__':
+    # Needed for the process-pool import mode in the frozen executable
+    multiprocessing.freeze_support()
     run_app() 
\ No newline at end of file
@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify
 import logging
-from datetime import datetime
+from utils.calendar_utils import format_epoch_day, parse_epoch_day
+from utils.course_search import SEARCH_TABLE, build_match_query
 from utils.db_manager import DatabaseManager
 import re
 
@@ -8,38 +9,289 @@ logger = logging.getLogger(__name__)
 
 course_bp = Blueprint('course_bp', __name__)
 
+# Columns of courses filtered by the values /api/filter-options lists for them
+FACET_FIELDS = ['week', 'class', 'period', 'hall', 'day_of_week']
+
+# Sort fields of /api/courses and the indexed columns they sort by
+SORT_COLUMNS = {
+    'course_symbol': 'c.course_symbol',
+    'date': 'c.course_day',
+    'week': 'c.week_number',
+    'class': 'c.class',
+    'period': 'c.period',
+    'hall': 'c.hall',
+    'day_of_week': 'c.weekday',
+}
+
+# Courses the routes list with their details, in the column order _course_to_dict
+# converts. A course has the name and teachers of the first detail row with its
+# symbol and class, looked up through idx_course_details_symbol_class
+COURSE_QUERY = '''
+    SELECT 
+        c.course_symbol, 
+        c.course_day, 
+        c.week, 
+        c.class, 
+        c.period, 
+        c.comment, 
+        c.event, 
+        c.data_origin, 
+        c.detail_origin,
+        c.hall,
+        c.day_of_week,
+        d.course_name,
+        d.teacher_1,
+        d.teacher_2
+    FROM courses c
+    LEFT JOIN course_details d ON d.id = (
+        SELECT MIN(cd.id) FROM course_details cd
+        WHERE cd.course_symbol = c.course_symbol AND cd.class = c.class
+    )
+'''
+
+# Courses are only listed if their details give them a name, so courses
+# without a detail row are left out, as they always were
+NAMED_COURSE_CLAUSE = "TRIM(d.course_name, char(32, 9, 10, 13)) <> ''"
+
+def _facet_clause(column, values, exact):
+    """
+    Build a WHERE clause matching any of the values, with its params.
+
+    Exact matching is an IN list the column's index serves; otherwise each
+    value matches as a substring, which has to scan the table.
+    """
+    if exact:
+        return f"{column} IN ({','.join(['?'] * len(values))})", list(values)
+    return f"({' OR '.join([f'{column} LIKE ?'] * len(values))})", [f"%{value}%" for value in values]
+
+def _search_join(search):
+    """
+    Build a JOIN keeping the courses c that match a search box entry, with its params.
+
+    The matches come from the full-text search table, which also covers
+    course names and teachers, with their relevance as s.rank. An entry
+    without words gives no JOIN.
+    """
+    match_query = build_match_query(search)
+    if match_query is None:
+        return '', []
+    return f" JOIN (SELECT rowid, rank FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH ?) s ON s.rowid = c.id", [match_query]
+
+def _course_to_dict(course):
+    """Convert a row of COURSE_QUERY for the JSON response"""
+    # Format the stored day number, there are only a few hundred distinct ones
+    formatted_date = format_epoch_day(course[1]) if course[1] is not None else ''
+    
+    # Combine symbol with event if it exists
+    symbol = course[0] if course[0] is not None else ''
+    event = course[6] if course[6] is not None else ''
+    combined_symbol = f"{symbol}{event}" if event else symbol
+    
+    return {
+        'course_symbol': combined_symbol,
+        'date': formatted_date,
+        'week': course[2] if course[2] is not None else '',
+        'class': course[3] if course[3] is not None else '',
+        'period': course[4] if course[4] is not None else '',
+        'comment': course[5] if course[5] is not None else '',
+        'origin': course[7] if course[7] is not None else '',
+        'detail_origin': course[8] if course[8] is not None else '',
+        'hall': course[9] if course[9] is not None else '',
+        'day_of_week': course[10] if course[10] is not None else '',
+        'course_name': course[11],
+        'teacher_1': course[12] if course[12] is not None else '',
+        'teacher_2': course[13] if course[13] is not None else ''
+    }
+
+def _filter_values(request, param):
+    """Get the distinct values given for a filter, in a fixed order"""
+    return sorted(set(request.args.getlist(param)))
+
+def _parse_match_mode(request):
+    """Whether facet filters match exactly, the default, or as substrings with match=contains"""
+    match = request.args.get('match', 'exact')
+    if match not in ('exact', 'contains'):
+        raise ValueError(f"Unknown match mode: {match}")
+    return match == 'exact'
+
+def _parse_course_filters(request):
+    """
+    Get the filters of /api/courses and /api/courses/insights from the request.
+
+    Values are sorted and deduplicated, so the same filter always builds
+    the same query, and /api/courses reuses its cached total count. Dates
+    become day numbers.
+
+    Raises ValueError with a message for the client if a filter is invalid.
+    """
+    # Group by field - same field values use OR, different fields use AND
+    filter_groups = {}
+    for param in FACET_FIELDS:
+        field_values = _filter_values(request, param)
+        if field_values:
+            filter_groups[param] = field_values
+    
+    try:
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        start_day = parse_epoch_day(start_date) if start_date else None
+        end_day = parse_epoch_day(end_date) if end_date else None
+    except ValueError:
+        raise ValueError('Dates must be in YYYY-MM-DD format')
+    
+    return {
+        'groups': filter_groups,
+        'exact': _parse_match_mode(request),
+        'course_symbol': _filter_values(request, 'course_symbol'),  # For symbol_numeric
+        'event': _filter_values(request, 'event'),  # For symbol_suffix
+        'teacher_1': _filter_values(request, 'teacher_1'),  # For teacher filter
+        'search': request.args.get('search'),
+        'start_day': start_day,
+        'end_day': end_day,
+    }
+
+def _build_course_query(db_manager, filters):
+    """
+    Build the query selecting the courses that match parsed filters.
+
+    Both routes list courses through this, so the rows of /api/courses, the
+    total counted for them and the insights always agree.
+
+    Returns:
+        tuple: (base_query, where_clauses, params, ranked), ranked telling
+            whether the search joined full-text matches, with their relevance as s.rank
+    """
+    base_query = COURSE_QUERY
+    where_clauses = [NAMED_COURSE_CLAUSE]
+    params = []
+    
+    # Handle date range filters as a range of days, both ends included
+    if filters['start_day'] is not None:
+        where_clauses.append("c.course_day >= ?")
+        params.append(filters['start_day'])
+    if filters['end_day'] is not None:
+        where_clauses.append("c.course_day <= ?")
+        params.append(filters['end_day'])
+    
+    # Handle standard filters - same field values use OR, different fields use AND
+    for field, values in filters['groups'].items():
+        clause, clause_params = _facet_clause(f"c.{field}", values, filters['exact'])
+        where_clauses.append(clause)
+        params.extend(clause_params)
+    
+    # Handle special case: symbol_numeric filter (course_symbol)
+    if filters['course_symbol']:
+        symbol_clauses = []
+        for course_symbol in filters['course_symbol']:
+            symbol_clauses.append("c.course_symbol LIKE ?")
+            params.append(f"{course_symbol}%")
+        
+        where_clauses.append(f"({' OR '.join(symbol_clauses)})")
+    
+    # Handle special case: symbol_suffix filter (event)
+    if filters['event']:
+        event_clauses = []
+        
+        for event in filters['event']:
+            # For event filter, we need to match course symbols that end with the specific letter
+            # SQLite doesn't always support REGEXP, so we'll use LIKE with a specific pattern
+            
+            # Special handling for "H" and "K" suffixes, which are common
+            if event.upper() in ["H", "K"]:
+                # Extract all course symbols ending with this suffix
+                extract_query = f"SELECT DISTINCT course_symbol FROM courses WHERE course_symbol LIKE ?"
+                extract_params = [f"%{event}"]
+                filtered_symbols = db_manager.execute_query(extract_query, extract_params, fetch_all=True)
+                
+                # Validate that the symbols actually end with the suffix and not just contain it
+                suffix_symbols = []
+                for symbol_row in filtered_symbols:
+                    symbol = symbol_row[0]
+                    if symbol and re.search(r'\d+' + re.escape(event) + '$', symbol, re.IGNORECASE):
+                        suffix_symbols.append(symbol)
+                
+                # If we found matching symbols, add them to the filter
+                if suffix_symbols:
+                    # Create placeholders for all matching symbols
+                    placeholders = ','.join(['?'] * len(suffix_symbols))
+                    event_clauses.append(f"(c.course_symbol IN ({placeholders}) OR c.event = ?)")
+                    params.extend(suffix_symbols)  # Add all symbols to params
+                    params.append(event)           # Also match the event field
+                else:
+                    # Fallback if no specific symbols found
+                    event_clauses.append("(c.course_symbol LIKE ? OR c.event = ?)")
+                    params.append(f"%{event}")  # Use % to match any prefix
+                    params.append(event)        # Also match the event field
+            else:
+                # For other event types, use the simple pattern
+                event_clauses.append("(c.course_symbol LIKE ? OR c.event = ?)")
+                params.append(f"%{event}")  # Use % to match any prefix
+                params.append(event)        # Also match the event field
+        
+        if event_clauses:
+            where_clauses.append(f"({' OR '.join(event_clauses)})")
+    
+    # Handle special case: teacher filter
+    if filters['teacher_1']:
+        # A teacher matches as either teacher of a course_details row, like the
+        # teacher options list them; as a semi-join, courses with several
+        # detail rows are listed once
+        first_clause, first_params = _facet_clause("teacher_1", filters['teacher_1'], filters['exact'])
+        second_clause, second_params = _facet_clause("teacher_2", filters['teacher_1'], filters['exact'])
+        where_clauses.append(
+            f"(c.course_symbol, c.class) IN (SELECT course_symbol, class FROM course_details "
+            f"WHERE {first_clause} OR {second_clause})"
+        )
+        params.extend(first_params + second_params)
+    
+    # Handle search query: full-text search
+    search = filters['search']
+    ranked = False
+    if search and db_manager.table_exists(SEARCH_TABLE):
+        search_join, search_params = _search_join(search)
+        base_query += search_join
+        params[:0] = search_params  # The JOIN comes before the WHERE clauses
+        ranked = bool(search_join)
+    # Without FTS5, search across multiple fields
+    elif search:
+        search_clauses = [
+            "c.course_symbol LIKE ?",
+            "c.week LIKE ?",
+            "c.class LIKE ?",
+            "c.period LIKE ?",
+            "c.comment LIKE ?",
+            "c.hall LIKE ?",
+            "c.day_of_week LIKE ?",
+        ]
+        where_clauses.append(f"({' OR '.join(search_clauses)})")
+        search_param = f"%{search}%"
+        params.extend([search_param] * len(search_clauses))
+    
+    return base_query, where_clauses, params, ranked
+
 @course_bp.route('/api/courses', methods=['GET'])
 def get_courses():
     try:
         from app import cms  # Import here to avoid circular imports
         from flask import request
         
-        # Get pagination parameters
+        # Get pagination parameters; 'after' is the next_cursor of the previous page
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 100, type=int)
+        after = request.args.get('after')
         
-        # Get filter parameters - group by field
-        filter_groups = {}
-        for param in ['week', 'class', 'period', 'hall', 'day_of_week']:
-            field_values = request.args.getlist(param)
-            if field_values:
-                filter_groups[param] = field_values
-        
-        # Get special filter parameters
-        course_symbol_values = request.args.getlist('course_symbol')  # For symbol_numeric
-        event_values = request.args.getlist('event')  # For symbol_suffix
-        teacher_values = request.args.getlist('teacher_1')  # For teacher filter
-        
-        # Get search query parameter
-        search = request.args.get('search')
-        
-        # Get date range parameters
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
+        # Get filter parameters
+        try:
+            filters = _parse_course_filters(request)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Get sort parameters
         sort_field = request.args.get('sort_field')
         sort_direction = request.args.get('sort_direction', 'asc')
+        if sort_field and sort_field not in SORT_COLUMNS:
+            return jsonify({'error': f'Cannot sort by {sort_field}'}), 400
+        sort_column = SORT_COLUMNS.get(sort_field)
         
         # Get the database manager
         db_manager = DatabaseManager(cms.db_name)
@@ -49,233 +301,31 @@ def get_courses():
         if not hall_column_exists:
             db_manager.add_column_if_not_exists('courses', 'hall', 'TEXT')
         
-        # Base query to select courses
-        base_query = '''
-            SELECT 
-                c.course_symbol, 
-                c.course_datetime, 
-                c.week, 
-                c.class, 
-                c.period, 
-                c.comment, 
-                c.event, 
-                c.data_origin, 
-                c.detail_origin,
-                c.hall,
-                c.day_of_week
-            FROM courses c
-        '''
-        
-        # Build where clauses and params
-        where_clauses = []
-        params = []
-        
-        # Handle date range filters
-        if start_date:
-            where_clauses.append("c.course_datetime >= ?")
-            params.append(start_date)
-        if end_date:
-            where_clauses.append("c.course_datetime <= ?")
-            params.append(end_date + " 23:59:59")  # Include the entire day
-        
-        # Handle standard filters - same field values use OR, different fields use AND
-        for field, values in filter_groups.items():
-            field_clauses = []
-            for value in values:
-                field_clauses.append(f"c.{field} LIKE ?")
-                params.append(f"%{value}%")
-            
-            if field_clauses:
-                where_clauses.append(f"({' OR '.join(field_clauses)})")
-        
-        # Handle special case: symbol_numeric filter (course_symbol)
-        if course_symbol_values:
-            symbol_clauses = []
-            for course_symbol in course_symbol_values:
-                symbol_clauses.append("c.course_symbol LIKE ?")
-                params.append(f"{course_symbol}%")
-            
-            where_clauses.append(f"({' OR '.join(symbol_clauses)})")
+        # Build the query; a search lists the best matches first unless sorted otherwise
+        base_query, where_clauses, params, ranked = _build_course_query(db_manager, filters)
+        if ranked and not sort_column:
+            sort_column = 's.rank'
         
-        # Handle special case: symbol_suffix filter (event)
-        if event_values:
-            event_clauses = []
-            
-            for event in event_values:
-                # For event filter, we need to match course symbols that end with the specific letter
-                # SQLite doesn't always support REGEXP, so we'll use LIKE with a specific pattern
-                
-                # Special handling for "H" and "K" suffixes, which are common
-                if event.upper() in ["H", "K"]:
-                    # Extract all course symbols ending with this suffix
-                    extract_query = f"SELECT DISTINCT course_symbol FROM courses WHERE course_symbol LIKE ?"
-                    extract_params = [f"%{event}"]
-                    filtered_symbols = db_manager.execute_query(extract_query, extract_params, fetch_all=True)
-                    
-                    # Validate that the symbols actually end with the suffix and not just contain it
-                    suffix_symbols = []
-                    for symbol_row in filtered_symbols:
-                        symbol = symbol_row[0]
-                        if symbol and re.search(r'\d+' + re.escape(event) + '$', symbol, re.IGNORECASE):
-                            suffix_symbols.append(symbol)
-                    
-                    # If we found matching symbols, add them to the filter
-                    if suffix_symbols:
-                        # Create placeholders for all matching symbols
-                        placeholders = ','.join(['?'] * len(suffix_symbols))
-                        event_clauses.append(f"(c.course_symbol IN ({placeholders}) OR c.event = ?)")
-                        params.extend(suffix_symbols)  # Add all symbols to params
-                        params.append(event)           # Also match the event field
-                    else:
-                        # Fallback if no specific symbols found
-                        event_clauses.append("(c.course_symbol LIKE ? OR c.event = ?)")
-                        params.append(f"%{event}")  # Use % to match any prefix
-                        params.append(event)        # Also match the event field
-                else:
-                    # For other event types, use the simple pattern
-                    event_clauses.append("(c.course_symbol LIKE ? OR c.event = ?)")
-                    params.append(f"%{event}")  # Use % to match any prefix
-                    params.append(event)        # Also match the event field
-            
-            if event_clauses:
-                where_clauses.append(f"({' OR '.join(event_clauses)})")
-        
-        # Handle special case: teacher filter
-        if teacher_values:
-            # Need to check only teacher_1 in course_details table
-            # This requires a JOIN with the course_details table
-            base_query = '''
-                SELECT 
-                    c.course_symbol, 
-                    c.course_datetime, 
-                    c.week, 
-                    c.class, 
-                    c.period, 
-                    c.comment, 
-                    c.event, 
-                    c.data_origin, 
-                    c.detail_origin,
-                    c.hall,
-                    c.day_of_week
-                FROM courses c
-                JOIN course_details cd ON c.course_symbol = cd.course_symbol AND c.class = cd.class
-            '''
-            
-            teacher_clauses = []
-            for teacher in teacher_values:
-                teacher_clauses.append("cd.teacher_1 LIKE ?")
-                params.append(f"%{teacher}%")
-            
-            if teacher_clauses:
-                where_clauses.append(f"({' OR '.join(teacher_clauses)})")
-        
-        # Handle search query across multiple fields
-        if search:
-            search_clauses = [
-                "c.course_symbol LIKE ?",
-                "c.week LIKE ?",
-                "c.class LIKE ?",
-                "c.period LIKE ?",
-                "c.comment LIKE ?",
-                "c.hall LIKE ?",
-                "c.day_of_week LIKE ?",
-            ]
-            where_clauses.append(f"({' OR '.join(search_clauses)})")
-            search_param = f"%{search}%"
-            params.extend([search_param] * len(search_clauses))
-        
-        # Execute paginated query
+        # Execute paginated query, seeking past the previous page if there is a cursor
         logger.debug(f"Executing paginated query with params: {params}")
-        courses, total_count = db_manager.execute_paginated_query(
-            base_query, 
-            where_clauses, 
-            params, 
-            sort_field, 
-            sort_direction, 
-            page, 
-            per_page
-        )
+        try:
+            courses, total_count, next_cursor = db_manager.execute_keyset_query(
+                base_query,
+                where_clauses,
+                params,
+                sort_column,
+                sort_direction.lower() == 'desc',
+                'c.id',
+                per_page,
+                after,
+                page
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         logger.debug(f"Found {len(courses)} courses for page {page} of {total_count} total")
         
-        # Get course details only for the courses we've retrieved
-        if courses:
-            # Extract course symbols and classes for joining with details
-            course_symbols = [course[0] for course in courses if course[0]]
-            course_classes = [course[3] for course in courses if course[3]]
-            
-            if course_symbols and course_classes:
-                # Construct query to get only the needed details
-                placeholders_symbols = ','.join(['?'] * len(course_symbols))
-                placeholders_classes = ','.join(['?'] * len(course_classes))
-                
-                details_query = f'''
-                    SELECT course_symbol, course_name, teacher_1, teacher_2, class 
-                    FROM course_details 
-                    WHERE course_symbol IN ({placeholders_symbols})
-                    AND class IN ({placeholders_classes})
-                '''
-                
-                details_params = course_symbols + course_classes
-                details = db_manager.execute_query(details_query, details_params, fetch_all=True)
-                logger.debug(f"Found {len(details)} matching course details")
-            else:
-                details = []
-        else:
-            details = []
-        
         # Convert to list of dictionaries for JSON response
-        course_list = []
-        for course in courses:
-            # Format the date if it exists
-            date_str = course[1] if course[1] is not None else ''
-            formatted_date = ''
-            if date_str:
-                try:
-                    date_obj = datetime.strptime(str(date_str).strip(), '%Y-%m-%d %H:%M:%S')
-                    formatted_date = date_obj.strftime('%d/%m/%Y')
-                except Exception as e:
-                    logger.error(f"Error formatting date {date_str}: {str(e)}")
-                    formatted_date = date_str
-            
-            # Combine symbol with event if it exists
-            symbol = course[0] if course[0] is not None else ''
-            event = course[6] if course[6] is not None else ''
-            combined_symbol = f"{symbol}{event}" if event else symbol
-            
-            # Create base course dictionary
-            course_dict = {
-                'course_symbol': combined_symbol,
-                'date': formatted_date,
-                'week': course[2] if course[2] is not None else '',
-                'class': course[3] if course[3] is not None else '',
-                'period': course[4] if course[4] is not None else '',
-                'comment': course[5] if course[5] is not None else '',
-                'origin': course[7] if course[7] is not None else '',
-                'detail_origin': course[8] if course[8] is not None else '',
-                'hall': course[9] if len(course) > 9 and course[9] is not None else '',
-                'day_of_week': course[10] if len(course) > 10 and course[10] is not None else ''
-            }
-            
-            # Find matching details
-            matched = False
-            for detail in details:
-                if detail[0] == course[0]:
-                    # Check if the class matches
-                    detail_class = detail[4] if detail[4] is not None else ''
-                    course_class = course[3] if course[3] is not None else ''
-                    
-                    if detail_class == course_class:  # Only match if classes are the same
-                        course_dict.update({
-                            'course_name': detail[1],
-                            'teacher_1': detail[2] if detail[2] is not None else '',
-                            'teacher_2': detail[3] if detail[3] is not None else ''
-                        })
-                        matched = True
-                        break
-            
-            # Add the course to the list if it has a name or if we're not filtering by name
-            if matched and detail[1] and detail[1].strip():
-                course_list.append(course_dict)
+        course_list = [_course_to_dict(course) for course in courses]
         
         # Add metadata for pagination
         response_data = {
@@ -284,7 +334,8 @@ def get_courses():
                 'total': total_count,
                 'page': page,
                 'per_page': per_page,
-                'pages': (total_count + per_page - 1) // per_page
+                'pages': (total_count + per_page - 1) // per_page,
+                'next_cursor': next_cursor
             }
         }
         
@@ -430,132 +481,17 @@ def get_courses_for_insights():
         from app import cms  # Import here to avoid circular imports
         from flask import request
         
-        # Get filter parameters - group by field
-        filter_groups = {}
-        for param in ['week', 'class', 'period', 'hall', 'day_of_week']:
-            field_values = request.args.getlist(param)
-            if field_values:
-                filter_groups[param] = field_values
-        
-        # Get special filter parameters
-        course_symbol_values = request.args.getlist('course_symbol')  # For symbol_numeric
-        event_values = request.args.getlist('event')  # For symbol_suffix
-        teacher_values = request.args.getlist('teacher_1')  # For teacher filter
-        
-        # Get search query parameter
-        search = request.args.get('search')
-        
-        # Get date range parameters
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
+        # Get filter parameters
+        try:
+            filters = _parse_course_filters(request)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Get the database manager
         db_manager = DatabaseManager(cms.db_name)
         
-        # Base query to select courses
-        base_query = '''
-            SELECT 
-                c.course_symbol, 
-                c.course_datetime, 
-                c.week, 
-                c.class, 
-                c.period, 
-                c.comment, 
-                c.event, 
-                c.data_origin, 
-                c.detail_origin,
-                c.hall,
-                c.day_of_week
-            FROM courses c
-        '''
-        
-        # Build where clauses and params
-        where_clauses = []
-        params = []
-        
-        # Handle date range filters
-        if start_date:
-            where_clauses.append("c.course_datetime >= ?")
-            params.append(start_date)
-        if end_date:
-            where_clauses.append("c.course_datetime <= ?")
-            params.append(end_date + " 23:59:59")  # Include the entire day
-        
-        # Handle standard filters - same field values use OR, different fields use AND
-        for field, values in filter_groups.items():
-            field_clauses = []
-            for value in values:
-                field_clauses.append(f"c.{field} LIKE ?")
-                params.append(f"%{value}%")
-            
-            if field_clauses:
-                where_clauses.append(f"({' OR '.join(field_clauses)})")
-        
-        # Handle special case: symbol_numeric filter (course_symbol)
-        if course_symbol_values:
-            symbol_clauses = []
-            for course_symbol in course_symbol_values:
-                symbol_clauses.append("c.course_symbol LIKE ?")
-                params.append(f"{course_symbol}%")
-            
-            where_clauses.append(f"({' OR '.join(symbol_clauses)})")
-        
-        # Handle special case: symbol_suffix filter (event)
-        if event_values:
-            event_clauses = []
-            
-            for event in event_values:
-                # For event filter, we need to match course symbols that end with the specific letter
-                event_clauses.append("(c.course_symbol LIKE ? OR c.event = ?)")
-                params.append(f"%{event}")  # Use % to match any prefix
-                params.append(event)        # Also match the event field
-            
-            if event_clauses:
-                where_clauses.append(f"({' OR '.join(event_clauses)})")
-        
-        # Handle special case: teacher filter
-        if teacher_values:
-            # Need to check only teacher_1 in course_details table
-            # This requires a JOIN with the course_details table
-            base_query = '''
-                SELECT 
-                    c.course_symbol, 
-                    c.course_datetime, 
-                    c.week, 
-                    c.class, 
-                    c.period, 
-                    c.comment, 
-                    c.event, 
-                    c.data_origin, 
-                    c.detail_origin,
-                    c.hall,
-                    c.day_of_week
-                FROM courses c
-                JOIN course_details cd ON c.course_symbol = cd.course_symbol AND c.class = cd.class
-            '''
-            
-            teacher_clauses = []
-            for teacher in teacher_values:
-                teacher_clauses.append("cd.teacher_1 LIKE ?")
-                params.append(f"%{teacher}%")
-            
-            if teacher_clauses:
-                where_clauses.append(f"({' OR '.join(teacher_clauses)})")
-        
-        # Handle search query across multiple fields
-        if search:
-            search_clauses = [
-                "c.course_symbol LIKE ?",
-                "c.week LIKE ?",
-                "c.class LIKE ?",
-                "c.period LIKE ?",
-                "c.comment LIKE ?",
-                "c.hall LIKE ?",
-                "c.day_of_week LIKE ?",
-            ]
-            where_clauses.append(f"({' OR '.join(search_clauses)})")
-            search_param = f"%{search}%"
-            params.extend([search_param] * len(search_clauses))
+        # Build the same query /api/courses pages through
+        base_query, where_clauses, params, _ = _build_course_query(db_manager, filters)
         
         # Construct the full query
         query = base_query
@@ -569,85 +505,8 @@ def get_courses_for_insights():
         courses = db_manager.execute_query(query, params, fetch_all=True)
         logger.debug(f"Found {len(courses)} courses for insights")
         
-        # Get course details for all courses
-        if courses:
-            # Extract all course symbols and classes
-            course_symbols = list(set([course[0] for course in courses if course[0]]))
-            course_classes = list(set([course[3] for course in courses if course[3]]))
-            
-            if course_symbols and course_classes:
-                # Get course details with a separate query
-                placeholders_symbols = ','.join(['?'] * len(course_symbols))
-                placeholders_classes = ','.join(['?'] * len(course_classes))
-                
-                details_query = f'''
-                    SELECT course_symbol, course_name, teacher_1, teacher_2, class 
-                    FROM course_details 
-                    WHERE course_symbol IN ({placeholders_symbols})
-                    AND class IN ({placeholders_classes})
-                '''
-                
-                details_params = course_symbols + course_classes
-                details = db_manager.execute_query(details_query, details_params, fetch_all=True)
-                logger.debug(f"Found {len(details)} matching course details for insights")
-            else:
-                details = []
-        else:
-            details = []
-        
         # Convert to list of dictionaries for JSON response
-        course_list = []
-        for course in courses:
-            # Format the date if it exists
-            date_str = course[1] if course[1] is not None else ''
-            formatted_date = ''
-            if date_str:
-                try:
-                    date_obj = datetime.strptime(str(date_str).strip(), '%Y-%m-%d %H:%M:%S')
-                    formatted_date = date_obj.strftime('%d/%m/%Y')
-                except Exception as e:
-                    logger.error(f"Error formatting date {date_str}: {str(e)}")
-                    formatted_date = date_str
-            
-            # Combine symbol with event if it exists
-            symbol = course[0] if course[0] is not None else ''
-            event = course[6] if course[6] is not None else ''
-            combined_symbol = f"{symbol}{event}" if event else symbol
-            
-            # Create base course dictionary
-            course_dict = {
-                'course_symbol': combined_symbol,
-                'date': formatted_date,
-                'week': course[2] if course[2] is not None else '',
-                'class': course[3] if course[3] is not None else '',
-                'period': course[4] if course[4] is not None else '',
-                'comment': course[5] if course[5] is not None else '',
-                'origin': course[7] if course[7] is not None else '',
-                'detail_origin': course[8] if course[8] is not None else '',
-                'hall': course[9] if len(course) > 9 and course[9] is not None else '',
-                'day_of_week': course[10] if len(course) > 10 and course[10] is not None else ''
-            }
-            
-            # Find matching details
-            matched = False
-            for detail in details:
-                if detail[0] == course[0]:
-                    # Check if the class matches
-                    detail_class = detail[4] if detail[4] is not None else ''
-                    course_class = course[3] if course[3] is not None else ''
-                    
-                    if detail_class == course_class:  # Only match if classes are the same
-                        course_dict.update({
-                            'course_name': detail[1],
-                            'teacher_1': detail[2] if detail[2] is not None else '',
-                            'teacher_2': detail[3] if detail[3] is not None else ''
-                        })
-                        matched = True
-                        break
-            
-            # Add the course to the list if it has a name
-            if matched and detail[1] and detail[1].strip():
-                course_list.append(course_dict)
+        course_list = [_course_to_dict(course) for course in courses]
         
         # Return data without pagination info
         return jsonify({'courses': course_list})
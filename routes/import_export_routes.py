@@ -1,19 +1,256 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, Response, request, jsonify, send_file, stream_with_context, url_for
+import json
 import os
 import logging
 import re
-import threading
+import shutil
+import tempfile
+from LectureHallExtractor import LectureHallExtractor
+from CourseManageSystem import normalize_course_details
+from utils.bulk_writer import BulkWriter
+from utils.course_search import rebuild_search_index
 from utils.db_manager import DatabaseManager
+from utils.import_jobs import ImportCancelled, ImportJob, ImportJobManager
+from utils.import_profile import ImportProfile, timed
+from utils.import_pool import iter_files_in_pool, iter_files_in_threads
+from utils.sheet_fingerprints import count_sheet_changes, group_rows_by_origin
 
 logger = logging.getLogger(__name__)
 
 import_export_bp = Blueprint('import_export_bp', __name__)
 
+# Imports run one at a time in a background worker; clients follow them by job id
+import_jobs = ImportJobManager()
+
+# Seconds between keep-alive comments on an idle progress stream
+EVENT_STREAM_HEARTBEAT = 15
+
+# Uploads up to this size are kept in memory, larger ones spill to an anonymous temp file
+UPLOAD_SPOOL_BYTES = 64 * 1024 * 1024
+
+def _spool_uploads(files):
+    """
+    Copy uploads into spooled buffers that outlive the request.
+
+    Returns (file name, SpooledTemporaryFile) pairs; the parsers read the
+    buffers directly, so nothing is written under a fixed name.
+    """
+    uploads = []
+    for file in files:
+        if file.filename == '':
+            continue
+        buffer = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES)
+        shutil.copyfileobj(file.stream, buffer)
+        buffer.seek(0)
+        uploads.append((file.filename, buffer))
+    return uploads
+
+def _close_uploads(uploads):
+    for _, buffer in uploads:
+        buffer.close()
+
+def _write_uploads(uploads, directory, prefix):
+    """Write spooled uploads to files in a directory, for worker processes that need paths"""
+    paths = []
+    for index, (_, buffer) in enumerate(uploads):
+        path = os.path.join(directory, f'{prefix}_{index}.xlsx')
+        buffer.seek(0)
+        with open(path, 'wb') as f:
+            shutil.copyfileobj(buffer, f)
+        paths.append(path)
+    return paths
+
+def _run_import(job, db_name, course_uploads, hall_uploads, import_mode, max_workers, incremental, trace_memory):
+    """
+    Import pipeline run by a background job: parse, store and match halls.
+
+    The run is profiled; the breakdown is added to the result as 'profile'
+    and kept with the job for the import history.
+    """
+    profile = ImportProfile(trace_memory)
+    job.profile = profile
+    profile.start()
+    try:
+        with profile.activated():
+            response_data = _import_files(job, profile, db_name, course_uploads, hall_uploads,
+                                          import_mode, max_workers, incremental)
+    finally:
+        profile.stop()
+    response_data['profile'] = profile.report()
+    return response_data
+
+def _import_files(job, profile, db_name, course_uploads, hall_uploads, import_mode, max_workers, incremental):
+    """
+    Parse the uploads, store them and match halls, reporting to job and profile.
+
+    Up to max_workers files (or sheets, in process mode) are parsed at once.
+    Their rows are stored in upload order whichever finishes first, and a
+    file that fails to parse is left out and listed in 'file_errors'.
+
+    Full imports stream: every parsed sheet goes through a bounded queue to
+    a writer thread that inserts it while parsing goes on, into a new
+    generation of the database that is only swapped in once everything is
+    parsed and checked. Readers see the previous data until then, and
+    cancelling before that discards the new generation.
+    Incremental imports collect all rows first, since they compare whole
+    sheets across files. Storing is not cancellable. If no rows could be
+    parsed at all, nothing is stored and the import fails.
+    """
+    from app import cms  # Import here to avoid circular imports
+    
+    job.update(phase='parsing', message='Parsing files')
+    job.files_planned([(name, 'course') for name, _ in course_uploads] +
+                      [(name, 'lecture_hall') for name, _ in hall_uploads])
+    
+    hall_extractor = LectureHallExtractor(db_name)
+    row_counts = {'courses': 0, 'course_details': 0, 'lecture_halls': 0}
+    match_stats = None
+    
+    if incremental:
+        collected = {table_name: [] for table_name in row_counts}
+        
+        def store_rows(table_name, rows):
+            collected[table_name].extend(rows)
+        writer = None
+    else:
+        def finish_load(cursor):
+            nonlocal match_stats
+            if row_counts['lecture_halls']:
+                job.update(phase='matching', message='Matching lecture halls')
+                with timed('match_halls'):
+                    match_stats = hall_extractor.match_halls(cursor)
+            with timed('search_index'):
+                rebuild_search_index(cursor)
+        
+        writer = BulkWriter(
+            db_name,
+            open_loaders=lambda cursor: {**cms.table_loaders(cursor), **hall_extractor.table_loaders(cursor)},
+            finish=finish_load,
+            on_rows=lambda count: job.increment(rows_inserted=count),
+            # Readers keep the previous data until the new database is complete
+            shadow=True
+        ).start()
+        store_rows = writer.put
+    
+    def emit(table_name, rows):
+        if table_name == 'course_details':
+            rows = list(normalize_course_details(rows))
+        row_counts[table_name] += len(rows)
+        store_rows(table_name, rows)
+    
+    with profile.stage('parsing'):
+        try:
+            if import_mode == 'process':
+                # Fan out the parsing of every sheet to a pool of worker processes;
+                # workers open the workbooks by path, so they get a private temp directory
+                with tempfile.TemporaryDirectory(prefix='course-import-') as temp_dir:
+                    course_paths = _write_uploads(course_uploads, temp_dir, 'course')
+                    hall_paths = _write_uploads(hall_uploads, temp_dir, 'lecture_hall')
+                    for table_name, rows in iter_files_in_pool(db_name, course_paths, hall_paths, max_workers, progress=job):
+                        emit(table_name, rows)
+            else:
+                # Parse up to max_workers files at once in threads; their rows
+                # come back here in upload order, so only this thread stores them
+                for table_name, rows in iter_files_in_threads(cms, hall_extractor, course_uploads, hall_uploads,
+                                                              max_workers, progress=job):
+                    emit(table_name, rows)
+        
+            logger.info(f"Parsed {row_counts['courses']} courses, {row_counts['course_details']} course details "
+                        f"and {row_counts['lecture_halls']} lecture halls")
+            
+            # Storing nothing would replace the current data with an empty database
+            if not any(row_counts.values()):
+                failed_files = job.failed_files()
+                if failed_files:
+                    raise ValueError(f"None of the files could be read ({len(failed_files)} failed, "
+                                     f"first error: {failed_files[0]['error']}); the current data was kept")
+                raise ValueError("The files contain no courses or lecture halls; the current data was kept")
+        
+            # Last chance to cancel: from here on the database is being changed
+            job.check_cancelled()
+        except BaseException:
+            if writer is not None:
+                writer.abort()
+            raise
+    
+    job.update(phase='storing', message='Storing data')
+    
+    sheet_counts = None
+    with profile.stage('storing'):
+        if incremental:
+            all_courses = collected['courses']
+            processed_details = collected['course_details']
+            all_lecture_halls = collected['lecture_halls']
+        
+            # Replace only the sheets whose fingerprint changed and re-match their halls
+            with timed('store_courses'):
+                course_changes = cms.store_data_incremental(all_courses, processed_details)
+            changed_course_origins = [
+                origin for origin, (status, _) in course_changes['courses'].items() if status != 'skipped'
+            ]
+            job.update(rows_inserted=_count_changed_rows(all_courses, 7, course_changes['courses'])
+                       + _count_changed_rows(processed_details, 5, course_changes['course_details']))
+            job.update(phase='matching', message='Matching lecture halls')
+            with timed('store_halls'):
+                hall_changes = hall_extractor.store_data_incremental(all_lecture_halls, changed_course_origins)
+            job.increment(rows_inserted=_count_changed_rows(all_lecture_halls, 5, hall_changes))
+            match_stats = hall_extractor.get_match_stats()
+            sheet_counts = count_sheet_changes(
+                course_changes['course_details'], course_changes['courses'], hall_changes
+            )
+            logger.info(f"Incremental import: {sheet_counts}")
+            if sheet_counts['added'] or sheet_counts['replaced']:
+                with timed('search_index'):
+                    with DatabaseManager(db_name).get_connection() as conn:
+                        rebuild_search_index(conn.cursor())
+        else:
+            # Write what is still queued, rebuild the indexes, match halls, index for search and swap in
+            writer.close()
+    
+    # Prepare response message
+    course_count = row_counts['courses']
+    lecture_hall_count = row_counts['lecture_halls']
+    
+    message = f"Successfully imported {course_count} courses"
+    if lecture_hall_count > 0:
+        message += f" and {lecture_hall_count} lecture halls"
+    
+    response_data = {
+        'message': message,
+        'course_count': course_count,
+        'lecture_hall_count': lecture_hall_count
+    }
+    if match_stats is not None:
+        response_data['hall_matching'] = match_stats
+    failed_files = job.failed_files()
+    if failed_files:
+        response_data['file_errors'] = [{'file': file['name'], 'error': file['error']} for file in failed_files]
+        message += f" ({len(failed_files)} files could not be read)"
+        response_data['message'] = message
+    if sheet_counts is not None:
+        response_data['sheets'] = sheet_counts
+        message += (f" ({sheet_counts['added']} sheets added, {sheet_counts['replaced']} replaced,"
+                    f" {sheet_counts['skipped']} unchanged)")
+        response_data['message'] = message
+    
+    return response_data
+
+def _count_changed_rows(rows, origin_index, changes):
+    """Count the rows belonging to sheets an incremental store added or replaced"""
+    changed_origins = {origin for origin, (status, _) in changes.items() if status != 'skipped'}
+    return sum(len(origin_rows) for origin, origin_rows in group_rows_by_origin(rows, origin_index).items()
+               if origin in changed_origins)
+
+def _job_response(job):
+    state = job.snapshot()
+    state['status_url'] = url_for('import_export_bp.get_import_job', job_id=job.id)
+    state['events_url'] = url_for('import_export_bp.stream_import_job', job_id=job.id)
+    return state
+
 @import_export_bp.route('/api/import', methods=['POST'])
 def import_file():
     try:
         from app import cms  # Import here to avoid circular imports
-        from LectureHallExtractor import LectureHallExtractor  # Import the LectureHallExtractor
         
         # Check if any files were uploaded
         course_files = []
@@ -41,134 +278,99 @@ def import_file():
         
         logger.info(f"Processing {len(course_files)} course files and {len(lecture_hall_files)} lecture hall files")
         
-        # Get the database manager
-        db_manager = DatabaseManager(cms.db_name)
+        # 'thread' parses whole files in a thread pool, 'process' parses sheets in a process pool;
+        # 'workers' limits how many run at once
+        import_mode = request.form.get('mode', 'thread')
+        max_workers = request.form.get('workers', type=int)
+        if import_mode not in ('thread', 'process'):
+            return jsonify({'error': f'Unknown import mode: {import_mode}'}), 400
+        if max_workers is not None and max_workers < 1:
+            return jsonify({'error': 'workers must be at least 1'}), 400
         
-        # Reset the database
-        db_manager.reset_database()
+        # Incremental imports only replace the sheets whose rows changed
+        incremental = request.form.get('incremental', 'false').lower() in ('1', 'true', 'yes')
         
-        # Process files concurrently
-        all_courses = []
-        all_course_details = []
-        all_lecture_halls = []
+        # Tracing memory slows the import down, so it is only done on request
+        trace_memory = request.form.get('trace_memory', 'false').lower() in ('1', 'true', 'yes')
         
-        # Define processing functions for threading
-        def process_course_files():
-            nonlocal all_courses, all_course_details
-            
-            for file in course_files:
-                if file.filename == '':
-                    continue
-                    
-                # Save the file temporarily
-                temp_path = f'temp_course_{threading.get_ident()}.xlsx'
-                file.save(temp_path)
-                
-                try:
-                    # Process the file
-                    logger.info(f"Processing course file: {file.filename}")
-                    courses, course_details = cms.parse_excel(temp_path)
-                    logger.info(f"Extracted {len(courses)} courses and {len(course_details)} course details from {file.filename}")
-                    
-                    # Thread-safe append to lists
-                    with threading.Lock():
-                        all_courses.extend(courses)
-                        all_course_details.extend(course_details)
-                finally:
-                    # Clean up
-                    if os.path.exists(temp_path):
-                        os.remove(temp_path)
-        
-        def process_lecture_hall_files():
-            nonlocal all_lecture_halls
-            
-            # Initialize the LectureHallExtractor with the same database
-            hall_extractor = LectureHallExtractor(cms.db_name)
-            
-            for file in lecture_hall_files:
-                if file.filename == '':
-                    continue
-                    
-                # Save the file temporarily
-                temp_path = f'temp_lecture_hall_{threading.get_ident()}.xlsx'
-                file.save(temp_path)
-                
-                try:
-                    # Process the file using LectureHallExtractor
-                    logger.info(f"Processing lecture hall file: {file.filename}")
-                    lecture_halls = hall_extractor.parse_excel(temp_path)
-                    logger.info(f"Extracted {len(lecture_halls)} lecture halls from {file.filename}")
-                    
-                    # Thread-safe append to list
-                    with threading.Lock():
-                        all_lecture_halls.extend(lecture_halls)
-                except Exception as e:
-                    logger.error(f"Error processing lecture hall file {file.filename}: {str(e)}")
-                finally:
-                    # Clean up
-                    if os.path.exists(temp_path):
-                        os.remove(temp_path)
-        
-        # Create and start threads for concurrent processing
-        threads = []
-        
-        if course_files:
-            course_thread = threading.Thread(target=process_course_files)
-            course_thread.start()
-            threads.append(course_thread)
-        
-        if lecture_hall_files:
-            hall_thread = threading.Thread(target=process_lecture_hall_files)
-            hall_thread.start()
-            threads.append(hall_thread)
-        
-        # Wait for all threads to complete
-        for thread in threads:
-            thread.join()
-        
-        # Process course_details to match the table structure
-        processed_details = []
-        for detail in all_course_details:
-            # Make sure we have exactly 5 elements (course_symbol, course_name, teacher_1, teacher_2, data_origin)
-            if len(detail) >= 5:
-                # Use the first 5 elements
-                processed_details.append(detail[:5])
-            elif len(detail) == 4:
-                # Add data_origin as the 5th element
-                processed_details.append(detail + ['unknown'])
-            else:
-                logger.warning(f"Skipping course detail with unexpected format: {detail}")
-        
-        logger.info(f"Processed {len(processed_details)} course details")
-        
-        # Store data in database
-        if all_courses and processed_details:
-            logger.info(f"Storing {len(all_courses)} courses and {len(processed_details)} course details")
-            cms.store_data(all_courses, processed_details)
-        
-        # Store lecture hall data and match with courses
-        if all_lecture_halls:
-            logger.info(f"Storing {len(all_lecture_halls)} lecture halls")
-            hall_extractor = LectureHallExtractor(cms.db_name)
-            hall_extractor.store_data(all_lecture_halls)
-        
-        # Prepare response message
-        course_count = len(all_courses)
-        lecture_hall_count = len(all_lecture_halls)
-        
-        message = f"Successfully imported {course_count} courses"
-        if lecture_hall_count > 0:
-            message += f" and {lecture_hall_count} lecture halls"
-        
-        return jsonify({
-            'message': message,
-            'course_count': course_count,
-            'lecture_hall_count': lecture_hall_count
-        })
+        # 'wait' keeps the old behaviour of answering only once the import is done
+        wait = request.form.get('wait', 'false').lower() in ('1', 'true', 'yes')
+        
+        # The uploads only live as long as the request, so copy them before queueing
+        course_uploads = _spool_uploads(course_files)
+        hall_uploads = _spool_uploads(lecture_hall_files)
+        job = import_jobs.submit(
+            lambda job: _run_import(job, cms.db_name, course_uploads, hall_uploads,
+                                    import_mode, max_workers, incremental, trace_memory),
+            cleanup=lambda: _close_uploads(course_uploads + hall_uploads)
+        )
+        logger.info(f"Queued import job {job.id}")
+        
+        if wait:
+            state = job.wait_for_change(-1, timeout=0)
+            while state['status'] not in ImportJob.FINISHED_STATUSES:
+                state = job.wait_for_change(state['version'], timeout=EVENT_STREAM_HEARTBEAT)
+            if state['status'] != 'succeeded':
+                return jsonify({'error': state['error'] or state['message']}), 500
+            return jsonify(state['result'])
+        
+        return jsonify(_job_response(job)), 202
     except Exception as e:
         logger.error(f"Error importing files: {str(e)}", exc_info=True)
         return jsonify({'error': str(e)}), 500
 
+@import_export_bp.route('/api/import/jobs', methods=['GET'])
+def list_import_jobs():
+    return jsonify([job.snapshot() for job in import_jobs.list()])
+
+@import_export_bp.route('/api/import/history', methods=['GET'])
+def get_import_history():
+    """Summaries and timing profiles of the most recent finished imports, newest first"""
+    limit = request.args.get('limit', type=int)
+    history = import_jobs.history()
+    if limit is not None and limit >= 0:
+        history = history[:limit]
+    return jsonify(history)
+
+@import_export_bp.route('/api/import/jobs/<job_id>', methods=['GET'])
+def get_import_job(job_id):
+    job = import_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Import job not found'}), 404
+    return jsonify(_job_response(job))
+
+@import_export_bp.route('/api/import/jobs/<job_id>/events', methods=['GET'])
+def stream_import_job(job_id):
+    """Server-sent events with the job state, sent on every change until the job finishes"""
+    job = import_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Import job not found'}), 404
+    
+    def generate():
+        state = job.snapshot()
+        yield f"data: {json.dumps(state)}\n\n"
+        while state['status'] not in ImportJob.FINISHED_STATUSES:
+            new_state = job.wait_for_change(state['version'], timeout=EVENT_STREAM_HEARTBEAT)
+            if new_state['version'] == state['version']:
+                # Keep proxies and the browser from closing an idle connection
+                yield ": keep-alive\n\n"
+                continue
+            state = new_state
+            yield f"data: {json.dumps(state)}\n\n"
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@import_export_bp.route('/api/import/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_import_job(job_id):
+    job = import_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Import job not found'}), 404
+    if job.finished:
+        return jsonify({'error': f"Import job already {job.snapshot()['status']}"}), 409
+    job.cancel()
+    return jsonify(_job_response(job)), 202
+
 @import_export_bp.route('/api/export', methods=['GET'])
 def export_data():
     try:
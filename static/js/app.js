@@ -1,3 +1,6 @@
+// Sort fields the server can page through (see SORT_COLUMNS in routes/course_routes.py)
+const SERVER_SORT_FIELDS = ['course_symbol', 'date', 'week', 'class', 'period', 'hall', 'day_of_week'];
+
 document.addEventListener('alpine:init', () => {
   Alpine.data('courseApp', () => ({
     courses: [],
@@ -30,6 +33,7 @@ document.addEventListener('alpine:init', () => {
     selectedLectureHallFiles: [],
     importStatus: null, // null, 'processing', 'success', 'error'
     importStatusMessage: '',
+    importJobId: null, // ID of the running background import, used to cancel it
     showInsightsModal: false,
     teacherStats: {
       totalTeachers: 0,
@@ -56,6 +60,9 @@ document.addEventListener('alpine:init', () => {
     perPage: 100,
     totalCourses: 0,
     totalPages: 1,
+    // Cursor that fetches each page, by page number, for the query in pageCursorQuery
+    pageCursors: {},
+    pageCursorQuery: null,
     isLoading: false,
     // Add filterOptions cache
     filterOptions: {},
@@ -197,10 +204,6 @@ document.addEventListener('alpine:init', () => {
         // Build query parameters
         const params = new URLSearchParams();
         
-        // Add pagination
-        params.append('page', this.currentPage || 1);
-        params.append('per_page', this.perPage || 100);
-        
         // Add active filters to query
         if (this.activeFilters.length > 0) {
           // Group filters by field
@@ -254,7 +257,7 @@ document.addEventListener('alpine:init', () => {
         }
         
         // Add sorting
-        if (this.sortField) {
+        if (this.sortField && SERVER_SORT_FIELDS.includes(this.sortField)) {
           params.append('sort_field', this.sortField);
           params.append('sort_direction', this.sortDirection);
         }
@@ -264,6 +267,21 @@ document.addEventListener('alpine:init', () => {
           params.append('search', this.searchQuery);
         }
         
+        // Page cursors only hold for the query they were returned with
+        const cursorQuery = `${params.toString()}&per_page=${this.perPage || 100}`;
+        if (cursorQuery !== this.pageCursorQuery) {
+          this.pageCursors = {};
+          this.pageCursorQuery = cursorQuery;
+        }
+        
+        // Add pagination; pages reached from the one before continue from its cursor
+        const page = this.currentPage || 1;
+        params.append('page', page);
+        params.append('per_page', this.perPage || 100);
+        if (this.pageCursors[page]) {
+          params.append('after', this.pageCursors[page]);
+        }
+        
         const queryString = params.toString();
         console.log('Fetching with params:', queryString);
         
@@ -279,6 +297,9 @@ document.addEventListener('alpine:init', () => {
         this.courses = data.courses || [];
         this.totalCourses = data.pagination?.total || 0;
         this.totalPages = data.pagination?.pages || 1;
+        if (data.pagination?.next_cursor) {
+          this.pageCursors[page + 1] = data.pagination.next_cursor;
+        }
         
         console.log('Courses loaded:', this.courses.length);
         console.log('Total courses:', this.totalCourses);
@@ -523,8 +544,12 @@ document.addEventListener('alpine:init', () => {
       this.importStatusMessage = 'Importing files, please wait...';
 
       // Use the ImportExportUtils module to handle the file upload
-      ImportExportUtils.importFiles(this.selectedCourseFiles, this.selectedLectureHallFiles)
+      ImportExportUtils.importFiles(this.selectedCourseFiles, this.selectedLectureHallFiles, (job) => {
+        this.importJobId = job.job_id;
+        this.importStatusMessage = this.formatImportProgress(job);
+      })
         .then((data) => {
+          this.importJobId = null;
           this.importStatus = 'success';
           this.importStatusMessage = data.message || 'Import successful!';
 
@@ -555,12 +580,41 @@ document.addEventListener('alpine:init', () => {
           this.filterCourses();
         })
         .catch((error) => {
-          console.error('Error importing files:', error);
+          this.importJobId = null;
+          if (!error.cancelled) {
+            console.error('Error importing files:', error);
+          }
           this.importStatus = 'error';
           this.importStatusMessage = error.message || 'Error importing files. Please try again.';
         });
     },
 
+    formatImportProgress(job) {
+      if (job.phase === 'parsing') {
+        const failed = (job.files || []).filter((file) => file.status === 'failed').length;
+        return `Parsing files: ${job.files_done}/${job.files_total}, sheets: ${job.sheets_done}/${job.sheets_total}`
+          + ` (${job.rows_parsed} rows${failed ? `, ${failed} files failed` : ''})`;
+      }
+      if (job.phase === 'storing') {
+        return `Storing ${job.rows_parsed} rows...`;
+      }
+      if (job.phase === 'matching') {
+        return 'Matching lecture halls...';
+      }
+      return job.message;
+    },
+
+    closeImportModal() {
+      // Closing the modal while an import runs cancels the import
+      if (this.importStatus === 'processing' && this.importJobId) {
+        ImportExportUtils.cancelImport(this.importJobId).catch((error) => {
+          console.error('Error cancelling import:', error);
+        });
+        return;
+      }
+      this.showImportModal = false;
+    },
+
     handleFileUpload(event) {
       // This method is kept for backward compatibility
       // It will be redirected to the new course files selection method
@@ -7,9 +7,10 @@ const ImportExportUtils = {
    * Handle file upload for importing data
    * @param {Array} courseFiles - Array of course files to upload
    * @param {Array} lectureHallFiles - Array of lecture hall files to upload
-   * @returns {Promise} - Promise that resolves when import is complete
+   * @param {Function} onProgress - Optional callback receiving the import job state on every change
+   * @returns {Promise} - Promise that resolves with the import result when the job succeeds
    */
-  importFiles: function (courseFiles, lectureHallFiles) {
+  importFiles: function (courseFiles, lectureHallFiles, onProgress) {
     if (courseFiles.length === 0 && lectureHallFiles.length === 0) {
       return Promise.reject(new Error('No files provided'));
     }
@@ -29,6 +30,61 @@ const ImportExportUtils = {
     return fetch('/api/import', {
       method: 'POST',
       body: formData,
+    })
+      .then((response) => response.json())
+      .then((data) => {
+        if (data.error) {
+          throw new Error(data.error);
+        }
+        // The import runs in the background; follow its job until it finishes
+        return this.followImportJob(data, onProgress);
+      });
+  },
+
+  /**
+   * Follow an import job through its progress event stream
+   * @param {Object} job - Job state returned when the import was queued
+   * @param {Function} onProgress - Optional callback receiving the job state on every change
+   * @returns {Promise} - Promise that resolves with the import result, or rejects if the job fails or is cancelled
+   */
+  followImportJob: function (job, onProgress) {
+    return new Promise((resolve, reject) => {
+      const events = new EventSource(job.events_url);
+
+      events.onmessage = (event) => {
+        const state = JSON.parse(event.data);
+        if (onProgress) {
+          onProgress(state);
+        }
+
+        if (state.status === 'succeeded') {
+          events.close();
+          resolve(state.result);
+        } else if (state.status === 'failed' || state.status === 'cancelled') {
+          events.close();
+          const error = new Error(state.error || state.message);
+          error.cancelled = state.status === 'cancelled';
+          reject(error);
+        }
+      };
+
+      events.onerror = () => {
+        // The stream closes after the final state; only a broken stream is an error
+        if (events.readyState === EventSource.CLOSED) {
+          reject(new Error('Lost connection to the import job'));
+        }
+      };
+    });
+  },
+
+  /**
+   * Cancel a running import job
+   * @param {string} jobId - ID of the import job
+   * @returns {Promise} - Promise that resolves with the job state once cancellation is requested
+   */
+  cancelImport: function (jobId) {
+    return fetch(`/api/import/jobs/${jobId}/cancel`, {
+      method: 'POST',
     })
       .then((response) => response.json())
       .then((data) => {
@@ -0,0 +1,62 @@
+"""
+Every workbook backend must produce the rows of the full openpyxl backend.
+
+This is the guard on the streaming backend and on the zipfile/iterparse
+reader in utils/xlsx_reader.py; benchmarks/check_backend_parity.py runs the
+same comparison on larger or real workbooks.
+"""
+import pytest
+from benchmarks.common import make_parsers
+from benchmarks.workbook_generator import generate_workbook
+from utils.workbook_backends import WORKBOOK_BACKENDS
+
+REFERENCE_BACKEND = 'openpyxl'
+
+OTHER_BACKENDS = [backend for backend in WORKBOOK_BACKENDS if backend != REFERENCE_BACKEND]
+
+# Small synthetic layouts: merged cells, comments and page breaks, with and without formatting-only cells
+LAYOUTS = {
+    'default': {},
+    'overformatted': dict(sheets=1, overformat_rows=400, overformat_cols=80, seed=3),
+}
+
+@pytest.fixture(scope='module')
+def parsers(tmp_path_factory):
+    return make_parsers(str(tmp_path_factory.mktemp('parsers')))
+
+@pytest.fixture(scope='module', params=list(LAYOUTS))
+def workbooks(request, tmp_path_factory):
+    """(course workbook, lecture hall workbook) paths of a layout"""
+    directory = tmp_path_factory.mktemp(request.param)
+    course_path = str(directory / 'course.xlsx')
+    hall_path = str(directory / 'halls.xlsx')
+    generate_workbook(course_path, **LAYOUTS[request.param])
+    generate_workbook(hall_path, halls=True, **LAYOUTS[request.param])
+    return course_path, hall_path
+
+@pytest.mark.parametrize('backend', OTHER_BACKENDS)
+def test_course_rows_match_openpyxl(parsers, workbooks, backend):
+    course_parser, _ = parsers
+    expected_courses, expected_details = course_parser.parse_excel(workbooks[0], backend=REFERENCE_BACKEND)
+    courses, details = course_parser.parse_excel(workbooks[0], backend=backend)
+
+    assert expected_courses and expected_details
+    assert courses == expected_courses
+    assert details == expected_details
+
+@pytest.mark.parametrize('backend', OTHER_BACKENDS)
+def test_hall_rows_match_openpyxl(parsers, workbooks, backend):
+    _, hall_parser = parsers
+    expected = hall_parser.parse_excel(workbooks[1], backend=REFERENCE_BACKEND)
+
+    assert expected
+    assert hall_parser.parse_excel(workbooks[1], backend=backend) == expected
+
+@pytest.mark.parametrize('backend', list(WORKBOOK_BACKENDS))
+def test_backends_read_uploads_from_memory(parsers, workbooks, backend):
+    course_parser, _ = parsers
+    with open(workbooks[0], 'rb') as f:
+        content = f.read()
+
+    assert course_parser.parse_excel(content, backend=backend) == \
+        course_parser.parse_excel(workbooks[0], backend=REFERENCE_BACKEND)
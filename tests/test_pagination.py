@@ -0,0 +1,164 @@
+"""
+Keyset pagination must list the rows of offset pagination, in the same order.
+
+The clause tests walk keyset_clause() cursors over a small table with ties
+and NULLs in the sort column. The route tests walk /api/courses as a client
+does, across sort fields, directions and full-text search ranks, and check
+that bad cursors are refused.
+"""
+import base64
+import json
+import os
+import sqlite3
+import pytest
+from benchmarks.workbook_generator import generate_workbook
+from utils.pagination import decode_page_cursor, encode_page_cursor, keyset_clause
+
+# (id, sort value) with ties and NULLs
+ROWS = [(1, 'b'), (2, None), (3, 'a'), (4, 'b'), (5, None), (6, 'a'), (7, 'c'), (8, 'b'), (9, 'a')]
+
+SORT_FIELDS = ['course_symbol', 'date', 'week', 'class', 'period', 'hall', 'day_of_week']
+
+@pytest.fixture
+def table():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)")
+    conn.execute("CREATE INDEX idx_t_v ON t (v)")
+    conn.executemany("INSERT INTO t VALUES (?, ?)", ROWS)
+    yield conn
+    conn.close()
+
+def _walk_table(conn, sort_column, descending, per_page):
+    """Ids of every row of t, fetched per_page at a time by following cursors"""
+    direction = 'DESC' if descending else 'ASC'
+    order = f"{sort_column} {direction}, id {direction}" if sort_column else f"id {direction}"
+    ids = []
+    cursor = None
+    while True:
+        where, params = '', []
+        if cursor is not None:
+            clause, params = keyset_clause(sort_column, 'id', descending,
+                                           *decode_page_cursor(cursor, sort_column, descending))
+            where = f" WHERE {clause}"
+        rows = conn.execute(f"SELECT {sort_column or 'NULL'}, id FROM t{where} ORDER BY {order} LIMIT ?",
+                            params + [per_page]).fetchall()
+        ids.extend(row_id for _, row_id in rows)
+        if len(rows) < per_page:
+            return ids
+        cursor = encode_page_cursor(sort_column, descending, *rows[-1])
+
+@pytest.mark.parametrize('per_page', [1, 2, 4])
+@pytest.mark.parametrize('descending', [False, True])
+@pytest.mark.parametrize('sort_column', [None, 'v'])
+def test_cursors_list_every_row_once_in_order(table, sort_column, descending, per_page):
+    direction = 'DESC' if descending else 'ASC'
+    order = f"{sort_column} {direction}, id {direction}" if sort_column else f"id {direction}"
+    expected = [row_id for (row_id,) in table.execute(f"SELECT id FROM t ORDER BY {order}")]
+
+    assert _walk_table(table, sort_column, descending, per_page) == expected
+
+def test_cursor_belongs_to_its_sort():
+    token = encode_page_cursor('v', False, 'b', 4)
+
+    assert decode_page_cursor(token, 'v', False) == ('b', 4)
+    with pytest.raises(ValueError, match='does not belong'):
+        decode_page_cursor(token, 'v', True)
+    with pytest.raises(ValueError, match='does not belong'):
+        decode_page_cursor(token, None, False)
+
+def _token(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii').rstrip('=')
+
+@pytest.mark.parametrize('token', [
+    'zzz', '!!!!', _token({'a': 1}), _token(['v', False, 'b']), _token(['v', False, ['b'], 4]),
+    _token(['v', False, 'b', '4']), base64.urlsafe_b64encode(b'\xff\xfe').decode('ascii'),
+])
+def test_malformed_cursor_has_a_fixed_message(token):
+    with pytest.raises(ValueError) as error:
+        decode_page_cursor(token, 'v', False)
+
+    assert str(error.value) == 'Invalid page cursor'
+
+@pytest.fixture(scope='module')
+def client(tmp_path_factory):
+    """Test client of the app on a scratch database holding generated courses and halls"""
+    directory = tmp_path_factory.mktemp('pagination')
+    course_path = str(directory / 'course.xlsx')
+    hall_path = str(directory / 'halls.xlsx')
+    generate_workbook(course_path, bands=1, seed=2)
+    generate_workbook(hall_path, bands=1, halls=True, seed=2)
+
+    # The app keeps its database in the working directory
+    previous_dir = os.getcwd()
+    os.chdir(directory)
+    try:
+        from app import app
+        client = app.test_client()
+        with open(course_path, 'rb') as course_file, open(hall_path, 'rb') as hall_file:
+            response = client.post('/api/import', data={
+                'wait': '1',
+                'course_files[0]': (course_file, 'course.xlsx'),
+                'lecture_hall_files[0]': (hall_file, 'halls.xlsx'),
+            })
+        assert response.status_code == 200, response.get_json()
+        yield client
+    finally:
+        os.chdir(previous_dir)
+
+def _walk_pages(client, query, per_page=53):
+    """
+    Courses of every page by number, and of every page reached by following
+    next_cursor, checking the cursors end on the last page with every course
+    """
+    pagination = client.get('/api/courses', query_string={**query, 'per_page': per_page}).get_json()['pagination']
+    by_number, by_cursor = [], []
+    after = None
+    for page in range(1, pagination['pages'] + 1):
+        by_number += client.get('/api/courses', query_string={**query, 'per_page': per_page, 'page': page}).get_json()['courses']
+        cursor_query = {**query, 'per_page': per_page}
+        if after:
+            cursor_query['after'] = after
+        body = client.get('/api/courses', query_string=cursor_query).get_json()
+        by_cursor += body['courses']
+        after = body['pagination']['next_cursor']
+    assert after is None
+    assert len(by_cursor) == pagination['total']
+    return by_number, by_cursor
+
+@pytest.mark.parametrize('direction', ['asc', 'desc'])
+@pytest.mark.parametrize('sort_field', SORT_FIELDS)
+def test_cursor_pages_match_offset_pages(client, sort_field, direction):
+    by_number, by_cursor = _walk_pages(client, {'sort_field': sort_field, 'sort_direction': direction})
+
+    assert by_number
+    assert by_cursor == by_number
+
+def test_cursor_pages_continue_through_ties(client):
+    # There are only a few periods, so most page boundaries fall inside a run of ties
+    by_number, by_cursor = _walk_pages(client, {'sort_field': 'period'}, per_page=7)
+    periods = [course['period'] for course in by_cursor]
+
+    assert len(set(periods)) < len(periods) // 7
+    assert by_cursor == by_number
+
+@pytest.mark.parametrize('query', [{'search': 'course'}, {'search': 'course', 'sort_direction': 'desc'},
+                                   {'search': 'course', 'sort_field': 'week'}])
+def test_cursor_pages_follow_search_rank(client, query):
+    # Without a sort field the matches are listed by relevance, s.rank
+    by_number, by_cursor = _walk_pages(client, query, per_page=11)
+
+    assert len(by_number) > 11
+    assert by_cursor == by_number
+
+def test_malformed_cursor_is_a_bad_request(client):
+    response = client.get('/api/courses', query_string={'after': _token({'a': 1})})
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid page cursor'}
+
+def test_cursor_of_another_sort_is_a_bad_request(client):
+    first_page = client.get('/api/courses', query_string={'per_page': 5, 'sort_field': 'hall'}).get_json()
+    response = client.get('/api/courses', query_string={'per_page': 5, 'after': first_page['pagination']['next_cursor']})
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Page cursor does not belong to this sort order'}
@@ -0,0 +1,151 @@
+import contextvars
+import logging
+import queue
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+from utils.db_manager import DatabaseManager
+from utils.import_profile import timed
+from utils.sheet_fingerprints import FingerprintCollector
+
+logger = logging.getLogger(__name__)
+
+# Row chunks (about one sheet each) that may wait for the writer before parsers block
+DEFAULT_MAX_PENDING_CHUNKS = 8
+
+# End-of-input markers on the writer queue
+_FINISH = object()
+_ABORT = object()
+
+class TableLoader:
+    """
+    Replaces the rows of one table inside a bulk load.
+
+    Clears the table when created, inserts row batches as they come and
+    fingerprints them per sheet, and records the fingerprints on finish().
+    """
+    def __init__(self, cursor, table_name: str, insert_query: str, origin_index: int):
+        self.cursor = cursor
+        self.table_name = table_name
+        self.insert_query = insert_query
+        self.row_count = 0
+        self._fingerprints = FingerprintCollector(origin_index)
+
+        cursor.execute(f'DELETE FROM {table_name}')
+        cursor.execute('DELETE FROM sqlite_sequence WHERE name = ?', (table_name,))
+
+    def insert(self, rows: Iterable[List]) -> int:
+        """Insert a batch of rows, returning how many were inserted"""
+        with timed('insert'):
+            self.cursor.executemany(self.insert_query, self._fingerprints.track(rows))
+        inserted = max(self.cursor.rowcount, 0)
+        self.row_count += inserted
+        return inserted
+
+    def finish(self):
+        """Record the fingerprints of everything inserted"""
+        with timed('fingerprints'):
+            self._fingerprints.record(self.cursor, self.table_name)
+        logger.info(f"Stored {self.row_count} rows in {self.table_name}")
+
+class WriterFailed(Exception):
+    """Raised to producers when the writer thread has stopped with an error"""
+
+class _WriteAborted(Exception):
+    """Raised inside the writer thread to roll back its transaction"""
+
+class BulkWriter:
+    """
+    Writer thread that drains row chunks from a bounded queue into SQLite.
+
+    Producers call put(table_name, rows) from any thread; it blocks while
+    max_pending_chunks chunks are waiting, so parsers cannot run ahead of
+    the database and memory stays bounded however much is imported. All
+    chunks go into one DatabaseManager.bulk_load() transaction, which
+    commits on close() after finish(cursor) has run, or rolls back on abort().
+    With shadow, they go into a new generation of the database instead
+    (DatabaseManager.shadow_load()), which is swapped in on close() and
+    deleted on abort(), so readers never see a partly loaded database.
+    The writer thread runs in a copy of the creating thread's context, so
+    it reports to the same import profile.
+    """
+    def __init__(self, db_name: str, open_loaders: Callable[[object], Dict[str, TableLoader]],
+                 finish: Optional[Callable[[object], None]] = None,
+                 on_rows: Optional[Callable[[int], None]] = None,
+                 max_pending_chunks: int = DEFAULT_MAX_PENDING_CHUNKS,
+                 shadow: bool = False):
+        self.db_name = db_name
+        self.shadow = shadow
+        self._open_loaders = open_loaders
+        self._finish = finish
+        self._on_rows = on_rows
+        self._queue = queue.Queue(maxsize=max_pending_chunks)
+        self._error = None
+        context = contextvars.copy_context()
+        self._thread = threading.Thread(target=context.run, args=(self._run,), name='bulk-writer', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def put(self, table_name: str, rows: List[List]):
+        """Queue a chunk of rows for a table, waiting while the queue is full"""
+        with timed('queue_wait'):
+            self._put((table_name, rows))
+
+    def close(self):
+        """Write everything queued, run finish and commit; re-raises a writer error"""
+        self._put(_FINISH)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def abort(self):
+        """Stop writing and roll back everything written so far"""
+        if self._thread.is_alive():
+            try:
+                self._put(_ABORT)
+            except WriterFailed:
+                pass
+            self._thread.join()
+
+    def _put(self, item):
+        while True:
+            if self._error is not None or not self._thread.is_alive():
+                raise WriterFailed(f"Database writer stopped: {self._error}")
+            try:
+                self._queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _run(self):
+        try:
+            db_manager = DatabaseManager(self.db_name)
+            with (db_manager.shadow_load() if self.shadow else db_manager.bulk_load()) as cursor:
+                loaders = self._open_loaders(cursor)
+                while True:
+                    item = self._queue.get()
+                    if item is _ABORT:
+                        raise _WriteAborted()
+                    if item is _FINISH:
+                        break
+                    table_name, rows = item
+                    inserted = loaders[table_name].insert(rows)
+                    if self._on_rows is not None:
+                        self._on_rows(inserted)
+
+                for loader in loaders.values():
+                    loader.finish()
+                if self._finish is not None:
+                    self._finish(cursor)
+        except _WriteAborted:
+            logger.info("Bulk write aborted and discarded")
+        except Exception as e:
+            logger.error(f"Bulk write failed: {str(e)}", exc_info=True)
+            self._error = e
+            # Unblock producers waiting on a full queue
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
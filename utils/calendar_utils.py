@@ -0,0 +1,109 @@
+import logging
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Map English day names to Vietnamese abbreviations
+DAY_OF_WEEK_MAP = {
+    'Monday': 'T2',
+    'Tuesday': 'T3',
+    'Wednesday': 'T4',
+    'Thursday': 'T5',
+    'Friday': 'T6',
+    'Saturday': 'T7',
+    'Sunday': 'CN'
+}
+
+# Day 0 of the stored course_day column
+EPOCH = date(1970, 1, 1)
+
+class CalendarColumn(NamedTuple):
+    """Decoded header of one timetable column"""
+    month_year: object  # Raw month/year header value, e.g. 'THÁNG 9-2024'
+    week: object
+    date: Optional[datetime]  # None if the header does not form a valid date
+    day_of_week: Optional[str]
+
+def parse_month_year(s):
+    """Parse month and year from string"""
+    parts = s.replace("THÁNG ", "").split("-")
+    if len(parts) == 2:
+        month_str = parts[0].strip()
+        year_str = parts[1].strip()
+        return int(year_str), int(month_str)
+    return None, None
+
+def parse_date(d_str):
+    """Parse date from string"""
+    try:
+        return int(float(d_str))
+    except:
+        return None
+
+def carry_month_year(month_year_values: List, date_values: List, last_valid_month_year) -> Optional[int]:
+    """
+    Carry the month of the previous page into the header of the current one.
+
+    When a page starts in the middle of a month, its first month/year cells
+    are empty. The first empty month cell that has a date below it is filled
+    with last_valid_month_year, unless a valid month/year is found first.
+
+    Returns:
+        The column offset that was filled, or None
+    """
+    if not last_valid_month_year:
+        return None
+    for col_offset, month_year in enumerate(month_year_values):
+        if not month_year:  # Empty cell
+            # Only populate if we have a date in this column
+            if date_values[col_offset]:
+                month_year_values[col_offset] = last_valid_month_year
+                return col_offset
+        else:
+            # If we find a valid month/year, stop populating
+            try:
+                year, month = parse_month_year(str(month_year))
+            except ValueError:
+                continue
+            if year and month:
+                return None
+    return None
+
+def build_column_calendar(month_year_values: List, week_values: List, date_values: List) -> List[Optional[CalendarColumn]]:
+    """
+    Decode the month/year, week and date header rows of a page once.
+
+    Returns one entry per column. Columns without a month/year or a date are
+    None; columns whose header does not form a valid date have date None.
+    """
+    calendar = []
+    for month_year, week, date_str in zip(month_year_values, week_values, date_values):
+        if not (month_year and date_str):
+            calendar.append(None)
+            continue
+
+        dt = None
+        day_of_week = None
+        try:
+            year, month = parse_month_year(str(month_year))
+            day = parse_date(str(date_str))
+            if all([year, month, day]):
+                dt = datetime(year, month, day)
+                day_name = dt.strftime('%A')  # Monday, Tuesday, etc.
+                day_of_week = DAY_OF_WEEK_MAP.get(day_name, day_name)
+        except ValueError as e:
+            logger.warning(f"Ignoring column with invalid date header {month_year!r} / {date_str!r}: {str(e)}")
+
+        calendar.append(CalendarColumn(month_year, week, dt, day_of_week))
+    return calendar
+
+def parse_epoch_day(date_str: str) -> int:
+    """Convert a YYYY-MM-DD date to days since EPOCH; raises ValueError if it is not one"""
+    return (date.fromisoformat(date_str.strip()) - EPOCH).days
+
+@lru_cache(maxsize=4096)
+def format_epoch_day(day: int) -> str:
+    """Format days since EPOCH as dd/mm/YYYY"""
+    return (EPOCH + timedelta(days=day)).strftime('%d/%m/%Y')
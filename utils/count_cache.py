@@ -0,0 +1,61 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Sequence, Tuple
+
+# Filter signatures whose total counts are kept, least recently used dropped first
+DEFAULT_MAX_ENTRIES = 512
+
+_WHITESPACE = re.compile(r'\s+')
+
+def filter_signature(count_query: str, params: Sequence) -> Tuple[str, Tuple]:
+    """
+    Normalize a count query and its params into a cache key.
+
+    Whitespace is collapsed, so queries built with different indentation or
+    line breaks share their entry.
+    """
+    return _WHITESPACE.sub(' ', count_query).strip(), tuple(params)
+
+class CountCache:
+    """
+    Bounded in-memory cache of total row counts per filter signature.
+
+    Every entry belongs to a data generation, a counter that goes up
+    whenever the data changes. Entries of any other generation are never
+    returned, and are all dropped the first time a new generation is seen.
+    """
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generation = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, generation: int, key: Hashable) -> Optional[int]:
+        with self._lock:
+            if generation != self._generation:
+                self._entries.clear()
+                self._generation = generation
+            count = self._entries.get(key)
+            if count is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return count
+
+    def put(self, generation: int, key: Hashable, count: int):
+        with self._lock:
+            # Counted before the data changed again; not worth keeping
+            if generation != self._generation:
+                return
+            self._entries[key] = count
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,105 @@
+import logging
+import re
+import sqlite3
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# FTS5 table with one row per course, its rowid being the course's id
+SEARCH_TABLE = 'course_search'
+
+# Indexed columns with their bm25 weights, so symbol and name matches rank first
+SEARCH_COLUMNS = [
+    ('course_symbol', 10.0),
+    ('course_name', 5.0),
+    ('teacher_1', 3.0),
+    ('teacher_2', 3.0),
+    ('hall', 2.0),
+    ('class', 1.0),
+    ('week', 1.0),
+    ('period', 1.0),
+    ('day_of_week', 1.0),
+    ('comment', 1.0),
+]
+
+# Rows in SEARCH_COLUMNS order; a course has the name and teachers of the
+# first detail row with its symbol and class
+_SEARCH_ROWS_QUERY = '''
+    SELECT c.id, c.course_symbol, d.course_name, d.teacher_1, d.teacher_2,
+           c.hall, c.class, c.week, c.period, c.day_of_week, c.comment
+    FROM courses c
+    LEFT JOIN course_details d ON d.id = (
+        SELECT MIN(cd.id) FROM course_details cd
+        WHERE cd.course_symbol = c.course_symbol AND cd.class = c.class
+    )
+'''
+
+# Words of a search box entry; everything else separates them
+_TERM_PATTERN = re.compile(r'\w+')
+
+def create_search_table(cursor) -> bool:
+    """
+    Create the search table if it does not exist.
+
+    Accents are folded, so 'sang' finds 'Sáng', and prefixes of up to three
+    characters are indexed for search-as-you-type.
+
+    Returns:
+        bool: True if the table was created, False if it existed or this
+            SQLite has no FTS5, in which case search falls back to LIKE
+    """
+    if search_table_exists(cursor):
+        return False
+    try:
+        cursor.execute(f'''
+            CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(
+                {', '.join(column for column, _ in SEARCH_COLUMNS)},
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '1 2 3'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        logger.warning(f"Full-text search is not available: {str(e)}")
+        return False
+    weights = ', '.join(str(weight) for _, weight in SEARCH_COLUMNS)
+    cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rank) VALUES ('rank', 'bm25({weights})')")
+    logger.info(f"Created search table {SEARCH_TABLE}")
+    return True
+
+def search_table_exists(cursor) -> bool:
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (SEARCH_TABLE,))
+    return cursor.fetchone() is not None
+
+def rebuild_search_index(cursor) -> int:
+    """
+    Refill the search table from the courses and their details.
+
+    Run once an import has stored everything and matched the halls, in the
+    same transaction. Does nothing if there is no search table.
+
+    Returns:
+        int: Number of courses indexed
+    """
+    if not search_table_exists(cursor):
+        return 0
+    cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+    cursor.execute(f'''
+        INSERT INTO {SEARCH_TABLE} (rowid, {', '.join(column for column, _ in SEARCH_COLUMNS)})
+        {_SEARCH_ROWS_QUERY}
+    ''')
+    indexed = cursor.rowcount
+    # Merge the segments written by the refill into one
+    cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+    logger.info(f"Indexed {indexed} courses for search")
+    return indexed
+
+def build_match_query(text: str) -> Optional[str]:
+    """
+    Turn a search box entry into an FTS5 query matching every word as a prefix.
+
+    Returns None if the entry has no words to search for.
+    """
+    terms = _TERM_PATTERN.findall(text)
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
@@ -1,10 +1,15 @@
 import sqlite3
 import threading
 import logging
+import glob
 import os
 import time
 import re
 from contextlib import contextmanager
+from utils.count_cache import CountCache, filter_signature
+from utils.course_search import create_search_table, rebuild_search_index
+from utils.import_profile import timed
+from utils.pagination import decode_page_cursor, encode_page_cursor, keyset_clause
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +23,67 @@ def regex_match(pattern, text):
         logger.error(f"Error in regex_match: {str(e)}")
         return False
 
+# Secondary indexes as (index name, table, columns); bulk loads drop and rebuild them
+SECONDARY_INDEXES = [
+    ('idx_courses_symbol', 'courses', 'course_symbol'),
+    ('idx_courses_datetime', 'courses', 'course_datetime'),
+    ('idx_courses_class', 'courses', 'class'),
+    ('idx_course_details_symbol', 'course_details', 'course_symbol'),
+    ('idx_course_details_class', 'course_details', 'class'),
+    # Per-sheet deletes during incremental imports
+    ('idx_courses_data_origin', 'courses', 'data_origin'),
+    ('idx_course_details_data_origin', 'course_details', 'data_origin'),
+    ('idx_lecture_halls_data_origin', 'lecture_halls', 'data_origin'),
+    # Hall matching joins courses and lecture halls on their (date, class, period) slot
+    ('idx_courses_slot', 'courses', 'course_date, class, period'),
+    ('idx_lecture_halls_slot', 'lecture_halls', 'hall_date, class, period'),
+    # Typed calendar columns, so date filters are index range scans
+    ('idx_courses_day', 'courses', 'course_day'),
+    ('idx_courses_week_number', 'courses', 'week_number'),
+    ('idx_courses_weekday', 'courses', 'weekday'),
+    # Exact facet filters of /api/courses
+    ('idx_courses_week', 'courses', 'week'),
+    ('idx_courses_period', 'courses', 'period'),
+    ('idx_courses_hall', 'courses', 'hall'),
+    ('idx_courses_day_of_week', 'courses', 'day_of_week'),
+    ('idx_course_details_teacher_1', 'course_details', 'teacher_1'),
+    ('idx_course_details_teacher_2', 'course_details', 'teacher_2'),
+    # Joining courses to their details on (course_symbol, class)
+    ('idx_courses_symbol_class', 'courses', 'course_symbol, class'),
+    ('idx_course_details_symbol_class', 'course_details', 'course_symbol, class'),
+]
+
+# Columns derived from others as (table, column, type, expression). The
+# insert queries compute them from their parameters with the same
+# expressions; databases created before a column existed get it backfilled.
+DERIVED_COLUMNS = [
+    # Date keys hall matching joins on
+    ('courses', 'course_date', 'TEXT', 'date(course_datetime)'),
+    ('lecture_halls', 'hall_date', 'TEXT', 'date(hall_datetime)'),
+    # Days since 1970-01-01
+    ('courses', 'course_day', 'INTEGER', 'CAST(julianday(date(course_datetime)) - 2440587.5 AS INTEGER)'),
+    # Leading number of the week header, NULL if it has none
+    ('courses', 'week_number', 'INTEGER', "CASE WHEN week GLOB '[0-9]*' THEN CAST(week AS INTEGER) END"),
+    # 0 for Sunday (CN) to 6 for Saturday (T7)
+    ('courses', 'weekday', 'INTEGER', "CAST(strftime('%w', course_datetime) AS INTEGER)"),
+]
+
+# Pragmas for the duration of a bulk load: the import can be re-run from its
+# files, so durability is traded for speed until the load commits
+BULK_LOAD_PRAGMAS = {
+    'synchronous': 'OFF',
+    'temp_store': 'MEMORY',
+    'cache_size': '-65536',  # ~64MB, for rebuilding the indexes
+}
+
+# A shadow load writes a file nobody else reads until it is swapped in, and a
+# failed one is deleted, so it needs no rollback journal either
+SHADOW_LOAD_PRAGMAS = {**BULK_LOAD_PRAGMAS, 'journal_mode': 'OFF'}
+
+# Next to the database, the file holding the number of the generation in use
+# once a shadow load has been swapped in
+GENERATION_POINTER_SUFFIX = '.current'
+
 class DatabaseManager:
     """
     Singleton database manager to handle database connections and prevent locking issues.
@@ -31,10 +97,17 @@ class DatabaseManager:
                 cls._instance = super(DatabaseManager, cls).__new__(cls)
                 cls._instance.db_name = db_name or "courses.db"
                 cls._instance.connection_pool = {}
+                cls._instance.connection_paths = {}
                 cls._instance.connection_locks = {}
                 cls._instance.initialized = False
-            elif db_name is not None:
+                cls._instance.generation = 0
+                cls._instance._active_path = None
+                cls._instance._generation_lock = threading.Lock()
+                cls._instance.data_generation = 0
+                cls._instance.count_cache = CountCache()
+            elif db_name is not None and db_name != cls._instance.db_name:
                 cls._instance.db_name = db_name
+                cls._instance._active_path = None
         return cls._instance
     
     def initialize(self):
@@ -47,56 +120,11 @@ class DatabaseManager:
             conn.create_function("REGEXP", 2, regex_match)
             
             cursor = conn.cursor()
-            
-            # Create course tables
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS course_details (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    course_symbol TEXT,
-                    course_name TEXT NOT NULL,
-                    teacher_1 TEXT,
-                    teacher_2 TEXT,
-                    class TEXT,
-                    data_origin TEXT
-                )
-            ''')
-
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS courses (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    course_symbol TEXT NOT NULL,
-                    course_datetime TEXT NOT NULL,
-                    week TEXT,
-                    class TEXT,
-                    period TEXT,
-                    comment TEXT,
-                    event TEXT,
-                    data_origin TEXT,
-                    detail_origin TEXT,
-                    hall TEXT,
-                    day_of_week TEXT
-                )
-            ''')
-            
-            # Create lecture hall table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS lecture_halls (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    hall_symbol TEXT NOT NULL,
-                    hall_datetime TEXT NOT NULL,
-                    week TEXT,
-                    class TEXT,
-                    period TEXT,
-                    data_origin TEXT
-                )
-            ''')
+            self._create_tables(cursor)
             
             # Create indexes for faster lookups
-            self._create_index_if_not_exists(cursor, 'idx_courses_symbol', 'courses', 'course_symbol')
-            self._create_index_if_not_exists(cursor, 'idx_courses_datetime', 'courses', 'course_datetime')
-            self._create_index_if_not_exists(cursor, 'idx_courses_class', 'courses', 'class')
-            self._create_index_if_not_exists(cursor, 'idx_course_details_symbol', 'course_details', 'course_symbol')
-            self._create_index_if_not_exists(cursor, 'idx_course_details_class', 'course_details', 'class')
+            for index_name, table_name, column_name in SECONDARY_INDEXES:
+                self._create_index_if_not_exists(cursor, index_name, table_name, column_name)
             
             # Enable multi-threaded read operations but safe write
             cursor.execute("PRAGMA journal_mode = WAL")
@@ -106,7 +134,75 @@ class DatabaseManager:
             cursor.execute("PRAGMA cache_size = -10000")  # ~10MB
             
         self.initialized = True
-        logger.info(f"Database {self.db_name} initialized with required tables and indexes")
+        logger.info(f"Database {self.database_path} initialized with required tables and indexes")
+    
+    def _create_tables(self, cursor):
+        """Create the tables and derived columns that do not exist yet"""
+        # Create course tables
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS course_details (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                course_symbol TEXT,
+                course_name TEXT NOT NULL,
+                teacher_1 TEXT,
+                teacher_2 TEXT,
+                class TEXT,
+                data_origin TEXT
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS courses (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                course_symbol TEXT NOT NULL,
+                course_datetime TEXT NOT NULL,
+                week TEXT,
+                class TEXT,
+                period TEXT,
+                comment TEXT,
+                event TEXT,
+                data_origin TEXT,
+                detail_origin TEXT,
+                hall TEXT,
+                day_of_week TEXT,
+                course_date TEXT,
+                course_day INTEGER,
+                week_number INTEGER,
+                weekday INTEGER
+            )
+        ''')
+        
+        # Create lecture hall table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS lecture_halls (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                hall_symbol TEXT NOT NULL,
+                hall_datetime TEXT NOT NULL,
+                week TEXT,
+                class TEXT,
+                period TEXT,
+                data_origin TEXT,
+                hall_date TEXT
+            )
+        ''')
+        
+        for table_name, column_name, column_type, expression in DERIVED_COLUMNS:
+            self._add_derived_column_if_not_exists(cursor, table_name, column_name, column_type, expression)
+        
+        # Fingerprints of the parsed rows of each imported sheet, for incremental imports
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sheet_fingerprints (
+                table_name TEXT NOT NULL,
+                origin TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                row_count INTEGER,
+                PRIMARY KEY (table_name, origin)
+            )
+        ''')
+        
+        # Full-text search over the courses; databases created before it existed get it filled in
+        if create_search_table(cursor):
+            rebuild_search_index(cursor)
     
     def _create_index_if_not_exists(self, cursor, index_name, table_name, column_name):
         """Create an index if it doesn't exist"""
@@ -115,25 +211,191 @@ class DatabaseManager:
             cursor.execute(f"CREATE INDEX {index_name} ON {table_name}({column_name})")
             logger.info(f"Created index {index_name} on {table_name}({column_name})")
     
+    def _add_derived_column_if_not_exists(self, cursor, table_name, column_name, column_type, expression):
+        """Add a derived column to a table if it doesn't exist and fill it in from its expression"""
+        cursor.execute(f"PRAGMA table_info({table_name})")
+        if not any(column[1] == column_name for column in cursor.fetchall()):
+            cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}")
+            cursor.execute(f"UPDATE {table_name} SET {column_name} = {expression}")
+            logger.info(f"Added column {column_name} to table {table_name}")
+    
     def reset_database(self):
-        """Reset the database by dropping and recreating tables"""
-        with self.get_connection() as conn:
+        """Reset the database by swapping in an empty generation"""
+        with self.shadow_load():
+            pass
+        logger.info(f"Database {self.db_name} has been reset")
+    
+    @property
+    def database_path(self):
+        """Path of the database file in use: the generation last swapped in, or db_name itself"""
+        return self._current_generation()[0]
+    
+    def _current_generation(self):
+        with self._generation_lock:
+            if self._active_path is None:
+                self._active_path, self.generation = self._read_generation_pointer()
+            return self._active_path, self.generation
+    
+    def _generation_file(self, generation):
+        root, ext = os.path.splitext(self.db_name)
+        return f"{root}.gen{generation}{ext}"
+    
+    def _read_generation_pointer(self):
+        """Get the (path, generation) the pointer file names, or db_name if there is none"""
+        pointer = self.db_name + GENERATION_POINTER_SUFFIX
+        try:
+            with open(pointer, encoding='utf-8') as f:
+                generation = int(f.read().strip())
+        except FileNotFoundError:
+            return self.db_name, 0
+        except (OSError, ValueError) as e:
+            logger.error(f"Ignoring unreadable generation pointer {pointer}: {str(e)}")
+            return self.db_name, 0
+        
+        path = self._generation_file(generation)
+        if not os.path.exists(path):
+            logger.error(f"Generation {generation} of {self.db_name} is missing, using {self.db_name}")
+            return self.db_name, 0
+        return path, generation
+    
+    @contextmanager
+    def shadow_load(self):
+        """
+        Build the next generation of the database and swap it in.
+
+        Yields a cursor on a new database file that has the tables but no
+        secondary indexes yet. Readers keep using the current generation in
+        the meantime and never wait on the load's locks. Once the block
+        ends the indexes are built, PRAGMA quick_check must pass and the
+        file is synced, then it becomes the file every new connection opens;
+        connections pooled by other threads move over on their next use.
+        If anything fails the new file is deleted and nothing changes.
+        """
+        generation = self._current_generation()[1] + 1
+        path = self._generation_file(generation)
+        # Left over by a load that crashed before it could swap in
+        self._remove_database_file(path)
+        
+        conn = sqlite3.connect(path)
+        try:
+            for name, value in SHADOW_LOAD_PRAGMAS.items():
+                conn.execute(f"PRAGMA {name} = {value}")
+            conn.create_function("REGEXP", 2, regex_match)
             cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            self._create_tables(cursor)
             
-            # Drop existing tables
-            cursor.execute('DROP TABLE IF EXISTS courses')
-            cursor.execute('DROP TABLE IF EXISTS course_details')
-            cursor.execute('DROP TABLE IF EXISTS lecture_halls')
+            yield cursor
             
-        self.initialized = False
-        self.initialize()
-        logger.info(f"Database {self.db_name} has been reset")
+            with timed('rebuild_indexes'):
+                for index_name, table_name, column_name in SECONDARY_INDEXES:
+                    self._create_index_if_not_exists(cursor, index_name, table_name, column_name)
+            with timed('integrity_check'):
+                problems = [row[0] for row in cursor.execute("PRAGMA quick_check")]
+                if problems != ['ok']:
+                    raise sqlite3.DatabaseError(f"Generation {generation} failed its integrity check: {'; '.join(problems[:5])}")
+            with timed('commit'):
+                conn.commit()
+            conn.execute("PRAGMA journal_mode = WAL")
+        except BaseException:
+            conn.close()
+            self._remove_database_file(path)
+            raise
+        conn.close()
+        
+        # Synchronous writes were off, so make the file durable before anything points at it
+        with open(path, 'rb+') as f:
+            os.fsync(f.fileno())
+        self._swap_in(path, generation)
+        logger.info(f"Swapped in generation {generation} of {self.db_name}")
+        self.remove_stale_generations(include_original=True)
+    
+    def _swap_in(self, path, generation):
+        """Point the pointer file and new connections at a fully built generation"""
+        pointer = self.db_name + GENERATION_POINTER_SUFFIX
+        temp_pointer = pointer + '.tmp'
+        with open(temp_pointer, 'w', encoding='utf-8') as f:
+            f.write(str(generation))
+            f.flush()
+            os.fsync(f.fileno())
+        # Atomic on POSIX and Windows alike, unlike replacing an open database file
+        os.replace(temp_pointer, pointer)
+        with self._generation_lock:
+            self._active_path = path
+            self.generation = generation
+        self.bump_data_generation()
+    
+    def remove_stale_generations(self, include_original: bool = False):
+        """
+        Delete database files of earlier generations.
+
+        The original db_name file is only deleted with include_original,
+        which a successful swap passes; other callers leave it alone. Files
+        still open elsewhere cannot be deleted on Windows; they are left for
+        the next call.
+        """
+        active = os.path.abspath(self.database_path)
+        root, ext = os.path.splitext(self.db_name)
+        candidates = glob.glob(f"{glob.escape(root)}.gen*{ext}")
+        if include_original:
+            candidates.insert(0, self.db_name)
+        for path in candidates:
+            if os.path.abspath(path) != active and os.path.exists(path):
+                logger.info(f"Removing {path}, replaced by {self.database_path}")
+                self._remove_database_file(path)
+    
+    def _remove_database_file(self, path):
+        """Delete a database file and its WAL files, keeping all of them if it is in use"""
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            try:
+                os.remove(path + suffix)
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logger.warning(f"Could not delete {path + suffix}: {str(e)}")
+                return
+    
+    def bump_data_generation(self):
+        """
+        Mark the data as changed, so nothing derived from it before is used again.
+
+        Transactions on pooled connections that change rows, and swapping
+        in a generation, call this themselves. The counter lives in this
+        process, so a change made by another process is not seen.
+        """
+        with self._generation_lock:
+            self.data_generation += 1
     
     @contextmanager
-    def get_connection(self, max_retries=5, retry_delay=0.5):
+    def bulk_load(self, tables=('courses', 'course_details', 'lecture_halls')):
+        """
+        Open one transaction for loading a large number of rows.
+
+        The secondary indexes of the given tables are dropped for the load
+        and rebuilt in one pass before the commit, and BULK_LOAD_PRAGMAS
+        apply until the transaction ends. Yields a cursor; everything done
+        with it commits or rolls back together.
+        """
+        indexes = [index for index in SECONDARY_INDEXES if index[1] in tables]
+        with self.get_connection(pragmas=BULK_LOAD_PRAGMAS) as conn:
+            cursor = conn.cursor()
+            for index_name, _, _ in indexes:
+                cursor.execute(f"DROP INDEX IF EXISTS {index_name}")
+            
+            yield cursor
+            
+            with timed('rebuild_indexes'):
+                for index_name, table_name, column_name in indexes:
+                    self._create_index_if_not_exists(cursor, index_name, table_name, column_name)
+    
+    @contextmanager
+    def get_connection(self, max_retries=5, retry_delay=0.5, pragmas=None):
         """
         Get a database connection from the pool or create a new one.
         Uses thread-specific connections to avoid conflicts.
+        
+        pragmas are set before the transaction begins and restored to their
+        previous values once it ends.
         """
         thread_id = threading.get_ident()
         
@@ -143,15 +405,22 @@ class DatabaseManager:
         
         # Acquire the lock for this thread
         with self.connection_locks[thread_id]:
+            path = self.database_path
+            
+            # Move to the generation in use if another was swapped in since the connection was made
+            if thread_id in self.connection_pool and self.connection_paths.get(thread_id) != path:
+                self.connection_pool.pop(thread_id).close()
+            
             # Get or create a connection for this thread
             if thread_id not in self.connection_pool:
                 for attempt in range(max_retries):
                     try:
                         # Use default isolation_level (which is '') to allow manual transaction control
                         self.connection_pool[thread_id] = sqlite3.connect(
-                            self.db_name, 
+                            path, 
                             timeout=20  # Increase timeout to wait for locks
                         )
+                        self.connection_paths[thread_id] = path
                         # Enable foreign keys
                         self.connection_pool[thread_id].execute("PRAGMA foreign_keys = ON")
                         # Use WAL mode for better concurrency
@@ -168,15 +437,25 @@ class DatabaseManager:
             
             conn = self.connection_pool[thread_id]
             
+            # Some pragmas have no effect inside a transaction, so set them first
+            previous_pragmas = {}
+            for name, value in (pragmas or {}).items():
+                previous_pragmas[name] = conn.execute(f"PRAGMA {name}").fetchone()[0]
+                conn.execute(f"PRAGMA {name} = {value}")
+            
             try:
                 # Begin a transaction
                 conn.execute("BEGIN")
+                changes_before = conn.total_changes
                 
                 # Yield the connection for use
                 yield conn
                 
                 # Commit the transaction if no exception occurred
-                conn.commit()
+                with timed('commit'):
+                    conn.commit()
+                if conn.total_changes != changes_before:
+                    self.bump_data_generation()
             except Exception as e:
                 # Rollback on error
                 try:
@@ -191,6 +470,9 @@ class DatabaseManager:
                 
                 logger.error(f"Database error: {str(e)}")
                 raise
+            finally:
+                for name, value in previous_pragmas.items():
+                    conn.execute(f"PRAGMA {name} = {value}")
     
     def close_all_connections(self):
         """Close all database connections in the pool"""
@@ -198,6 +480,7 @@ class DatabaseManager:
             try:
                 conn.close()
                 del self.connection_pool[thread_id]
+                self.connection_paths.pop(thread_id, None)
             except Exception as e:
                 logger.error(f"Error closing connection: {str(e)}")
     
@@ -249,6 +532,23 @@ class DatabaseManager:
             return True
         return False
     
+    def count_rows(self, query, params=None):
+        """
+        Count the rows a query returns, reusing the count of an identical query
+        
+        Counts are cached per normalized query and params until the data
+        changes (see bump_data_generation), so paging through one filter
+        runs the count once. The query should have no ORDER BY.
+        """
+        params = list(params or [])
+        generation = self.data_generation
+        key = (self.database_path, filter_signature(query, params))
+        total_count = self.count_cache.get(generation, key)
+        if total_count is None:
+            total_count = self.execute_query(f"SELECT COUNT(*) FROM ({query})", params, fetch_one=True)[0]
+            self.count_cache.put(generation, key, total_count)
+        return total_count
+    
     def execute_paginated_query(self, base_query, where_clauses=None, params=None, sort_field=None, sort_direction='ASC', page=1, per_page=100):
         """
         Execute a query with pagination and complex filters
@@ -275,15 +575,14 @@ class DatabaseManager:
         if where_clauses:
             query += " WHERE " + " AND ".join(where_clauses)
         
+        # Get total count for pagination info, before ordering, which cannot change it
+        total_count = self.count_rows(query, params)
+        
         # Add ordering
         if sort_field:
             direction = "DESC" if sort_direction.upper() == 'DESC' else "ASC"
             query += f" ORDER BY {sort_field} {direction}"
         
-        # Get total count for pagination info
-        count_query = f"SELECT COUNT(*) FROM ({query})"
-        total_count = self.execute_query(count_query, params, fetch_one=True)[0]
-        
         # Add pagination
         query += " LIMIT ? OFFSET ?"
         params.extend([per_page, (page - 1) * per_page])
@@ -291,4 +590,77 @@ class DatabaseManager:
         # Execute the query
         results = self.execute_query(query, params, fetch_all=True)
         
-        return results, total_count 
\ No newline at end of file
+        return results, total_count 
+    
+    def execute_keyset_query(self, base_query, where_clauses=None, params=None, sort_column=None, descending=False,
+                             key_column='id', per_page=100, after=None, page=1):
+        """
+        Execute a query one page at a time, continuing from a cursor instead of an offset
+        
+        Rows are ordered by sort_column and then key_column, a unique column
+        such as the id, so every row has a fixed position. Given the cursor
+        returned with the previous page, the next page starts by seeking to
+        that position through the sort column's index, however deep it is.
+        Without a cursor the page is found by its number with an offset, for
+        the first page or a jump to an arbitrary one.
+        
+        Args:
+            base_query (str): The base SELECT query without WHERE/ORDER/LIMIT clauses
+            where_clauses (list): List of WHERE clause strings
+            params (list): List of parameters for the base query and the WHERE clauses
+            sort_column (str): Column or expression to sort by, None to sort by key_column only
+            descending (bool): Whether to sort in descending order
+            key_column (str): Unique column breaking ties in the sort
+            per_page (int): Number of items per page
+            after (str): Cursor returned with the previous page
+            page (int): Page number (1-based), used if there is no cursor
+            
+        Returns:
+            tuple: (results, total_count, next_cursor), next_cursor being None on the last page
+            
+        Raises:
+            ValueError: If the cursor is invalid or belongs to another sort
+        """
+        params = list(params or [])
+        where_clauses = list(where_clauses or [])
+        
+        # Get total count for pagination info, over the rows of every page
+        count_query = base_query
+        if where_clauses:
+            count_query += " WHERE " + " AND ".join(where_clauses)
+        total_count = self.count_rows(count_query, params)
+        
+        if after:
+            clause, clause_params = keyset_clause(sort_column, key_column, descending,
+                                                  *decode_page_cursor(after, sort_column, descending))
+            where_clauses.append(clause)
+            params.extend(clause_params)
+        
+        # Select the sort key in front of the requested columns, to make the next cursor from
+        query = base_query.lstrip()
+        if query[:6].upper() != 'SELECT':
+            raise ValueError("base_query must start with SELECT")
+        query = f"SELECT {sort_column if sort_column else 'NULL'}, {key_column}, {query[6:]}"
+        if where_clauses:
+            query += " WHERE " + " AND ".join(where_clauses)
+        
+        direction = "DESC" if descending else "ASC"
+        order = [f"{key_column} {direction}"]
+        if sort_column:
+            order.insert(0, f"{sort_column} {direction}")
+        query += " ORDER BY " + ", ".join(order)
+        
+        # One extra row tells whether there is a next page
+        query += " LIMIT ?"
+        params.append(per_page + 1)
+        if not after:
+            query += " OFFSET ?"
+            params.append((page - 1) * per_page)
+        
+        rows = self.execute_query(query, params, fetch_all=True)
+        next_cursor = None
+        if len(rows) > per_page:
+            rows = rows[:per_page]
+            next_cursor = encode_page_cursor(sort_column, descending, rows[-1][0], rows[-1][1])
+        
+        return [row[2:] for row in rows], total_count, next_cursor
@@ -0,0 +1,240 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs kept around so clients can still read their final status
+MAX_FINISHED_JOBS = 20
+
+# Finished imports summarized in the import history, with their timing profile
+MAX_IMPORT_HISTORY = 50
+
+class ImportCancelled(Exception):
+    """Raised inside an import pipeline when its job has been cancelled"""
+
+class ImportJob:
+    """
+    State and progress of one background import.
+
+    The pipeline reports progress through update(), the file hooks and the
+    sheet hooks; readers use snapshot() or wait_for_change(). Cancellation
+    is cooperative: cancel() sets a flag that the pipeline checks between
+    sheets and before it starts writing to the database.
+    """
+    FINISHED_STATUSES = ('succeeded', 'failed', 'cancelled')
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self._changed = threading.Condition()
+        self._cancel_requested = threading.Event()
+        self._version = 0
+        self.profile = None  # ImportProfile of the run, set by the pipeline
+        self._state = {
+            'job_id': self.id,
+            'status': 'queued',  # queued, running, succeeded, failed or cancelled
+            'phase': 'queued',   # queued, parsing, storing, matching or done
+            'files_done': 0,
+            'files_total': 0,
+            'files': [],  # per uploaded file: name, kind, status, rows and error
+            'sheets_done': 0,
+            'sheets_total': 0,
+            'rows_parsed': 0,
+            'rows_inserted': 0,
+            'message': 'Waiting to start',
+            'error': None,
+            'result': None,
+            'created_at': time.time(),
+            'updated_at': time.time(),
+        }
+
+    @property
+    def finished(self) -> bool:
+        return self._state['status'] in self.FINISHED_STATUSES
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel_requested.is_set()
+
+    def snapshot(self) -> Dict:
+        """Get a copy of the job state"""
+        with self._changed:
+            return dict(self._state, version=self._version)
+
+    def update(self, **fields):
+        """Update state fields and wake up anyone waiting for a change"""
+        with self._changed:
+            self._state.update(fields)
+            self._state['updated_at'] = time.time()
+            self._version += 1
+            self._changed.notify_all()
+
+    def increment(self, **counters):
+        """Add to numeric progress counters"""
+        with self._changed:
+            for name, amount in counters.items():
+                self._state[name] += amount
+            self._state['updated_at'] = time.time()
+            self._version += 1
+            self._changed.notify_all()
+
+    def wait_for_change(self, version: int, timeout: float) -> Dict:
+        """Block until the state is newer than version or the timeout passes, then return it"""
+        with self._changed:
+            self._changed.wait_for(lambda: self._version > version, timeout=timeout)
+            return dict(self._state, version=self._version)
+
+    def cancel(self):
+        """Ask the pipeline to stop at its next checkpoint"""
+        self._cancel_requested.set()
+        if self._state['status'] == 'queued':
+            self.update(status='cancelled', phase='done', message='Import cancelled')
+        else:
+            self.update(message='Cancelling...')
+
+    def check_cancelled(self):
+        """Raise ImportCancelled if the job was cancelled"""
+        if self._cancel_requested.is_set():
+            raise ImportCancelled()
+
+    # Progress hooks used by the parsers and the thread and process pools
+    def files_planned(self, files: List[Tuple[str, str]]):
+        """Start tracking the given (name, kind) files, in upload order"""
+        self.update(files_total=len(files), files=[
+            {'name': name, 'kind': kind, 'status': 'queued', 'rows': 0, 'error': None} for name, kind in files
+        ])
+
+    def file_started(self, index: int):
+        self._update_file(index, status='parsing')
+
+    def file_parsed(self, index: int, row_count: int):
+        self._update_file(index, status='parsed', rows=row_count)
+
+    def file_failed(self, index: int, error: str):
+        self._update_file(index, status='failed', error=error)
+
+    def failed_files(self) -> List[Dict]:
+        with self._changed:
+            return [file for file in self._state['files'] if file['status'] == 'failed']
+
+    def _update_file(self, index: int, **fields):
+        with self._changed:
+            # Replace rather than change the list, since snapshots share it
+            files = list(self._state['files'])
+            if index >= len(files):
+                return
+            finished = fields.get('status') in ('parsed', 'failed')
+            files[index] = dict(files[index], **fields)
+            self._state['files'] = files
+            if finished:
+                self._state['files_done'] += 1
+            self._state['updated_at'] = time.time()
+            self._version += 1
+            self._changed.notify_all()
+
+    def sheets_planned(self, count: int):
+        self.increment(sheets_total=count)
+
+    def sheet_parsed(self, sheet_name: Optional[str], row_count: int):
+        self.increment(sheets_done=1, rows_parsed=row_count)
+        self.check_cancelled()
+
+    def rows_from_cache(self, row_count: int):
+        self.increment(rows_parsed=row_count)
+        self.check_cancelled()
+
+class ImportJobManager:
+    """
+    Runs import pipelines in a background worker and keeps their jobs.
+
+    Imports replace database contents, so they run one at a time in
+    submission order. The most recent finished jobs are kept for status
+    queries; older ones are forgotten. A longer history of finished imports
+    keeps only a summary and the timing profile of each.
+    """
+    def __init__(self, max_finished_jobs: int = MAX_FINISHED_JOBS, max_history: int = MAX_IMPORT_HISTORY):
+        self._jobs: 'OrderedDict[str, ImportJob]' = OrderedDict()
+        self._history = deque(maxlen=max_history)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='import-job')
+        self._max_finished_jobs = max_finished_jobs
+
+    def submit(self, pipeline: Callable[[ImportJob], Dict], cleanup: Optional[Callable[[], None]] = None) -> ImportJob:
+        """
+        Queue a pipeline to run as a new job.
+
+        The pipeline is called with the job, reports progress on it and
+        returns the result dict. cleanup runs after the pipeline whatever the
+        outcome, e.g. to delete the uploaded files.
+        """
+        job = ImportJob()
+        with self._lock:
+            self._jobs[job.id] = job
+            self._forget_old_jobs()
+        self._executor.submit(self._run, job, pipeline, cleanup)
+        return job
+
+    def get(self, job_id: str) -> Optional[ImportJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[ImportJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def history(self) -> List[Dict]:
+        """Summaries of the most recent finished imports, newest first"""
+        with self._lock:
+            return list(reversed(self._history))
+
+    def _run(self, job: ImportJob, pipeline: Callable[[ImportJob], Dict], cleanup: Optional[Callable[[], None]]):
+        try:
+            if job.cancel_requested:
+                return
+            job.update(status='running', message='Import started')
+            result = pipeline(job)
+            job.update(status='succeeded', phase='done', result=result,
+                       message=result.get('message', 'Import finished'))
+        except ImportCancelled:
+            logger.info(f"Import job {job.id} cancelled")
+            job.update(status='cancelled', phase='done', message='Import cancelled')
+        except Exception as e:
+            logger.error(f"Import job {job.id} failed: {str(e)}", exc_info=True)
+            job.update(status='failed', phase='done', error=str(e), message=f"Import failed: {str(e)}")
+        finally:
+            if job.finished:
+                self._record_history(job)
+            if cleanup is not None:
+                try:
+                    cleanup()
+                except Exception as e:
+                    logger.error(f"Error cleaning up after import job {job.id}: {str(e)}")
+
+    def _record_history(self, job: ImportJob):
+        state = job.snapshot()
+        result = state['result'] or {}
+        entry = {
+            'job_id': job.id,
+            'status': state['status'],
+            'error': state['error'],
+            'created_at': state['created_at'],
+            'finished_at': state['updated_at'],
+            'duration_seconds': round(state['updated_at'] - state['created_at'], 3),
+            'files': state['files_total'],
+            'rows_parsed': state['rows_parsed'],
+            'rows_inserted': state['rows_inserted'],
+            'course_count': result.get('course_count'),
+            'lecture_hall_count': result.get('lecture_hall_count'),
+            'profile': job.profile.report() if job.profile is not None else None,
+        }
+        with self._lock:
+            self._history.append(entry)
+
+    def _forget_old_jobs(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self._max_finished_jobs)]:
+            del self._jobs[job_id]
@@ -0,0 +1,326 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import closing
+from typing import Any, Iterator, List, Optional, Tuple
+from openpyxl import load_workbook
+from utils.import_jobs import ImportCancelled
+from utils.import_profile import ImportProfile, active_profile, record_sheet, timed
+from utils.workbook_backends import open_workbook
+
+logger = logging.getLogger(__name__)
+
+# Files parsed at once by iter_files_in_threads() unless told otherwise
+DEFAULT_PARSE_THREADS = 4
+
+# Per-process state, set up by _init_worker in every worker process
+_course_parser = None
+_hall_parser = None
+_cached_workbook = (None, None)  # (path, workbook) of the last workbook this worker loaded
+
+def _init_worker(db_name: str):
+    """Create the parsers once per worker process"""
+    global _course_parser, _hall_parser
+    from CourseManageSystem import CourseManagementSystem
+    from LectureHallExtractor import LectureHallExtractor
+    _course_parser = CourseManagementSystem(db_name)
+    _hall_parser = LectureHallExtractor(db_name)
+
+def _get_workbook(path: str):
+    """Load a workbook, reusing it when consecutive tasks come from the same file"""
+    global _cached_workbook
+    if _cached_workbook[0] != path:
+        if _cached_workbook[1] is not None:
+            _cached_workbook[1].close()
+        _cached_workbook = (None, None)
+        with timed('open_workbook'):
+            _cached_workbook = (path, open_workbook(path))
+    return _cached_workbook[1]
+
+def _profiled_parse(parse_sheet, path: str, *args):
+    """Parse a sheet under a profile of this worker; returns (rows, phase totals, seconds)"""
+    profile = ImportProfile()
+    start = time.perf_counter()
+    with profile.activated():
+        rows = parse_sheet(_get_workbook(path), *args)
+    return rows, profile.phase_totals(), time.perf_counter() - start
+
+def _parse_course_sheet(path: str, sheet_name: str, detail_origin: Optional[str]):
+    """Worker task: parse one Danh mục sheet or one (d-sheet, Danh mục) pair"""
+    return _profiled_parse(_course_parser.parse_sheet, path, sheet_name, detail_origin)
+
+def _parse_hall_sheet(path: str, sheet_name: str):
+    """Worker task: parse one d-sheet of a lecture hall workbook"""
+    return _profiled_parse(_hall_parser.parse_sheet, path, sheet_name)
+
+def _read_sheet_names(path: str) -> List[str]:
+    """Read the sheet names of a workbook without loading its cells"""
+    workbook = load_workbook(filename=path, read_only=True)
+    try:
+        return workbook.sheetnames
+    finally:
+        workbook.close()
+
+def parse_files_in_pool(db_name: str, course_paths: List[str], hall_paths: List[str],
+                        max_workers: Optional[int] = None, progress=None) -> Tuple[List[List], List[List], List[List]]:
+    """
+    Parse course and lecture hall workbooks in a pool of worker processes.
+
+    Collects everything iter_files_in_pool() yields.
+
+    Returns:
+        tuple: (courses, course_details, lecture_halls)
+    """
+    rows = {'courses': [], 'course_details': [], 'lecture_halls': []}
+    for table_name, file_rows in iter_files_in_pool(db_name, course_paths, hall_paths, max_workers, progress):
+        rows[table_name].extend(file_rows)
+    return rows['courses'], rows['course_details'], rows['lecture_halls']
+
+def iter_files_in_pool(db_name: str, course_paths: List[str], hall_paths: List[str],
+                       max_workers: Optional[int] = None, progress=None) -> Iterator[Tuple[str, List[List]]]:
+    """
+    Parse course and lecture hall workbooks in a pool of worker processes, yielding rows per sheet.
+
+    Work is fanned out per sheet: one task per Danh mục sheet, one per
+    (d-sheet, Danh mục) pair and one per lecture hall d-sheet. At most
+    max_workers * 2 tasks are queued or running at any time; the next one is
+    submitted once the oldest result has been taken, so the pool stays busy
+    across files while the rows in flight stay bounded. Results are merged
+    in submission order, and a file's sheets are held until the whole file
+    has parsed, so the rows come out as a serial parse of the files in
+    upload order would produce them. A file that fails is reported and
+    skipped as a whole. Tasks also send back their phase timings, which go
+    to the caller's active import profile.
+
+    Args:
+        db_name: Database name the parsers are created with
+        course_paths: Paths of the course workbooks
+        hall_paths: Paths of the lecture hall workbooks
+        max_workers: Number of worker processes (defaults to the CPU count)
+        progress: Optional progress receiver, e.g. an ImportJob, told about
+            every file by its index (course files first) and about planned
+            and merged sheets. If one of its hooks raises ImportCancelled,
+            the tasks not started yet are cancelled.
+
+    Yields:
+        tuple: (table name, rows) per sheet, as the parsers' iter_excel()
+    """
+    from CourseManageSystem import CourseManagementSystem
+    from LectureHallExtractor import LectureHallExtractor
+
+    course_parser = CourseManagementSystem(db_name)
+    hall_parser = LectureHallExtractor(db_name)
+    files = [(path, course_parser) for path in course_paths] + [(path, hall_parser) for path in hall_paths]
+    max_workers = max_workers or os.cpu_count() or 1
+    window_size = max_workers * 2
+
+    def plan_file(index: int, path: str, parser):
+        """Get a file's cached chunks, or the (table name, sheet name, task, args) of its sheets"""
+        if progress is not None:
+            progress.file_started(index)
+        cache_key = parser.parse_cache.make_key(path, parser.CACHE_NAMESPACE)
+        cached = parser.parse_cache.read(cache_key)
+        if cached is not None:
+            return cache_key, cached, []
+        if parser is course_parser:
+            danh_muc_names, d_sheet_pairs = parser.plan_sheets(_read_sheet_names(path))
+            sheets = [('course_details', sheet_name, _parse_course_sheet, (path, sheet_name, None))
+                      for sheet_name in danh_muc_names]
+            sheets += [('courses', sheet_name, _parse_course_sheet, (path, sheet_name, detail_origin))
+                       for sheet_name, detail_origin in d_sheet_pairs]
+        else:
+            sheets = [('lecture_halls', sheet_name, _parse_hall_sheet, (path, sheet_name))
+                      for sheet_name in parser.plan_sheets(_read_sheet_names(path))]
+        if progress is not None:
+            progress.sheets_planned(len(sheets))
+        return cache_key, None, sheets
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(db_name,)) as executor:
+        # Files planned but not merged yet, as (index, cache key, cached chunks, sheet count, error)
+        planned = deque()
+        # Sheets of planned files not submitted yet, and the submitted ones in order
+        unsubmitted = deque()
+        pending = deque()
+        next_file = 0
+
+        def fill_window():
+            """Submit sheets, planning files as they are reached, until the window is full"""
+            nonlocal next_file
+            while len(pending) < window_size:
+                if unsubmitted:
+                    index, table_name, sheet_name, task, args = unsubmitted.popleft()
+                    pending.append((index, table_name, sheet_name, executor.submit(task, *args)))
+                    continue
+                # Cached files and files that failed to plan take no tasks; still only look so far ahead
+                if next_file == len(files) or len(planned) >= window_size:
+                    return
+                index = next_file
+                next_file += 1
+                path, parser = files[index]
+                try:
+                    cache_key, cached, sheets = plan_file(index, path, parser)
+                except ImportCancelled:
+                    raise
+                except Exception as e:
+                    planned.append((index, None, None, 0, e))
+                    continue
+                planned.append((index, cache_key, cached, len(sheets), None))
+                unsubmitted.extend((index, *sheet) for sheet in sheets)
+
+        def drop_file(index: int):
+            """Cancel the tasks of a failed file, queued or not yet submitted"""
+            while unsubmitted and unsubmitted[0][0] == index:
+                unsubmitted.popleft()
+            while pending and pending[0][0] == index:
+                pending.popleft()[3].cancel()
+
+        try:
+            fill_window()
+            while planned:
+                index, cache_key, cached, sheet_count, error = planned.popleft()
+                fill_window()
+                path, parser = files[index]
+                cache_writer = None
+                chunks = []
+                try:
+                    if error is not None:
+                        raise error
+                    if cached is not None:
+                        for table_name, rows in cached:
+                            if progress is not None:
+                                progress.rows_from_cache(len(rows))
+                            chunks.append((table_name, rows))
+                    else:
+                        # Every sheet also goes to the cache entry as it is merged
+                        cache_writer = parser.parse_cache.writer(cache_key)
+                        profile = active_profile()
+                        for _ in range(sheet_count):
+                            _, table_name, sheet_name, future = pending.popleft()
+                            sheet_rows, phases, seconds = future.result()
+                            fill_window()
+                            if profile is not None:
+                                profile.merge_phases(phases)
+                                record_sheet(table_name, sheet_name, seconds, len(sheet_rows))
+                            if progress is not None:
+                                progress.sheet_parsed(sheet_name, len(sheet_rows))
+                            if cache_writer is not None:
+                                with timed('parse_cache'):
+                                    cache_writer.write((table_name, sheet_rows))
+                            chunks.append((table_name, sheet_rows))
+                        if cache_writer is not None:
+                            with timed('parse_cache'):
+                                cache_writer.commit()
+                        logger.info(f"Merged file {path} from {sheet_count} sheet tasks")
+                except ImportCancelled:
+                    if cache_writer is not None:
+                        cache_writer.discard()
+                    raise
+                except Exception as e:
+                    logger.error(f"Error processing file {path}: {str(e)}")
+                    if cache_writer is not None:
+                        cache_writer.discard()
+                    drop_file(index)
+                    fill_window()
+                    if progress is not None:
+                        progress.file_failed(index, str(e))
+                    continue
+
+                if progress is not None:
+                    progress.file_parsed(index, sum(len(rows) for _, rows in chunks))
+                for table_name, rows in chunks:
+                    yield table_name, rows
+                # Let go of the file's rows once the consumer has taken them
+                del chunks
+        except BaseException:
+            # Cancelled, or the consumer stopped early: leaving the pool waits
+            # for running tasks, so drop the queued ones first
+            for _, _, _, future in pending:
+                future.cancel()
+            for _, _, cached, _, _ in planned:
+                if cached is not None:
+                    cached.close()
+            raise
+
+def iter_files_in_threads(course_parser, hall_parser, course_files: List[Tuple[str, Any]], hall_files: List[Tuple[str, Any]],
+                          max_workers: Optional[int] = None, progress=None) -> Iterator[Tuple[str, List[List]]]:
+    """
+    Parse course and lecture hall workbooks in a bounded pool of threads, yielding rows per sheet.
+
+    Files are (name, source) pairs, with sources as for the parsers'
+    iter_excel(). At most max_workers files are parsed or waiting to be
+    merged at any time, which also bounds the rows held in memory. A file's
+    sheets are held until the whole file has parsed, and files are merged
+    in upload order (course files first), so the rows come out as a serial
+    parse would produce them. A file that fails is reported and skipped as
+    a whole, without affecting the others. ImportCancelled is re-raised.
+    Workers run in copies of the caller's context, so they report to the
+    same import profile.
+
+    Args:
+        course_parser: CourseManagementSystem for the course files
+        hall_parser: LectureHallExtractor for the lecture hall files
+        course_files: (name, source) of the course workbooks
+        hall_files: (name, source) of the lecture hall workbooks
+        max_workers: Number of files parsed at once (defaults to DEFAULT_PARSE_THREADS)
+        progress: Optional progress receiver, e.g. an ImportJob, told about
+            every file by its index in upload order and about every sheet
+
+    Yields:
+        tuple: (table name, rows) per sheet, as the parsers' iter_excel()
+    """
+    files = [(name, course_parser, source) for name, source in course_files] + \
+            [(name, hall_parser, source) for name, source in hall_files]
+    max_workers = max(1, max_workers or DEFAULT_PARSE_THREADS)
+    stopped = threading.Event()
+
+    def parse_file(index: int, parser, source) -> Optional[List[Tuple[str, List[List]]]]:
+        if progress is not None:
+            progress.file_started(index)
+        chunks = []
+        with closing(parser.iter_excel(source, progress=progress)) as sheets:
+            for chunk in sheets:
+                # The consumer is gone, so stop at the next sheet
+                if stopped.is_set():
+                    return None
+                chunks.append(chunk)
+        return chunks
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='import-parse') as executor:
+        futures = []
+        try:
+            for index, (name, _, _) in enumerate(files):
+                # Keep the window of files after this one busy
+                while len(futures) < min(len(files), index + max_workers):
+                    _, parser, source = files[len(futures)]
+                    futures.append(executor.submit(contextvars.copy_context().run,
+                                                   parse_file, len(futures), parser, source))
+                try:
+                    chunks = futures[index].result()
+                except ImportCancelled:
+                    raise
+                except Exception as e:
+                    logger.error(f"Error processing file {name}: {str(e)}", exc_info=True)
+                    if progress is not None:
+                        progress.file_failed(index, str(e))
+                    continue
+                finally:
+                    futures[index] = None
+
+                logger.info(f"Parsed file {name}")
+                if progress is not None:
+                    progress.file_parsed(index, sum(len(rows) for _, rows in chunks))
+                for table_name, rows in chunks:
+                    yield table_name, rows
+                # Let go of the file's rows once the consumer has taken them
+                del chunks
+        finally:
+            # Cancelled, failed or the consumer stopped early: drop the queued
+            # files, and let the running ones stop at their next sheet
+            stopped.set()
+            for future in futures:
+                if future is not None:
+                    future.cancel()
@@ -0,0 +1,129 @@
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+# Profile that timed() and record_sheet() report to in the current thread
+_active_profile: ContextVar[Optional['ImportProfile']] = ContextVar('import_profile', default=None)
+
+class ImportProfile:
+    """
+    Timings and memory use of one import.
+
+    Stages are the consecutive wall-clock parts of the pipeline, such as
+    parsing and storing. Phases are the steps inside them, such as
+    'open_workbook' or 'insert', timed with timed() wherever they run: a
+    phase's seconds add up over all its calls and threads, so with parallel
+    parsing the phases can sum to more than their stage took.
+
+    With trace_memory, tracemalloc runs for the duration of the import and
+    the peak of every stage is recorded. Tracing slows parsing down, so it
+    is off unless asked for, and it does not see into pool worker processes.
+    """
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self._lock = threading.Lock()
+        self._phases: Dict[str, List] = {}  # name -> [seconds, calls]
+        self._sheets: List[Dict] = []
+        self._stages: Dict[str, float] = {}
+        self._memory: Dict[str, float] = {}
+        self._started_at = None
+        self._finished_at = None
+        self._started_tracing = False
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop(self):
+        if self._finished_at is None and self._started_at is not None:
+            self._finished_at = time.perf_counter()
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a stage of the pipeline and sample its peak traced memory"""
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._stages[name] = self._stages.get(name, 0.0) + time.perf_counter() - start
+            if tracing:
+                self._memory[name] = max(self._memory.get(name, 0.0),
+                                         tracemalloc.get_traced_memory()[1] / (1024 * 1024))
+
+    @contextmanager
+    def activated(self):
+        """Make this the profile timed() reports to in the current thread"""
+        token = _active_profile.set(self)
+        try:
+            yield self
+        finally:
+            _active_profile.reset(token)
+
+    def add_phase(self, name: str, seconds: float, calls: int = 1):
+        with self._lock:
+            totals = self._phases.setdefault(name, [0.0, 0])
+            totals[0] += seconds
+            totals[1] += calls
+
+    def add_sheet(self, table_name: str, sheet_name: Optional[str], seconds: float, row_count: int):
+        with self._lock:
+            self._sheets.append({'table': table_name, 'sheet': sheet_name,
+                                 'seconds': round(seconds, 4), 'rows': row_count})
+
+    def phase_totals(self) -> Dict[str, Tuple[float, int]]:
+        """(seconds, calls) per phase, in a form that can be sent back from a worker process"""
+        with self._lock:
+            return {name: (seconds, calls) for name, (seconds, calls) in self._phases.items()}
+
+    def merge_phases(self, phases: Dict[str, Tuple[float, int]]):
+        """Add the phase totals of another profile, e.g. one kept by a worker process"""
+        for name, (seconds, calls) in phases.items():
+            self.add_phase(name, seconds, calls)
+
+    def report(self) -> Dict:
+        """Get the breakdown as a JSON-serializable dict"""
+        end = self._finished_at if self._finished_at is not None else time.perf_counter()
+        with self._lock:
+            phases = {name: {'seconds': round(seconds, 4), 'calls': calls}
+                      for name, (seconds, calls) in self._phases.items()}
+            sheets = list(self._sheets)
+        return {
+            'total_seconds': round(end - self._started_at, 4) if self._started_at is not None else None,
+            'stages': {name: round(seconds, 4) for name, seconds in self._stages.items()},
+            'phases': phases,
+            'sheets': sheets,
+            'peak_memory_mb': {name: round(peak, 2) for name, peak in self._memory.items()} if self.trace_memory else None,
+        }
+
+def active_profile() -> Optional[ImportProfile]:
+    return _active_profile.get()
+
+@contextmanager
+def timed(phase: str):
+    """Time a block as a phase of the active profile; does nothing if there is none"""
+    profile = _active_profile.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_phase(phase, time.perf_counter() - start)
+
+def record_sheet(table_name: str, sheet_name: Optional[str], seconds: float, row_count: int):
+    """Record the parse of one sheet in the active profile, if any"""
+    profile = _active_profile.get()
+    if profile is not None:
+        profile.add_sheet(table_name, sheet_name, seconds, row_count)
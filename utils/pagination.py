@@ -0,0 +1,53 @@
+import base64
+import binascii
+import json
+from typing import Any, List, Optional, Tuple
+
+def encode_page_cursor(sort_column: Optional[str], descending: bool, sort_value: Any, row_id: int) -> str:
+    """
+    Encode the position after a row as an opaque, URL-safe continuation token.
+
+    The token records the sort it belongs to, so it cannot be replayed
+    against a different order.
+    """
+    payload = json.dumps([sort_column, descending, sort_value, row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_page_cursor(token: str, sort_column: Optional[str], descending: bool) -> Tuple[Any, int]:
+    """
+    Decode a continuation token into the (sort value, row id) of the row it follows.
+
+    Raises ValueError if the token is malformed or was made for another sort.
+    """
+    # Tokens come from clients, so what is wrong with one is not echoed back
+    try:
+        payload = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        token_column, token_descending, sort_value, row_id = json.loads(payload)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise ValueError("Invalid page cursor") from None
+    if isinstance(sort_value, (list, dict)) or isinstance(row_id, bool) or not isinstance(row_id, int):
+        raise ValueError("Invalid page cursor")
+    if token_column != sort_column or token_descending != descending:
+        raise ValueError("Page cursor does not belong to this sort order")
+    return sort_value, row_id
+
+def keyset_clause(sort_column: Optional[str], key_column: str, descending: bool,
+                  sort_value: Any, row_id: int) -> Tuple[str, List]:
+    """
+    Build the WHERE clause selecting the rows after (sort_value, row_id), with its params.
+
+    Rows are ordered by sort_column and then key_column, both ascending or
+    both descending, with NULL sort values first when ascending and last
+    when descending, as SQLite sorts them. The clause is a row-value
+    comparison, so an index on sort_column (which ends in the rowid) can
+    seek straight to the position.
+    """
+    if sort_column is None:
+        return f"{key_column} {'<' if descending else '>'} ?", [row_id]
+    if descending:
+        if sort_value is None:
+            return f"({sort_column} IS NULL AND {key_column} < ?)", [row_id]
+        return f"(({sort_column}, {key_column}) < (?, ?) OR {sort_column} IS NULL)", [sort_value, row_id]
+    if sort_value is None:
+        return f"(({sort_column} IS NULL AND {key_column} > ?) OR {sort_column} IS NOT NULL)", [row_id]
+    return f"({sort_column}, {key_column}) > (?, ?)", [sort_value, row_id]
@@ -0,0 +1,209 @@
+import gzip
+import hashlib
+import logging
+import os
+import pickle
+import threading
+from typing import Any, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Keep at most ~200MB of parsed workbooks on disk
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+# Layout of the entry files; entries of other layouts are never read and age out
+ENTRY_FORMAT = 2
+
+def file_digest(source, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Compute the SHA-256 hex digest of a workbook's bytes.
+
+    source is a file path, a bytes-like object (bytes, bytearray, memoryview
+    or mmap) or a seekable binary stream; a stream is read from the start
+    and left at the position it had.
+    """
+    digest = hashlib.sha256()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+    elif hasattr(source, 'read'):
+        position = source.tell()
+        source.seek(0)
+        try:
+            for chunk in iter(lambda: source.read(chunk_size), b''):
+                digest.update(chunk)
+        finally:
+            source.seek(position)
+    else:
+        digest.update(source)
+    return digest.hexdigest()
+
+class ParseCache:
+    """
+    Content-addressed on-disk cache of parsed workbook rows.
+
+    Entries are keyed on the SHA-256 of the workbook bytes plus a namespace
+    that names the parser and its version, so a re-import of an unchanged
+    file skips openpyxl entirely. An entry is the sequence of chunks a
+    parser yielded, such as (table name, rows) per sheet, stored as
+    consecutive pickles in one gzip file. It is written and read back a
+    chunk at a time, so neither side holds a whole workbook's rows. Entries
+    are evicted least-recently-used first once the cache grows past
+    max_bytes.
+    """
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def make_key(self, source, namespace: str) -> str:
+        """Build the cache key of a workbook file or stream for one parser namespace"""
+        return f"{file_digest(source)}-{namespace}"
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.v{ENTRY_FORMAT}.pkl.gz")
+
+    def read(self, key: str) -> Optional[Iterator[Any]]:
+        """
+        Get an iterator over the chunks of a cached entry, or None on a miss.
+
+        A damaged entry found while reading is deleted and raises its error,
+        which fails the file like a parse error would.
+        """
+        if not self.enabled:
+            return None
+        path = self._entry_path(key)
+        f = None
+        try:
+            f = gzip.open(path, 'rb')
+            # Opening is lazy; read the header so a damaged file is a miss, not an error
+            f.peek(1)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            if f is not None:
+                f.close()
+            logger.warning(f"Discarding unreadable parse cache entry {path}: {str(e)}")
+            self._remove(path)
+            return None
+
+        # Touch the entry so eviction sees it as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        logger.info(f"Parse cache hit for {key}")
+        return self._iter_chunks(f, path)
+
+    def _iter_chunks(self, f, path: str) -> Iterator[Any]:
+        with f:
+            while True:
+                try:
+                    chunk = pickle.load(f)
+                except EOFError:
+                    return
+                except Exception as e:
+                    logger.warning(f"Discarding unreadable parse cache entry {path}: {str(e)}")
+                    self._remove(path)
+                    raise
+                yield chunk
+
+    def writer(self, key: str) -> Optional['ParseCacheWriter']:
+        """Start writing an entry chunk by chunk, or get None if the cache is off"""
+        if not self.enabled:
+            return None
+        return ParseCacheWriter(self, key)
+
+    def clear(self):
+        """Remove every entry from the cache"""
+        with self._lock:
+            for entry in self._entries():
+                self._remove(entry.path)
+
+    def _entries(self):
+        if not os.path.isdir(self.cache_dir):
+            return []
+        return [entry for entry in os.scandir(self.cache_dir)
+                if entry.is_file() and entry.name.endswith('.pkl.gz')]
+
+    def _evict(self):
+        """Delete least-recently-used entries until the cache fits in max_bytes"""
+        with self._lock:
+            entries = []
+            for entry in self._entries():
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+            total_size = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total_size <= self.max_bytes:
+                    break
+                self._remove(path)
+                total_size -= size
+                logger.info(f"Evicted parse cache entry {os.path.basename(path)}")
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+class ParseCacheWriter:
+    """
+    Writes one cache entry a chunk at a time.
+
+    Chunks go to a temporary file, which only becomes the entry on commit(),
+    so readers never see a partial entry; discard() drops it instead. If
+    the file cannot be written the entry is skipped, and the parse goes on.
+    """
+    def __init__(self, cache: ParseCache, key: str):
+        self._cache = cache
+        self._path = cache._entry_path(key)
+        self._temp_path = f"{self._path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(cache.cache_dir, exist_ok=True)
+            self._file = gzip.open(self._temp_path, 'wb', compresslevel=1)
+        except Exception as e:
+            logger.warning(f"Could not write parse cache entry {self._path}: {str(e)}")
+            self._file = None
+
+    def write(self, chunk: Any):
+        if self._file is None:
+            return
+        try:
+            pickle.dump(chunk, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.warning(f"Could not write parse cache entry {self._path}: {str(e)}")
+            self.discard()
+
+    def commit(self):
+        """Make everything written the cache entry"""
+        if self._file is None:
+            return
+        try:
+            self._file.close()
+            self._file = None
+            os.replace(self._temp_path, self._path)
+        except Exception as e:
+            logger.warning(f"Could not write parse cache entry {self._path}: {str(e)}")
+            self.discard()
+            return
+        self._cache._evict()
+
+    def discard(self):
+        """Drop everything written, e.g. because the parse failed"""
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+            self._file = None
+        self._cache._remove(self._temp_path)
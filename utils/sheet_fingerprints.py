@@ -0,0 +1,97 @@
+import hashlib
+import logging
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+def group_rows_by_origin(rows: List[List], origin_index: int) -> Dict[str, List[List]]:
+    """Group parsed rows by the sheet they came from, keeping sheet order"""
+    rows_by_origin = {}
+    for row in rows:
+        rows_by_origin.setdefault(row[origin_index], []).append(row)
+    return rows_by_origin
+
+def _update_digest(digest, row):
+    digest.update(repr(tuple(row)).encode('utf-8'))
+    digest.update(b'\n')
+
+def fingerprint_rows(rows: List[List]) -> str:
+    """Compute a SHA-256 fingerprint of a sheet's parsed rows"""
+    digest = hashlib.sha256()
+    for row in rows:
+        _update_digest(digest, row)
+    return digest.hexdigest()
+
+class FingerprintCollector:
+    """
+    Fingerprints rows per sheet while they stream past.
+
+    Gives the same fingerprints as grouping the rows with
+    group_rows_by_origin() and calling fingerprint_rows() on every group,
+    without holding the rows in memory.
+    """
+    def __init__(self, origin_index: int):
+        self.origin_index = origin_index
+        self._digests = {}
+        self._row_counts = {}
+
+    def track(self, rows: Iterable[List]) -> Iterator[List]:
+        """Yield the rows unchanged, fingerprinting each one"""
+        for row in rows:
+            origin = row[self.origin_index]
+            digest = self._digests.get(origin)
+            if digest is None:
+                digest = self._digests[origin] = hashlib.sha256()
+                self._row_counts[origin] = 0
+            _update_digest(digest, row)
+            self._row_counts[origin] += 1
+            yield row
+
+    def record(self, cursor, table_name: str):
+        """Replace the fingerprints of a table with the ones collected"""
+        cursor.execute('DELETE FROM sheet_fingerprints WHERE table_name = ?', (table_name,))
+        for origin, digest in self._digests.items():
+            record_sheet_fingerprint(cursor, table_name, origin, digest.hexdigest(), self._row_counts[origin])
+
+def plan_sheet_changes(cursor, table_name: str, rows_by_origin: Dict[str, List[List]]) -> Dict[str, Tuple[str, str]]:
+    """
+    Compare each sheet's rows against the stored fingerprint.
+
+    Returns a (status, fingerprint) pair per origin, where status is
+    'skipped' if the rows are unchanged, 'replaced' if the sheet was stored
+    with different rows, or 'added' if the sheet was not stored before.
+    """
+    cursor.execute('SELECT origin, fingerprint FROM sheet_fingerprints WHERE table_name = ?', (table_name,))
+    stored = dict(cursor.fetchall())
+
+    changes = {}
+    for origin, rows in rows_by_origin.items():
+        fingerprint = fingerprint_rows(rows)
+        if origin not in stored:
+            changes[origin] = ('added', fingerprint)
+        elif stored[origin] == fingerprint:
+            changes[origin] = ('skipped', fingerprint)
+        else:
+            changes[origin] = ('replaced', fingerprint)
+    return changes
+
+def replace_sheet_rows(cursor, table_name: str, origin: str, rows: List[List], insert_query: str, fingerprint: str):
+    """Replace the stored rows of one sheet and record its new fingerprint"""
+    cursor.execute(f'DELETE FROM {table_name} WHERE data_origin = ?', (origin,))
+    cursor.executemany(insert_query, rows)
+    record_sheet_fingerprint(cursor, table_name, origin, fingerprint, len(rows))
+
+def record_sheet_fingerprint(cursor, table_name: str, origin: str, fingerprint: str, row_count: int):
+    """Store the fingerprint of a sheet's rows"""
+    cursor.execute(
+        'INSERT OR REPLACE INTO sheet_fingerprints (table_name, origin, fingerprint, row_count) VALUES (?, ?, ?, ?)',
+        (table_name, origin, fingerprint, row_count)
+    )
+
+def count_sheet_changes(*changes: Dict[str, Tuple[str, str]]) -> Dict[str, int]:
+    """Count skipped, replaced and added sheets across tables"""
+    counts = {'skipped': 0, 'replaced': 0, 'added': 0}
+    for table_changes in changes:
+        for status, _ in table_changes.values():
+            counts[status] += 1
+    return counts
@@ -0,0 +1,230 @@
+import logging
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Tuple
+from utils.streaming_workbook import has_table_border
+
+logger = logging.getLogger(__name__)
+
+# (min_row, min_col, max_row, max_col) of a merged range
+Bounds = Tuple[int, int, int, int]
+
+def read_value_grid(sheet, min_row: int, max_row: int, min_col: int, max_col: int) -> List[List]:
+    """
+    Read a rectangular block of cell values in one pass.
+
+    Returns a list of rows so callers can index values by offset instead of
+    looking up every cell through sheet.cell(). Rows are lists so merged
+    values can be filled in without touching the worksheet.
+    """
+    if max_row < min_row or max_col < min_col:
+        return []
+    return [list(row) for row in sheet.iter_rows(
+        min_row=min_row,
+        max_row=max_row,
+        min_col=min_col,
+        max_col=max_col,
+        values_only=True
+    )]
+
+def _table_border_ids(workbook) -> Optional[set]:
+    """
+    Get the ids of the workbook borders that have a top or bottom line.
+
+    Returns None if the workbook does not expose openpyxl's private border
+    list (requirements.txt pins the versions that do), in which case cells
+    have to be checked through the public cell.border instead.
+    """
+    borders = getattr(workbook, '_borders', None)
+    if borders is None:
+        return None
+    return {border_id for border_id, border in enumerate(borders) if has_table_border(border)}
+
+def _uses_private_cells(sheet, border_ids: Optional[set]) -> bool:
+    """Whether the fast paths can read the sheet's private cell store and style ids"""
+    return border_ids is not None and hasattr(sheet, '_cells')
+
+def content_extent(sheet) -> Tuple[int, int]:
+    """
+    Find the last row and column that hold a value or a table border.
+
+    Unlike sheet.dimensions this ignores cells that only carry formatting,
+    so a sheet formatted down to row 1048576 or out to column XFD still
+    reports the extent of its actual content. Merged ranges whose anchor
+    holds a value count with their full extent. Returns (0, 0) for a sheet
+    without content.
+    """
+    # Sheets from the lighter workbook backends know their own extent
+    if hasattr(sheet, 'content_extent'):
+        return sheet.content_extent()
+
+    border_ids = _table_border_ids(sheet.parent)
+    max_row = max_col = 0
+    if _uses_private_cells(sheet, border_ids):
+        # Walk only the cells the workbook stores; iter_rows() would create
+        # every cell of the formatted rectangle. Borders are checked by id so
+        # formatting-only cells cost no style lookups.
+        cells = sheet._cells
+        for (row, col), cell in cells.items():
+            if row <= max_row and col <= max_col:
+                continue
+            if cell._value is not None or cell._style.borderId in border_ids:
+                max_row = max(max_row, row)
+                max_col = max(max_col, col)
+    else:
+        logger.warning("openpyxl internals are not available, scanning every cell for the content extent")
+        cells = {}
+        for row_cells in sheet.iter_rows():
+            for cell in row_cells:
+                cells[(cell.row, cell.column)] = cell
+                if cell.value is not None or has_table_border(cell.border):
+                    max_row = max(max_row, cell.row)
+                    max_col = max(max_col, cell.column)
+
+    for merged_range in sheet.merged_cells.ranges:
+        anchor = cells.get((merged_range.min_row, merged_range.min_col))
+        if anchor is not None and anchor.value is not None:
+            max_row = max(max_row, merged_range.max_row)
+            max_col = max(max_col, merged_range.max_col)
+    return max_row, max_col
+
+class MergedCellIndex:
+    """
+    Index of the merged ranges on a sheet, keyed by row.
+
+    Resolves any covered cell to the top-left anchor of its merged range so
+    the parsers can read merged values and comments without unmerging or
+    rewriting the worksheet.
+    """
+    def __init__(self, ranges: List[Bounds]):
+        self._ranges_by_row: Dict[int, List[Bounds]] = {}
+        for bounds in ranges:
+            for row in range(bounds[0], bounds[2] + 1):
+                self._ranges_by_row.setdefault(row, []).append(bounds)
+
+    @classmethod
+    def from_sheet(cls, sheet) -> 'MergedCellIndex':
+        """Build the index from an openpyxl worksheet"""
+        return cls([
+            (m_range.min_row, m_range.min_col, m_range.max_row, m_range.max_col)
+            for m_range in sheet.merged_cells.ranges
+        ])
+
+    def ranges_in_row(self, row: int) -> List[Bounds]:
+        """Get the merged ranges that cover a row"""
+        return self._ranges_by_row.get(row, [])
+
+    def find(self, row: int, col: int) -> Optional[Bounds]:
+        """Get the merged range covering a cell, if any"""
+        for bounds in self._ranges_by_row.get(row, []):
+            if bounds[1] <= col <= bounds[3]:
+                return bounds
+        return None
+
+    def anchor(self, row: int, col: int) -> Tuple[int, int]:
+        """Get the top-left anchor of the range covering a cell, or the cell itself"""
+        bounds = self.find(row, col)
+        return (bounds[0], bounds[1]) if bounds else (row, col)
+
+    def ranges_within(self, min_row: int, max_row: int, min_col: int, max_col: int) -> List[Bounds]:
+        """Get the merged ranges that lie entirely inside a rectangle"""
+        ranges = []
+        for row in range(min_row, max_row + 1):
+            for bounds in self._ranges_by_row.get(row, []):
+                # Only report each range once, from its first row
+                if (bounds[0] == row and bounds[2] <= max_row and
+                        bounds[1] >= min_col and bounds[3] <= max_col):
+                    ranges.append(bounds)
+        return ranges
+
+def fill_merged_values(grid: List[List], min_row: int, min_col: int,
+                       merged_index: MergedCellIndex, resolved: Dict[Bounds, object]):
+    """
+    Copy anchor values of resolved merged ranges into the covered grid cells.
+
+    Args:
+        grid: Rows of values as returned by read_value_grid
+        min_row: Sheet row of the first grid row
+        min_col: Sheet column of the first grid column
+        merged_index: Merged range index of the sheet
+        resolved: Anchor value for each merged range that should be filled
+    """
+    for row_offset, row_values in enumerate(grid):
+        for bounds in merged_index.ranges_in_row(min_row + row_offset):
+            if bounds not in resolved:
+                continue
+            value = resolved[bounds]
+            first = max(bounds[1], min_col) - min_col
+            last = min(bounds[3], min_col + len(row_values) - 1) - min_col
+            for col_offset in range(first, last + 1):
+                row_values[col_offset] = value
+
+class BorderIndex:
+    """
+    Rows carrying a top or bottom border, per column of a sheet.
+
+    Built once per sheet so finding the table edges of a page is a bisect
+    instead of a scan through openpyxl's style proxies row by row. Sheets
+    from the lighter workbook backends list their bordered cells directly;
+    for openpyxl worksheets a column is indexed on its first lookup, by
+    reading the border id of its cells in rows 1..max_row, or their border
+    if openpyxl's internals are not available.
+    """
+    def __init__(self, sheet, max_row: int):
+        self._sheet = sheet
+        self._max_row = max_row
+        self._top_rows: Dict[int, List[int]] = {}
+        self._bottom_rows: Dict[int, List[int]] = {}
+        self._indexed_all = hasattr(sheet, 'table_borders')
+        if self._indexed_all:
+            for (row, col), border in sheet.table_borders():
+                self._add(row, col, border)
+            for rows in (*self._top_rows.values(), *self._bottom_rows.values()):
+                rows.sort()
+        else:
+            self._workbook = sheet.parent
+            self._border_ids = _table_border_ids(sheet.parent)
+            self._private_cells = _uses_private_cells(sheet, self._border_ids)
+
+    @classmethod
+    def from_sheet(cls, sheet, max_row: int) -> 'BorderIndex':
+        """Build the index of a worksheet for rows up to max_row"""
+        return cls(sheet, max_row)
+
+    def _add(self, row: int, col: int, border):
+        if border.top and border.top.style is not None:
+            self._top_rows.setdefault(col, []).append(row)
+        if border.bottom and border.bottom.style is not None:
+            self._bottom_rows.setdefault(col, []).append(row)
+
+    def _rows(self, rows_by_col: Dict[int, List[int]], col: int) -> List[int]:
+        if not self._indexed_all and col not in self._top_rows:
+            # Index the whole column once; rows are visited in order so the lists stay sorted
+            self._top_rows[col] = []
+            self._bottom_rows[col] = []
+            if self._private_cells:
+                cells = self._sheet._cells
+                for row in range(1, self._max_row + 1):
+                    cell = cells.get((row, col))
+                    if cell is not None and cell._style.borderId in self._border_ids:
+                        self._add(row, col, self._workbook._borders[cell._style.borderId])
+            elif self._max_row > 0:
+                for (cell,) in self._sheet.iter_rows(min_row=1, max_row=self._max_row, min_col=col, max_col=col):
+                    if has_table_border(cell.border):
+                        self._add(cell.row, col, cell.border)
+        return rows_by_col.get(col, [])
+
+    def first_top(self, col: int, min_row: int, max_row: int) -> Optional[int]:
+        """Get the first row in min_row..max_row whose cell in col has a top border"""
+        rows = self._rows(self._top_rows, col)
+        i = bisect_left(rows, min_row)
+        if i < len(rows) and rows[i] <= max_row:
+            return rows[i]
+        return None
+
+    def last_bottom(self, col: int, min_row: int, max_row: int) -> Optional[int]:
+        """Get the last row in min_row..max_row whose cell in col has a bottom border"""
+        rows = self._rows(self._bottom_rows, col)
+        i = bisect_right(rows, max_row) - 1
+        if i >= 0 and rows[i] >= min_row:
+            return rows[i]
+        return None
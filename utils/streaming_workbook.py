@@ -0,0 +1,227 @@
+import logging
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+from openpyxl import load_workbook
+from openpyxl.comments import Comment
+from openpyxl.packaging.relationship import get_dependents, get_rels_path
+from openpyxl.styles import Border
+from openpyxl.worksheet._reader import WorkSheetParser
+from openpyxl.worksheet.cell_range import CellRange, MultiCellRange
+from openpyxl.xml.constants import COMMENTS_NS, SHEET_MAIN_NS
+
+logger = logging.getLogger(__name__)
+
+COMMENT_TAG = f"{{{SHEET_MAIN_NS}}}comment"
+AUTHOR_TAG = f"{{{SHEET_MAIN_NS}}}author"
+TEXT_TAG = f"{{{SHEET_MAIN_NS}}}text"
+RUN_TAG = f"{{{SHEET_MAIN_NS}}}r"
+T_TAG = f"{{{SHEET_MAIN_NS}}}t"
+
+EMPTY_BORDER = Border()
+
+class StreamedCell(NamedTuple):
+    """The parts of a cell the parsers read"""
+    value: object
+    border: Border
+    comment: Optional[Comment]
+
+class StreamedSheet:
+    """
+    Values, merged ranges, page breaks, table borders and comments of one sheet.
+
+    Implements the subset of the openpyxl Worksheet API the parsers use,
+    without keeping a Cell object per cell. Only cells with a value, cells
+    with a top or bottom border and cells with a comment are stored.
+    Merged ranges are applied the way full openpyxl mode applies them:
+    covered cells lose their value, border and comment, and the edge cells
+    take the top/bottom border of the anchor.
+    """
+    def __init__(self, title: str, values: Dict[int, Dict[int, object]], borders: Dict[Tuple[int, int], Border],
+                 comments: Dict[Tuple[int, int], Comment], merged_cells: MultiCellRange, row_breaks, col_breaks):
+        self.title = title
+        self._values = values
+        self._borders = borders
+        self._comments = comments
+        self.merged_cells = merged_cells
+        self.row_breaks = row_breaks
+        self.col_breaks = col_breaks
+
+    def cell(self, row: int, column: int) -> StreamedCell:
+        return StreamedCell(
+            self._values.get(row, {}).get(column),
+            self._borders.get((row, column), EMPTY_BORDER),
+            self._comments.get((row, column))
+        )
+
+    def iter_rows(self, min_row: int, max_row: int, min_col: int, max_col: int, values_only: bool = True) -> Iterator[Tuple]:
+        """Yield the values of a rectangle row by row, like Worksheet.iter_rows(values_only=True)"""
+        if not values_only:
+            raise ValueError("Streamed sheets only hold cell values")
+        columns = range(min_col, max_col + 1)
+        for row in range(min_row, max_row + 1):
+            row_values = self._values.get(row)
+            if row_values:
+                yield tuple(row_values.get(col) for col in columns)
+            else:
+                yield (None,) * len(columns)
+
+    def table_borders(self) -> Iterator[Tuple[Tuple[int, int], Border]]:
+        """Yield ((row, column), border) for every cell with a top or bottom border"""
+        return iter(self._borders.items())
+
+    def content_extent(self) -> Tuple[int, int]:
+        """Last row and column holding a value, a table border or a valued merged range"""
+        max_row = max_col = 0
+        for row, row_values in self._values.items():
+            max_row = max(max_row, row)
+            max_col = max(max_col, max(row_values))
+        for row, col in self._borders:
+            max_row = max(max_row, row)
+            max_col = max(max_col, col)
+        for merged_range in self.merged_cells.ranges:
+            if self._values.get(merged_range.min_row, {}).get(merged_range.min_col) is not None:
+                max_row = max(max_row, merged_range.max_row)
+                max_col = max(max_col, merged_range.max_col)
+        return max_row, max_col
+
+class StreamingWorkbook:
+    """
+    Workbook opened in openpyxl read-only mode that hands out StreamedSheets.
+
+    Each sheet is read in one pass over its XML part, and its comments in one
+    pass over its comments part, so peak memory is a fraction of a full
+    load_workbook(). Only the most recently requested sheet is kept.
+    """
+    def __init__(self, filename):
+        self._workbook = load_workbook(filename=filename, read_only=True)
+        self._table_border_ids = {
+            border_id for border_id, border in enumerate(self._workbook._borders)
+            if has_table_border(border)
+        }
+        self._last_sheet = None
+
+    @property
+    def sheetnames(self) -> List[str]:
+        return self._workbook.sheetnames
+
+    def __getitem__(self, sheet_name: str) -> StreamedSheet:
+        if self._last_sheet is None or self._last_sheet.title != sheet_name:
+            self._last_sheet = None
+            self._last_sheet = self._read_sheet(self._workbook[sheet_name])
+        return self._last_sheet
+
+    def close(self):
+        self._last_sheet = None
+        self._workbook.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _read_sheet(self, worksheet) -> StreamedSheet:
+        """Read a read-only worksheet into a StreamedSheet"""
+        workbook = self._workbook
+        cell_styles = workbook._cell_styles
+        values = {}
+        borders = {}
+
+        with worksheet._get_source() as src:
+            parser = WorkSheetParser(src, worksheet._shared_strings,
+                                     data_only=workbook.data_only,
+                                     epoch=workbook.epoch,
+                                     date_formats=workbook._date_formats,
+                                     timedelta_formats=workbook._timedelta_formats)
+            for _, cells in parser.parse():
+                for cell in cells:
+                    if cell['value'] is not None:
+                        values.setdefault(cell['row'], {})[cell['column']] = cell['value']
+                    border_id = cell_styles[cell['style_id']].borderId
+                    if border_id in self._table_border_ids:
+                        borders[(cell['row'], cell['column'])] = workbook._borders[border_id]
+
+        comments = self._read_comments(worksheet)
+        merged_ranges = [CellRange(merge.ref) for merge in parser.merged_cells.mergeCell] if parser.merged_cells else []
+        for merged_range in merged_ranges:
+            apply_merge(merged_range, values, borders, comments)
+
+        logger.info(f"Streamed sheet {worksheet.title}: {sum(len(v) for v in values.values())} values, "
+                    f"{len(merged_ranges)} merged ranges, {len(comments)} comments")
+        return StreamedSheet(worksheet.title, values, borders, comments, MultiCellRange(merged_ranges),
+                             parser.row_breaks, parser.col_breaks)
+
+    def _read_comments(self, worksheet) -> Dict[Tuple[int, int], Comment]:
+        """Read the comments of a worksheet straight from its comments part"""
+        archive = self._workbook._archive
+        rels_path = get_rels_path(worksheet._worksheet_path)
+        if rels_path not in archive.namelist():
+            return {}
+
+        comments = {}
+        for rel in get_dependents(archive, rels_path).find(COMMENTS_NS):
+            with archive.open(rel.target) as src:
+                comments.update(parse_comments(src))
+        return comments
+
+def has_table_border(border: Border) -> bool:
+    """Check if a border has the top or bottom line that marks a table edge"""
+    return bool((border.top and border.top.style is not None) or
+                (border.bottom and border.bottom.style is not None))
+
+def parse_comments(src) -> Dict[Tuple[int, int], Comment]:
+    """Parse a comments XML part in one pass, keyed by (row, column)"""
+    authors = []
+    comments = {}
+    for _, element in ET.iterparse(src):
+        if element.tag == AUTHOR_TAG:
+            authors.append(element.text)
+        elif element.tag == COMMENT_TAG:
+            # Same text as openpyxl's Text.content: the plain text plus every run
+            snippets = []
+            text = element.find(TEXT_TAG)
+            if text is not None:
+                plain = text.find(T_TAG)
+                if plain is not None and plain.text is not None:
+                    snippets.append(plain.text)
+                for run in text.findall(RUN_TAG):
+                    run_text = run.findtext(T_TAG)
+                    if run_text is not None:
+                        snippets.append(run_text)
+            author_id = int(element.get('authorId', 0))
+            author = authors[author_id] if author_id < len(authors) else None
+            cell_range = CellRange(element.get('ref'))
+            comments[(cell_range.min_row, cell_range.min_col)] = Comment("".join(snippets), author)
+            element.clear()
+    return comments
+
+def apply_merge(merged_range: CellRange, values: Dict[int, Dict[int, object]],
+                 borders: Dict[Tuple[int, int], Border], comments: Dict[Tuple[int, int], Comment]):
+    """Apply a merged range the way openpyxl's full mode does when loading a sheet"""
+    anchor = (merged_range.min_row, merged_range.min_col)
+    anchor_border = borders.get(anchor, EMPTY_BORDER)
+
+    # Covered cells become empty MergedCells
+    for row in range(merged_range.min_row, merged_range.max_row + 1):
+        row_values = values.get(row)
+        for col in range(merged_range.min_col, merged_range.max_col + 1):
+            if (row, col) == anchor:
+                continue
+            if row_values:
+                row_values.pop(col, None)
+            borders.pop((row, col), None)
+            comments.pop((row, col), None)
+        if row_values is not None and not row_values:
+            del values[row]
+
+    # Edge cells take the top and bottom border of the anchor
+    top = anchor_border.top if anchor_border.top and anchor_border.top.style is not None else None
+    bottom = anchor_border.bottom if anchor_border.bottom and anchor_border.bottom.style is not None else None
+    for col in range(merged_range.min_col, merged_range.max_col + 1):
+        for row in (merged_range.min_row, merged_range.max_row):
+            if (row, col) == anchor:
+                continue
+            side_top = top if row == merged_range.min_row else None
+            side_bottom = bottom if row == merged_range.max_row else None
+            if side_top or side_bottom:
+                borders[(row, col)] = Border(top=side_top, bottom=side_bottom)
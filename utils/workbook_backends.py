@@ -0,0 +1,99 @@
+"""
+Workbook backends the parsers can read from.
+
+A backend opens a workbook file or binary stream and returns an object with `sheetnames`,
+`workbook[sheet_name]` and `close()`. Its sheets provide the subset of the
+openpyxl Worksheet API the parsers use:
+
+- iter_rows(min_row, max_row, min_col, max_col, values_only=True)
+- cell(row, column), with .value, .border (top/bottom) and .comment
+- merged_cells.ranges, row_breaks.brk and col_breaks.brk
+- optionally content_extent(), see utils.sheet_utils.content_extent
+
+Every backend must produce identical course, detail and hall rows;
+benchmarks/check_backend_parity.py checks this.
+"""
+import io
+import mmap
+from openpyxl import load_workbook
+from utils.streaming_workbook import StreamingWorkbook
+from utils.xlsx_reader import XlsxWorkbook
+
+WORKBOOK_BACKENDS = {
+    # Full openpyxl mode: every cell, style and comment as objects
+    'openpyxl': lambda filename: load_workbook(filename=filename),
+    # openpyxl read-only mode, keeping only what the parsers read
+    'streaming': StreamingWorkbook,
+    # zipfile + iterparse straight over the package parts
+    'xlsx': XlsxWorkbook,
+}
+
+DEFAULT_BACKEND = 'streaming'
+
+class BufferStream(io.RawIOBase):
+    """
+    Seekable read-only stream over a buffer (mmap, memoryview, bytearray).
+
+    zipfile needs seekable() and a position of its own, which mmap does not
+    provide; this reads straight from the buffer without copying it.
+    """
+    def __init__(self, buffer):
+        self._view = memoryview(buffer).cast('B')
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        chunk = self._view[self._position:self._position + len(target)]
+        target[:len(chunk)] = chunk
+        self._position += len(chunk)
+        return len(chunk)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._position = offset
+        elif whence == io.SEEK_CUR:
+            self._position += offset
+        elif whence == io.SEEK_END:
+            self._position = len(self._view) + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if self._position < 0:
+            raise ValueError("Negative seek position")
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def close(self):
+        self._view.release()
+        super().close()
+
+def as_workbook_file(source):
+    """
+    Turn a workbook source into something every backend can open.
+
+    Paths and seekable binary streams (open files, BytesIO,
+    SpooledTemporaryFile) are passed through as they are, rewound since a
+    digest or an earlier parse may have moved them. bytes and other buffers
+    such as mmap are read in place through a stream, never copied to disk.
+    """
+    if isinstance(source, bytes):
+        return io.BytesIO(source)
+    if isinstance(source, (bytearray, memoryview, mmap.mmap)):
+        return BufferStream(source)
+    if hasattr(source, 'read'):
+        source.seek(0)
+    return source
+
+def open_workbook(source, backend: str = DEFAULT_BACKEND):
+    """Open a workbook file or binary stream for parsing with the named backend"""
+    try:
+        opener = WORKBOOK_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown workbook backend: {backend}")
+    return opener(as_workbook_file(source))
@@ -0,0 +1,293 @@
+import logging
+import posixpath
+import xml.etree.ElementTree as ET
+import zipfile
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from openpyxl.formula.translate import Translator
+from openpyxl.styles import Border, Side
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+from openpyxl.utils.cell import coordinate_to_tuple
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel, from_ISO8601
+from openpyxl.worksheet.cell_range import CellRange, MultiCellRange
+from openpyxl.worksheet.formula import ArrayFormula, DataTableFormula
+from openpyxl.xml.constants import COMMENTS_NS, PKG_REL_NS, REL_NS, SHEET_MAIN_NS
+from utils.streaming_workbook import StreamedSheet, apply_merge, has_table_border, parse_comments
+
+logger = logging.getLogger(__name__)
+
+def _tag(name: str) -> str:
+    return f"{{{SHEET_MAIN_NS}}}{name}"
+
+ROW_TAG = _tag('row')
+CELL_TAG = _tag('c')
+VALUE_TAG = _tag('v')
+FORMULA_TAG = _tag('f')
+INLINE_STRING_TAG = _tag('is')
+T_TAG = _tag('t')
+RUN_TAG = _tag('r')
+MERGE_CELL_TAG = _tag('mergeCell')
+ROW_BREAKS_TAG = _tag('rowBreaks')
+COL_BREAKS_TAG = _tag('colBreaks')
+BREAK_TAG = _tag('brk')
+CUSTOM_VIEWS_TAG = _tag('customSheetViews')
+SHARED_STRING_TAG = _tag('si')
+RELATIONSHIP_TAG = f"{{{PKG_REL_NS}}}Relationship"
+
+class PageBreak(NamedTuple):
+    id: int
+
+class PageBreaks:
+    """Row or column page breaks, shaped like openpyxl's RowBreak/ColBreak"""
+    def __init__(self, ids: Optional[List[int]] = None):
+        self.brk = [PageBreak(break_id) for break_id in ids or []]
+
+def _text_content(element) -> str:
+    """Text of a string item without formatting, like openpyxl's Text.content"""
+    snippets = []
+    plain = element.find(T_TAG)
+    if plain is not None and plain.text is not None:
+        snippets.append(plain.text)
+    for run in element.findall(RUN_TAG):
+        run_text = run.findtext(T_TAG)
+        if run_text is not None:
+            snippets.append(run_text)
+    return "".join(snippets)
+
+def _cast_number(value: str):
+    if "." in value or "E" in value or "e" in value:
+        return float(value)
+    return int(value)
+
+def _read_relationships(archive: zipfile.ZipFile, part: str) -> Dict[str, Tuple[str, str]]:
+    """Read the relationships of a package part as {id: (type, target path)}"""
+    folder, name = posixpath.split(part)
+    rels_path = posixpath.join(folder, '_rels', f'{name}.rels')
+    if rels_path not in archive.NameToInfo:
+        return {}
+
+    relationships = {}
+    root = ET.fromstring(archive.read(rels_path))
+    for rel in root.iter(RELATIONSHIP_TAG):
+        if rel.get('TargetMode') == 'External':
+            continue
+        target = rel.get('Target')
+        if target.startswith('/'):
+            target = target[1:]
+        else:
+            target = posixpath.normpath(posixpath.join(folder, target))
+        relationships[rel.get('Id')] = (rel.get('Type'), target)
+    return relationships
+
+class XlsxWorkbook:
+    """
+    Minimal xlsx reader built on zipfile and ElementTree.iterparse.
+
+    Reads only what the parsers need - cell values, merged ranges, page
+    breaks, top/bottom borders and comments - straight from the package
+    parts, and hands out the same StreamedSheets as StreamingWorkbook.
+    Values are converted the way openpyxl converts them (shared and inline
+    strings, numbers, booleans, dates from date-formatted numbers and
+    formulas as text), so both backends produce identical rows.
+    """
+    def __init__(self, filename):
+        self._archive = zipfile.ZipFile(filename)
+        try:
+            self._read_workbook()
+        except Exception:
+            self._archive.close()
+            raise
+        self._last_sheet = None
+
+    @property
+    def sheetnames(self) -> List[str]:
+        return list(self._sheet_paths)
+
+    def __getitem__(self, sheet_name: str) -> StreamedSheet:
+        if self._last_sheet is None or self._last_sheet.title != sheet_name:
+            self._last_sheet = None
+            self._last_sheet = self._read_sheet(sheet_name, self._sheet_paths[sheet_name])
+        return self._last_sheet
+
+    def close(self):
+        self._last_sheet = None
+        self._archive.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _read_workbook(self):
+        """Read the sheet list, shared strings and styles"""
+        package_rels = _read_relationships(self._archive, '')
+        workbook_path = next(
+            (target for rel_type, target in package_rels.values() if rel_type.endswith('/officeDocument')),
+            'xl/workbook.xml'
+        )
+        workbook_rels = _read_relationships(self._archive, workbook_path)
+
+        root = ET.fromstring(self._archive.read(workbook_path))
+        properties = root.find(_tag('workbookPr'))
+        date1904 = properties is not None and properties.get('date1904') in ('1', 'true')
+        self._epoch = CALENDAR_MAC_1904 if date1904 else CALENDAR_WINDOWS_1900
+
+        self._sheet_paths = {}
+        for sheet in root.iter(_tag('sheet')):
+            rel = workbook_rels.get(sheet.get(f"{{{REL_NS}}}id"))
+            if rel is not None and rel[1] in self._archive.NameToInfo:
+                self._sheet_paths[sheet.get('name')] = rel[1]
+
+        self._shared_strings = []
+        self._read_styles(None)
+        for rel_type, target in workbook_rels.values():
+            if rel_type.endswith('/sharedStrings') and target in self._archive.NameToInfo:
+                self._shared_strings = self._read_shared_strings(target)
+            elif rel_type.endswith('/styles') and target in self._archive.NameToInfo:
+                self._read_styles(target)
+
+    def _read_shared_strings(self, path: str) -> List[str]:
+        strings = []
+        with self._archive.open(path) as src:
+            for _, element in ET.iterparse(src):
+                if element.tag == SHARED_STRING_TAG:
+                    strings.append(_text_content(element).replace('x005F_', ''))
+                    element.clear()
+        return strings
+
+    def _read_styles(self, path: Optional[str]):
+        """Index the table borders and date formats of every cell style"""
+        self._style_borders = {}  # Cell style id -> Border, for styles with a top or bottom line
+        self._date_styles = set()
+        self._timedelta_styles = set()
+        if path is None:
+            return
+
+        root = ET.fromstring(self._archive.read(path))
+        custom_formats = {
+            int(fmt.get('numFmtId')): fmt.get('formatCode')
+            for fmt in root.iter(_tag('numFmt'))
+        }
+
+        borders = []
+        borders_element = root.find(_tag('borders'))
+        for border in (borders_element if borders_element is not None else []):
+            sides = {}
+            for name in ('top', 'bottom'):
+                side = border.find(_tag(name))
+                sides[name] = Side(style=side.get('style')) if side is not None else Side()
+            borders.append(Border(**sides))
+
+        cell_xfs = root.find(_tag('cellXfs'))
+        for style_id, xf in enumerate(cell_xfs if cell_xfs is not None else []):
+            border_id = int(xf.get('borderId', 0))
+            if border_id < len(borders) and has_table_border(borders[border_id]):
+                self._style_borders[style_id] = borders[border_id]
+
+            fmt_id = int(xf.get('numFmtId', 0))
+            fmt = custom_formats.get(fmt_id, BUILTIN_FORMATS.get(fmt_id))
+            if is_date_format(fmt):
+                self._date_styles.add(style_id)
+            if is_timedelta_format(fmt):
+                self._timedelta_styles.add(style_id)
+
+    def _read_sheet(self, title: str, path: str) -> StreamedSheet:
+        """Read a worksheet part into a StreamedSheet in one pass"""
+        values = {}
+        borders = {}
+        merged_ranges = []
+        row_breaks = PageBreaks()
+        col_breaks = PageBreaks()
+        shared_formulae = {}
+        row_counter = 0
+
+        with self._archive.open(path) as src:
+            for _, element in ET.iterparse(src):
+                tag = element.tag
+                if tag == ROW_TAG:
+                    row_index = element.get('r')
+                    row_counter = int(float(row_index)) if row_index else row_counter + 1
+                    col_counter = 0
+                    for cell in element.iter(CELL_TAG):
+                        coordinate = cell.get('r')
+                        if coordinate:
+                            row, col_counter = coordinate_to_tuple(coordinate)
+                        else:
+                            row, col_counter = row_counter, col_counter + 1
+                        style = cell.get('s')
+                        style_id = int(style) if style else 0
+
+                        value = self._cell_value(cell, style_id, coordinate, shared_formulae)
+                        if value is not None:
+                            values.setdefault(row, {})[col_counter] = value
+                        if style_id in self._style_borders:
+                            borders[(row, col_counter)] = self._style_borders[style_id]
+                    element.clear()
+                elif tag == MERGE_CELL_TAG:
+                    merged_ranges.append(CellRange(element.get('ref')))
+                elif tag == ROW_BREAKS_TAG:
+                    row_breaks = PageBreaks([int(brk.get('id', 0)) for brk in element.iter(BREAK_TAG)])
+                elif tag == COL_BREAKS_TAG:
+                    col_breaks = PageBreaks([int(brk.get('id', 0)) for brk in element.iter(BREAK_TAG)])
+                elif tag == CUSTOM_VIEWS_TAG:
+                    # Breaks inside custom views are ignored, as openpyxl does
+                    row_breaks = PageBreaks()
+                    col_breaks = PageBreaks()
+
+        comments = {}
+        for rel_type, target in _read_relationships(self._archive, path).values():
+            if rel_type == COMMENTS_NS and target in self._archive.NameToInfo:
+                with self._archive.open(target) as src:
+                    comments.update(parse_comments(src))
+
+        for merged_range in merged_ranges:
+            apply_merge(merged_range, values, borders, comments)
+
+        logger.info(f"Read sheet {title}: {sum(len(v) for v in values.values())} values, "
+                    f"{len(merged_ranges)} merged ranges, {len(comments)} comments")
+        return StreamedSheet(title, values, borders, comments, MultiCellRange(merged_ranges), row_breaks, col_breaks)
+
+    def _cell_value(self, cell, style_id: int, coordinate: Optional[str], shared_formulae: Dict[str, Translator]):
+        """Convert a cell element to its value, following openpyxl's WorkSheetParser"""
+        data_type = cell.get('t', 'n')
+        value = None if data_type == 'inlineStr' else (cell.findtext(VALUE_TAG) or None)
+
+        formula = cell.find(FORMULA_TAG)
+        if formula is not None:
+            return self._formula_value(formula, coordinate, shared_formulae)
+
+        if value is not None:
+            if data_type == 'n':
+                value = _cast_number(value)
+                if style_id in self._date_styles:
+                    try:
+                        value = from_excel(value, self._epoch, timedelta=style_id in self._timedelta_styles)
+                    except (OverflowError, ValueError):
+                        value = "#VALUE!"
+            elif data_type == 's':
+                value = self._shared_strings[int(value)]
+            elif data_type == 'b':
+                value = bool(int(value))
+            elif data_type == 'd':
+                value = from_ISO8601(value)
+        elif data_type == 'inlineStr':
+            child = cell.find(INLINE_STRING_TAG)
+            if child is not None:
+                value = _text_content(child)
+        return value
+
+    def _formula_value(self, formula, coordinate: Optional[str], shared_formulae: Dict[str, Translator]):
+        """Formula text of a cell, with shared formulas translated to the cell"""
+        formula_type = formula.get('t')
+        value = "=" + (formula.text or "")
+        if formula_type == "array":
+            return ArrayFormula(ref=formula.get('ref'), text=value)
+        if formula_type == "shared":
+            index = formula.get('si')
+            if index in shared_formulae:
+                return shared_formulae[index].translate_formula(coordinate)
+            if value != "=":
+                shared_formulae[index] = Translator(value, coordinate)
+        elif formula_type == "dataTable":
+            return DataTableFormula(**formula.attrib)
+        return value